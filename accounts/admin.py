@@ -20,6 +20,7 @@ class CustomUserAdmin(UserAdmin): # inheritance to use default admin security lo
     fieldsets = (
         (None, {"fields": ("username", "password")}),
         ("Personal info", {"fields": ("email",)}),
+        ("Webhooks", {"fields": ("webhook_url", "webhook_secret")}),
         (
             "Permissions",
             {
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
 
 
@@ -19,10 +20,24 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     notify_email = models.BooleanField(default=True)
     notify_sms = models.BooleanField(default=False)
+    # Merchant endpoint for order event webhooks (notifications.adapters.webhook);
+    # deliveries are signed with HMAC-SHA256 using webhook_secret
+    webhook_url = models.URLField(max_length=500, blank=True, default="")
+    webhook_secret = models.CharField(max_length=128, blank=True, default="")
 
     # Verification flags (useful to gate sending SMS/email)
     email_verified = models.BooleanField(default=False)
     sms_verified = models.BooleanField(default=False)
 
+    @property
+    def has_webhook_endpoint(self) -> bool:
+        """Both halves are needed: deliveries are refused without a signing secret."""
+        return bool(self.webhook_url and self.webhook_secret)
+
+    def clean(self):
+        super().clean()
+        if bool(self.webhook_url) != bool(self.webhook_secret):
+            raise ValidationError("Set webhook_url and webhook_secret together.")
+
     def __str__(self) -> str:
         return self.username
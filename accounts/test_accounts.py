@@ -1,8 +1,9 @@
 """
-Tests for the accounts app - 20 tests.
+Tests for the accounts app - 21 tests.
 """
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.urls import reverse
 from rest_framework import status
 
@@ -13,7 +14,7 @@ User = get_user_model()
 
 
 # ============================================================================
-# MODEL TESTS (5 tests)
+# MODEL TESTS (6 tests)
 # ============================================================================
 
 class TestUserModel:
@@ -60,6 +61,17 @@ class TestUserModel:
         assert superuser.is_staff is True
         assert superuser.is_superuser is True
 
+    def test_webhook_endpoint_needs_url_and_secret(self, user):
+        """Test a webhook URL without a signing secret is rejected and not used for deliveries."""
+        user.webhook_url = "https://merchant.example.com/hooks"
+        assert user.has_webhook_endpoint is False
+        with pytest.raises(ValidationError):
+            user.clean()
+
+        user.webhook_secret = "whsec_test"
+        user.clean()
+        assert user.has_webhook_endpoint is True
+
     def test_user_roles(self, user, admin_user, superuser):
         """Test different user roles."""
         # Customer role
@@ -0,0 +1,89 @@
+"""
+Email delivery throughput against a local aiosmtpd sink.
+
+Compares a new SMTP session per message (previous behaviour), the shared
+per-worker connection used by `EmailAdapter.send`, and `send_notification_batch`.
+The sink can delay EHLO to stand in for the network round trips and STARTTLS
+handshake of a real relay.
+
+    pytest benchmarks/bench_email_delivery.py -s
+"""
+import asyncio
+import socket
+import time
+
+import pytest
+
+from notifications.adapters import email as email_adapter
+from notifications.adapters.email import EmailAdapter
+from notifications.models import Notification
+from notifications.tasks import send_notification_batch
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+MESSAGES = 200
+
+
+class SinkHandler:
+    def __init__(self, session_delay: float):
+        self.session_delay = session_delay
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.session_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("session_delay", [0.0, 0.02], ids=["loopback", "20ms-handshake"])
+def test_bench_email_delivery(settings, order_with_items, session_delay):
+    handler = SinkHandler(session_delay)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+        settings.EMAIL_HOST = "127.0.0.1"
+        settings.EMAIL_PORT = port
+        settings.EMAIL_USE_TLS = False
+        settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ""
+        adapter = EmailAdapter()
+        email_adapter.close_connection()
+
+        def per_message_session():
+            for _ in range(MESSAGES):
+                adapter.build_message(order_with_items, "order.created", {}).send()
+
+        def shared_connection():
+            for _ in range(MESSAGES):
+                adapter.send(order=order_with_items, event="order.created", payload={})
+
+        def batch_task():
+            notifications = Notification.objects.bulk_create(
+                Notification(order=order_with_items, channel=Notification.Channel.EMAIL, payload={"event": "order.created"})
+                for _ in range(MESSAGES)
+            )
+            send_notification_batch.apply(args=[[n.pk for n in notifications]])
+
+        print(f"\nSend {MESSAGES} emails to aiosmtpd (EHLO delay {session_delay * 1000:.0f}ms)")
+        for label, fn in (
+            ("new session per message", per_message_session),
+            ("shared connection", shared_connection),
+            ("send_notification_batch", batch_task),
+        ):
+            before = handler.received
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            assert handler.received - before == MESSAGES
+            print(f"  {label:<26} {elapsed * 1000:8.0f}ms  {MESSAGES / elapsed:8.0f} msgs/s")
+    finally:
+        email_adapter.close_connection()
+        controller.stop()
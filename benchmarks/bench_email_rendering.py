@@ -0,0 +1,61 @@
+"""
+EmailAdapter rendering cost per email: queries issued and render time, for an
+order loaded bare (lazy user/items access while building the context) versus
+loaded the way `send_notification` does it.
+
+    pytest benchmarks/bench_email_rendering.py -s
+"""
+import pytest
+from django.db import connection
+from django.template import engines
+
+from benchmarks.timing import measure, report
+from notifications.adapters.email import EmailAdapter
+from orders.models import Order
+
+ORDERS = 50
+
+
+def _count_queries(fn) -> int:
+    count = 0
+
+    def wrapper(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        fn()
+    return count
+
+
+@pytest.mark.slow
+def test_bench_email_rendering(bulk_orders):
+    adapter = EmailAdapter()
+    order_ids = [o.pk for o in bulk_orders[:ORDERS]]
+
+    def bare():
+        for pk in order_ids:
+            adapter.build_message(Order.objects.get(pk=pk), "order.created", {})
+
+    def preloaded():
+        for pk in order_ids:
+            order = Order.objects.select_related("user").prefetch_related("items").get(pk=pk)
+            adapter.build_message(order, "order.created", {})
+
+    def uncached_templates():
+        # Fresh loaders every email: what a setup without the cached loader pays
+        for pk in order_ids:
+            engines["django"].engine.template_loaders[0].reset()
+            order = Order.objects.select_related("user").prefetch_related("items").get(pk=pk)
+            adapter.build_message(order, "order.created", {})
+
+    print(f"\nQueries per email ({ORDERS} orders x 20 items)")
+    for label, fn in (("bare get()", bare), ("select_related + prefetch", preloaded)):
+        print(f"  {label:<28} {_count_queries(fn) / ORDERS:.1f}")
+
+    report(f"Render {ORDERS} order.created emails", {
+        "bare get()": measure(bare, rounds=5),
+        "select_related + prefetch": measure(preloaded, rounds=5),
+        "preloaded, template reloaded": measure(uncached_templates, rounds=5),
+    })
@@ -0,0 +1,67 @@
+"""
+Notification throughput for a burst of order events: one `send_notification`
+task per event versus windowed batching (buffer + per-channel flush).
+
+Uses the locmem email backend, so this measures database round trips and
+rendering; see bench_email_delivery.py for the SMTP side.
+
+    pytest benchmarks/bench_notification_batching.py -s
+"""
+import time
+from decimal import Decimal
+
+import pytest
+from django.core import mail
+from django.db import connection
+
+from notifications.models import BufferedNotification, Notification
+from notifications.tasks import enqueue_notification, flush_buffered_notifications, send_notification
+from orders.models import Order, OrderItem
+
+EVENTS = 2000
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("batch_size", [100, 500])
+def test_bench_notification_batching(settings, user, batch_size):
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    orders = Order.objects.bulk_create(
+        Order(user=user, address="Bench", total_amount=Decimal("10.00")) for _ in range(EVENTS * 2)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=o, product_id=1, product_name="Bench Product", price=Decimal("5.00"), quantity=2)
+        for o in orders
+    )
+    per_event, batched = orders[:EVENTS], orders[EVENTS:]
+
+    def one_task_per_event():
+        for order in per_event:
+            send_notification.apply(args=[f"order:{order.pk}:created", order.pk, "order.created", ["EMAIL"]])
+
+    def windowed_batches():
+        settings.NOTIFICATION_BATCHING = True
+        for order in batched:
+            enqueue_notification(f"order:{order.pk}:created", order.pk, "order.created", ["EMAIL"])
+        while flush_buffered_notifications("EMAIL", batch_size=batch_size)["more"]:
+            pass
+
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    print(f"\n{EVENTS} order.created events, EMAIL, batch_size={batch_size}")
+    for label, fn in (("one task per event", one_task_per_event), ("windowed batching", windowed_batches)):
+        mail.outbox = []
+        queries = 0
+        with connection.execute_wrapper(count_queries):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+        assert len(mail.outbox) == EVENTS
+        print(f"  {label:<20} {elapsed * 1000:8.0f}ms  {EVENTS / elapsed:8.0f} events/s  queries={queries}")
+
+    assert not BufferedNotification.objects.exists()
+    assert Notification.objects.filter(status=Notification.Status.SENT).count() == EVENTS * 2
@@ -0,0 +1,80 @@
+"""
+End-to-end UroPay payment path against the local simulator: generate +
+confirm through PaymentService per order, and status-call throughput from a
+thread pool, with and without simulated provider latency.
+
+    pytest benchmarks/bench_payment_flow.py -s
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from itertools import count
+
+import pytest
+
+from benchmarks.timing import measure, report
+from orders.models import Order
+from payments.clients.provider import PaymentProviderClient
+from payments.services.payment_service import PaymentService
+from payments.simulator import BackgroundSimulator, FaultProfile, LatencyModel, UroPaySimulator
+
+
+@pytest.fixture
+def uropay(settings):
+    settings.UROPAY_API_KEY = "bench-key"
+    settings.UROPAY_SECRET = "bench-secret"
+    return settings
+
+
+def _simulator(latency: str) -> UroPaySimulator:
+    return UroPaySimulator(
+        api_key="bench-key", secret="bench-secret",
+        faults=FaultProfile(latency=LatencyModel.parse(latency), seed=7),
+    )
+
+
+@pytest.mark.slow
+def test_bench_generate_and_confirm(uropay, user):
+    seq = count()
+
+    def pay():
+        order = Order.objects.create(user=user, address=f"{next(seq)} Bench Street", total_amount=Decimal("499.00"))
+        PaymentService.generate_payment(
+            user_id=user.id, order_id=order.id, vpa="bench@upi", vpaName="Bench",
+            customerName="Bench", customerEmail="bench@example.com",
+        )
+        PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number=f"UTR{order.id}")
+
+    results = {}
+    for latency in ("fixed:0", "lognormal:50,0.5"):
+        with BackgroundSimulator(_simulator(latency)) as base_url:
+            uropay.UROPAY_BASE_URL = base_url
+            results[f"generate+confirm {latency}"] = measure(pay, rounds=30)
+    report("PaymentService generate + confirm per order (2 provider calls)", results)
+
+
+@pytest.mark.slow
+def test_bench_status_throughput(uropay):
+    """200 status calls: sequential vs a pool sized to the bulkhead."""
+    with BackgroundSimulator(_simulator("fixed:20")) as base_url:
+        uropay.UROPAY_BASE_URL = base_url
+        client = PaymentProviderClient()
+        ids = [f"SIM-{n}" for n in range(200)]
+
+        def status(uro_id):
+            try:
+                client.uropay_status(uro_id)
+            except Exception:
+                pass  # unknown ids answer 404; only round trips matter here
+
+        def sequential():
+            for uro_id in ids:
+                status(uro_id)
+
+        def pooled():
+            with ThreadPoolExecutor(max_workers=uropay.UROPAY_MAX_CONCURRENT_CALLS) as pool:
+                list(pool.map(status, ids))
+
+        report("200 x uropay_status at 20ms provider latency", {
+            "sequential": measure(sequential, rounds=3, warmup=1),
+            "thread pool (bulkhead size)": measure(pooled, rounds=3, warmup=1),
+        })
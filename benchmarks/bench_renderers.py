@@ -0,0 +1,48 @@
+"""
+DRF JSONRenderer vs ORJSONRenderer on ListOrdersAPIView at page_size=100.
+
+    pytest benchmarks/bench_renderers.py -s
+"""
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from benchmarks.timing import measure, report
+from config.renderers import ORJSONRenderer
+from orders.api.views import ListOrdersAPIView
+
+
+pytest.importorskip("orjson")
+
+
+@pytest.mark.slow
+def test_bench_list_orders_renderers(bulk_orders, user):
+    factory = APIRequestFactory()
+
+    def call_view(renderer_class):
+        view = ListOrdersAPIView.as_view(renderer_classes=[renderer_class])
+
+        def run():
+            request = factory.get("/api/orders/", {"page_size": 100})
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            return response
+
+        return run
+
+    stdlib_body = call_view(JSONRenderer)().content
+    orjson_body = call_view(ORJSONRenderer)().content
+    assert stdlib_body == orjson_body
+
+    report("ListOrdersAPIView page_size=100 (full request)", {
+        "JSONRenderer": measure(call_view(JSONRenderer)),
+        "ORJSONRenderer": measure(call_view(ORJSONRenderer)),
+    })
+
+    # Rendering only, on the already-serialized page
+    data = call_view(JSONRenderer)().data
+    report("ListOrdersAPIView page_size=100 (render only)", {
+        "JSONRenderer": measure(lambda: JSONRenderer().render(data), rounds=200),
+        "ORJSONRenderer": measure(lambda: ORJSONRenderer().render(data), rounds=200),
+    })
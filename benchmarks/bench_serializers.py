@@ -0,0 +1,30 @@
+"""
+OrderResponseSerializer(many=True) vs the .values() fast path, page_size=100
+with 20 items per order.
+
+    pytest benchmarks/bench_serializers.py -s
+"""
+import pytest
+
+from benchmarks.timing import measure, report
+from orders.api.fast_serializers import ORDER_FIELDS, serialize_order_rows
+from orders.api.serializers import OrderResponseSerializer
+from orders.models import Order
+
+
+@pytest.mark.slow
+def test_bench_order_serializers(bulk_orders, user):
+    qs = Order.objects.filter(user=user)
+
+    def drf():
+        return OrderResponseSerializer(qs.prefetch_related("items")[:100], many=True).data
+
+    def fast():
+        return serialize_order_rows(qs.values(*ORDER_FIELDS)[:100])
+
+    assert [dict(o) for o in drf()] == fast()
+
+    report("Order page (100 x 20 items), queries included", {
+        "OrderResponseSerializer": measure(drf),
+        "fast_serializers": measure(fast),
+    })
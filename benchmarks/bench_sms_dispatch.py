@@ -0,0 +1,46 @@
+"""
+Bulk SMS throughput: one blocking `SmsAdapter.deliver` call per message versus
+the asyncio dispatcher at several concurrency levels.
+
+Uses the stub provider with `SMS_STUB_LATENCY_MS` standing in for the
+provider round trip, so no network access is needed.
+
+    pytest benchmarks/bench_sms_dispatch.py -s
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from notifications.adapters import sms_async
+from notifications.adapters.sms import SmsAdapter
+from notifications.adapters.sms_async import SmsMessage
+
+MESSAGES = 2000
+# Sequential sends are slow by design; time a sample and scale
+SEQUENTIAL_SAMPLE = 50
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("latency_ms", [20, 100])
+def test_bench_sms_dispatch(settings, monkeypatch, latency_ms):
+    monkeypatch.delenv("SMS_PROVIDER", raising=False)
+    settings.SMS_STUB_LATENCY_MS = latency_ms
+    order = SimpleNamespace(pk=1, user=SimpleNamespace(phone_number="+15550000000"))
+    messages = [SmsMessage(to=f"+1555{n:07d}", body="Reminder", reference=str(n)) for n in range(MESSAGES)]
+
+    print(f"\nSend {MESSAGES} SMS to the stub provider ({latency_ms}ms per call)")
+    adapter = SmsAdapter()
+    started = time.perf_counter()
+    for _ in range(SEQUENTIAL_SAMPLE):
+        adapter.deliver(order, "reminder", {})
+    rate = SEQUENTIAL_SAMPLE / (time.perf_counter() - started)
+    print(f"  {'blocking deliver()':<26} {MESSAGES / rate * 1000:8.0f}ms  {rate:8.0f} msgs/s  (from {SEQUENTIAL_SAMPLE})")
+
+    for concurrency in (50, 200, 500):
+        started = time.perf_counter()
+        results = sms_async.dispatch(messages, concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+        assert not any(isinstance(result, Exception) for result in results)
+        label = f"async, {concurrency} in flight"
+        print(f"  {label:<26} {elapsed * 1000:8.0f}ms  {MESSAGES / elapsed:8.0f} msgs/s")
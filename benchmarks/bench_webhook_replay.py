@@ -0,0 +1,44 @@
+"""
+Webhook replay throughput: 20k stored events (half matching a payment)
+replayed in batches, first run (writes) and a repeat run (idempotent no-op).
+
+    pytest benchmarks/bench_webhook_replay.py -s
+"""
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from orders.models import Order
+from payments.models import Payment, WebhookEvent
+from payments.services.webhook_replay import replay_webhook_events
+
+EVENTS = 20000
+
+
+@pytest.mark.slow
+def test_bench_webhook_replay(user):
+    orders = Order.objects.bulk_create(
+        Order(user=user, address="Bench", total_amount=Decimal("10.00")) for _ in range(EVENTS // 2)
+    )
+    Payment.objects.bulk_create(
+        Payment(order=o, amount=o.total_amount, uro_pay_order_id=f"URO-{o.pk}") for o in orders
+    )
+    WebhookEvent.objects.bulk_create(
+        WebhookEvent(webhook_id=f"WH-{n}", payload={"uroPayOrderId": f"URO-{orders[n // 2].pk}" if n % 2 else f"MISSING-{n}"})
+        for n in range(EVENTS)
+    )
+    # sqlite in-memory DBs are per connection, so only Postgres can use worker threads
+    workers = 4 if connection.vendor == "postgresql" else 1
+
+    print(f"\nReplay {EVENTS} webhook events, batch_size=1000, workers={workers}")
+    for label in ("first run", "repeat run"):
+        started = time.perf_counter()
+        result = replay_webhook_events(WebhookEvent.objects.all(), batch_size=1000, workers=workers)
+        elapsed = time.perf_counter() - started
+        print(
+            f"  {label:<12} {elapsed * 1000:8.0f}ms  {result.events / elapsed:8.0f} events/s  "
+            f"settled={result.settled} already={result.already_settled} unmatched={result.unmatched}"
+        )
+    assert Payment.objects.filter(status=Payment.Status.SUCCESS).count() == EVENTS // 2
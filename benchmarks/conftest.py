@@ -0,0 +1,31 @@
+"""
+Fixtures shared by the benchmarks. Benchmarks are not collected by the default
+test run (file names do not match `test_*.py`); run them explicitly, e.g.
+
+    pytest benchmarks/bench_renderers.py -s
+"""
+import pytest
+from decimal import Decimal
+
+from orders.models import Order, OrderItem
+
+
+@pytest.fixture
+def bulk_orders(db, user):
+    """100 orders with 20 items each for `user` (one full page at page_size=100)."""
+    orders = Order.objects.bulk_create(
+        Order(user=user, address=f"{n} Bench Street", total_amount=Decimal("0.00"))
+        for n in range(100)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order,
+            product_id=p + 1,
+            product_name=f"Bench Product {p + 1}",
+            price=Decimal("19.99") + p,
+            quantity=p % 3 + 1,
+        )
+        for order in orders
+        for p in range(20)
+    )
+    return orders
@@ -0,0 +1,30 @@
+import statistics
+import time
+
+
+def measure(fn, rounds: int = 20, warmup: int = 2) -> dict:
+    """Run `fn` repeatedly and return best/median/mean wall time in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "best": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def report(title: str, results: dict) -> None:
+    """Print a small comparison table; the first entry is the baseline."""
+    print(f"\n{title}")
+    baseline = None
+    for name, r in results.items():
+        baseline = baseline or r["median"]
+        print(
+            f"  {name:<28} best={r['best']:8.2f}ms  median={r['median']:8.2f}ms  "
+            f"mean={r['mean']:8.2f}ms  x{baseline / r['median']:.2f}"
+        )
@@ -8,6 +8,99 @@ app = Celery('config')
 # read broker from settings module
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
+# ----------------------------------------------------------------------
+# Queues and priorities
+#
+# Provider-bound work gets its own queue so a slow SMS gateway or a
+# reconciliation sweep never sits in front of a payment email:
+#
+#   email, sms,            IO-bound, run on thread-pool workers. UroPay
+#   merchant_webhooks,     callbacks (webhooks) are kept apart from merchant
+#   webhooks               deliveries, so a slow or dead merchant endpoint
+#                          never delays a payment confirmation
+#   reconciliation, reports long batch jobs (reports also runs the retention
+#                          purge), run on small prefork workers
+#   celery (default)       fan-out and housekeeping tasks
+#
+# Celery's thread pool does not enforce task time limits (time_limit and
+# soft_time_limit are dropped), so on the thread-pool queues the channel
+# time limits of NOTIFICATION_CHANNEL_OPTIONS do not apply. Each network
+# call is bounded by a client timeout instead: EMAIL_TIMEOUT,
+# SMS_TIMEOUT / SMS_ASYNC_TIMEOUT and NOTIFICATION_WEBHOOK_TIMEOUT.
+#
+# Within a queue, messages are consumed by priority (0 = first on the
+# Redis transport). Everything defaults to the middle so a confirmed
+# payment can overtake an order.created backlog.
+# ----------------------------------------------------------------------
+
+TASK_QUEUES = {
+    'payments.tasks.process_webhook_events_task': 'webhooks',
+    'payments.tasks.reconcile_payments_task': 'reconciliation',
+    'orders.tasks.refresh_sales_rollups_task': 'reports',
+    'config.retention.purge_expired_rows_task': 'reports',
+    'notifications.tasks.send_sms_broadcast': 'sms',
+}
+
+CHANNEL_QUEUES = {
+    'EMAIL': 'email',
+    'SMS': 'sms',
+    'WEBHOOK': 'merchant_webhooks',
+}
+
+DEFAULT_PRIORITY = 5
+
+EVENT_PRIORITIES = {
+    'payment.confirmed': 0,
+    'payment.succeeded': 0,
+}
+
+
+def channel_queue(channel: str) -> str:
+    return CHANNEL_QUEUES.get(channel, app.conf.task_default_queue)
+
+
+def event_priority(event: str) -> int:
+    return EVENT_PRIORITIES.get(event, DEFAULT_PRIORITY)
+
+
+def _arg(args, kwargs, index, name, default=None):
+    if name in kwargs:
+        return kwargs[name]
+    return args[index] if len(args) > index else default
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router: pick the queue (and, for notifications, the priority) of a task."""
+    if name in TASK_QUEUES:
+        return {'queue': TASK_QUEUES[name]}
+    if name == 'notifications.tasks.send_notification':
+        return {
+            'queue': app.conf.task_default_queue,
+            'priority': event_priority(_arg(args, kwargs, 2, 'event')),
+        }
+    if name == 'notifications.tasks.send_notification_batch':
+        return {'queue': channel_queue(_arg(args, kwargs, 1, 'channel', 'EMAIL'))}
+    if name == 'notifications.tasks.flush_notification_buffer':
+        return {'queue': channel_queue(_arg(args, kwargs, 0, 'channel'))}
+    # deliver_notification is routed by its caller, which knows the channel
+    return None
+
+
+app.conf.update(
+    # Project-level tasks outside the installed apps
+    imports=('config.retention',),
+    task_routes=(route_task,),
+    task_default_priority=DEFAULT_PRIORITY,
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    # Reserve one message at a time, otherwise prefetched low-priority
+    # messages are worked off before a newly queued urgent one
+    worker_prefetch_multiplier=1,
+)
+
 # auto-discover tasks in installed apps
 app.autodiscover_tasks()
 
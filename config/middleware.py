@@ -2,6 +2,9 @@ import uuid
 import time
 import logging
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject, empty
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,19 +16,36 @@ class RequestIdMiddleware:
     3. Logs request details (method, path, user, request_id)
     4. Logs response details (status code, duration, request_id)
     5. Adds X-Request-ID header to the response
+
+    Works in both sync (WSGI) and async (ASGI) chains, so async views are not
+    forced onto a thread by this middleware.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start_time = self._before(request)
+        response = self.get_response(request)
+        return self._after(request, response, start_time, resolve_user=True)
+
+    async def __acall__(self, request):
+        start_time = self._before(request)
+        response = await self.get_response(request)
+        return self._after(request, response, start_time, resolve_user=False)
+
+    def _before(self, request):
         # Generate or reuse request ID from incoming header
         request_id = request.headers.get('X-Request-ID') or str(uuid.uuid4())
         request.request_id = request_id
 
-        # Start timer for duration calculation
-        start_time = time.time()
-
         # Log incoming request
         logger.info(
             "[REQUEST] %s %s | request_id=%s",
@@ -34,13 +54,20 @@ class RequestIdMiddleware:
             request_id,
         )
 
-        response = self.get_response(request)
+        # Start timer for duration calculation
+        return time.time()
+
+    def _after(self, request, response, start_time, resolve_user):
+        request_id = request.request_id
 
         # Calculate duration
         duration_ms = (time.time() - start_time) * 1000
 
         # Get user info (available after AuthenticationMiddleware)
         user = getattr(request, 'user', None)
+        if not resolve_user and isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            # Resolving the lazy session user hits the DB, which async code must not do
+            user = None
         user_info = 'anonymous'
         if user and getattr(user, 'is_authenticated', False):
             user_info = f"user_id={user.id}"
@@ -0,0 +1,82 @@
+import math
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def orjson_default(obj):
+    """
+    Fallback for types orjson does not serialize natively (Decimal, lazy
+    strings, QuerySets, ...). Delegates to DRF's encoder so the output matches
+    what `JSONRenderer` would produce.
+    """
+    return _drf_encoder.default(obj)
+
+
+def _has_non_finite(data) -> bool:
+    """True if `data` holds a NaN/Infinity float or Decimal anywhere."""
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, float):
+            if not math.isfinite(obj):
+                return True
+        elif isinstance(obj, Decimal):
+            if not obj.is_finite():
+                return True
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in `JSONRenderer` backed by orjson.
+
+    datetime/date/UUID are encoded natively by orjson (UTC as `Z`, like DRF);
+    everything else goes through DRF's encoder. Falls back to the stdlib path
+    when orjson is not installed, when an indent other than 2 is requested, or
+    when the REST_FRAMEWORK JSON settings ask for ASCII, non-compact or
+    non-strict output, none of which orjson can produce.
+
+    Two inputs orjson treats differently from DRF also take the stdlib path:
+    integers wider than 64 bits (orjson refuses them) and NaN/Infinity
+    (orjson writes `null`; DRF raises `ValueError`). orjson only emits `null`
+    for those or for None, so the check for them runs only when the output
+    contains one.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        elif indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=orjson_default, option=option)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,140 @@
+"""
+Retention purge for tables that only grow (`RETENTION_POLICIES`).
+
+Each policy names a model, the timestamp that ages a row, how many days to
+keep, and an optional filter for rows that may go. Rows still in use (e.g.
+PENDING notifications, unprocessed webhook events) are never matched.
+
+Rows are deleted oldest-first in primary-key ranges of `RETENTION_BATCH_SIZE`.
+Each range is one short transaction, with a pause between them, so the purge
+never holds locks for long or floods replication and autovacuum. A run stops
+after `RETENTION_MAX_SECONDS_PER_RUN`, and the next beat run carries on from
+what is left.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PurgeResult:
+    model: str
+    deleted: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+    # Stopped by the time budget or a lock timeout; the next run continues
+    incomplete: bool = False
+
+    @property
+    def per_second(self) -> float:
+        return self.deleted / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {**self.__dict__, "per_second": round(self.per_second, 1)}
+
+
+def _set_lock_timeout() -> None:
+    # Give up on a batch rather than queue behind (and in front of) live writers
+    if connection.vendor == "postgresql":
+        timeout_ms = int(getattr(settings, "RETENTION_LOCK_TIMEOUT_MS", 2000))
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = {timeout_ms}")
+
+
+def purge_expired(
+    label: str,
+    *,
+    days: int,
+    date_field: str,
+    filters: Optional[Dict] = None,
+    batch_size: int = 1000,
+    pause: float = 0.1,
+    max_seconds: Optional[float] = None,
+) -> PurgeResult:
+    """Delete rows of `label` ("app.Model") whose `date_field` is older than `days`."""
+    model = apps.get_model(label)
+    result = PurgeResult(model=label)
+    started = time.monotonic()
+    cutoff = timezone.now() - timedelta(days=days)
+    expired = model.objects.filter(**{f"{date_field}__lt": cutoff}, **(filters or {}))
+
+    # Rows are inserted in time order, so everything expired sits below the
+    # first unexpired id. Bounding each scan there keeps it off the live tail.
+    boundary = (
+        model.objects.filter(**{f"{date_field}__gte": cutoff})
+        .order_by("pk").values_list("pk", flat=True).first()
+    )
+    if boundary is not None:
+        expired = expired.filter(pk__lt=boundary)
+
+    last_id = 0
+    while True:
+        ids = list(expired.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        try:
+            with transaction.atomic():
+                _set_lock_timeout()
+                # Range predicate on the pk index; the expiry filter is re-applied inside it
+                deleted, _ = expired.filter(pk__gte=ids[0], pk__lte=ids[-1]).delete()
+        except DatabaseError:
+            logger.warning("Retention purge of %s stopped at id %s", label, ids[0], exc_info=True)
+            result.incomplete = True
+            break
+        result.deleted += deleted
+        result.batches += 1
+        last_id = ids[-1]
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            result.incomplete = True
+            break
+        if pause:
+            time.sleep(pause)
+
+    result.elapsed_seconds = time.monotonic() - started
+    logger.info(
+        "Purged %s rows from %s in %.1fs (%.0f rows/s)%s",
+        result.deleted, label, result.elapsed_seconds, result.per_second,
+        "; more left for the next run" if result.incomplete else "",
+    )
+    return result
+
+
+def purge_all(policies: Optional[Dict] = None) -> List[PurgeResult]:
+    policies = getattr(settings, "RETENTION_POLICIES", {}) if policies is None else policies
+    batch_size = getattr(settings, "RETENTION_BATCH_SIZE", 1000)
+    pause = getattr(settings, "RETENTION_PAUSE_SECONDS", 0.1)
+    deadline = time.monotonic() + getattr(settings, "RETENTION_MAX_SECONDS_PER_RUN", 300)
+    results = []
+    for label, policy in policies.items():
+        if not policy.get("days"):
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            results.append(PurgeResult(model=label, incomplete=True))
+            continue
+        results.append(purge_expired(
+            label,
+            days=policy["days"],
+            date_field=policy["date_field"],
+            filters=policy.get("filters"),
+            batch_size=batch_size,
+            pause=pause,
+            max_seconds=remaining,
+        ))
+    return results
+
+
+@shared_task
+def purge_expired_rows_task():
+    """Beat-scheduled: apply RETENTION_POLICIES."""
+    return [result.as_dict() for result in purge_all()]
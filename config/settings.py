@@ -74,13 +74,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept per process whatever DEBUG is;
+            # notification workers render the same few templates constantly
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -148,6 +155,18 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Content-addressed payment QR images (payments.services.qr_codes). Any Django
+# storage backend works for "payment_qr"; blobs are immutable once written.
+PAYMENT_QR_ROOT = Path(os.getenv("PAYMENT_QR_ROOT", BASE_DIR / "var" / "payment_qr"))
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "payment_qr": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": PAYMENT_QR_ROOT, "allow_overwrite": True},
+    },
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -155,6 +174,16 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # orjson-backed JSON (falls back to the stdlib implementation if orjson is missing)
+    "DEFAULT_RENDERER_CLASSES": (
+        "config.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "config.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
@@ -177,9 +206,103 @@ PAYMENT_PROVIDER_BASE_URL = os.getenv("PAYMENT_PROVIDER_BASE_URL", "")
 UROPAY_API_KEY = os.getenv("UROPAY_API_KEY")
 UROPAY_SECRET = os.getenv("UROPAY_SECRET")
 UROPAY_BASE_URL = os.getenv("UROPAY_BASE_URL", "https://api.uropay.me")
+# Pooled keep-alive HTTP session shared by every PaymentProviderClient in a process
+UROPAY_HTTP_POOL_SIZE = int(os.getenv("UROPAY_HTTP_POOL_SIZE", "10"))
+UROPAY_HTTP_MAX_RETRIES = int(os.getenv("UROPAY_HTTP_MAX_RETRIES", "2"))  # idempotent verbs only
+UROPAY_HTTP_RETRY_BACKOFF = float(os.getenv("UROPAY_HTTP_RETRY_BACKOFF", "0.3"))
+# Connection limit of the aiohttp session used by the async payment endpoints (per event loop)
+UROPAY_ASYNC_POOL_SIZE = int(os.getenv("UROPAY_ASYNC_POOL_SIZE", "100"))
+# Circuit breaker (state shared through the cache) and per-process bulkhead around UroPay calls
+UROPAY_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("UROPAY_CIRCUIT_FAILURE_THRESHOLD", "5"))
+UROPAY_CIRCUIT_FAILURE_WINDOW_SECONDS = int(os.getenv("UROPAY_CIRCUIT_FAILURE_WINDOW_SECONDS", "30"))
+UROPAY_CIRCUIT_RECOVERY_SECONDS = int(os.getenv("UROPAY_CIRCUIT_RECOVERY_SECONDS", "30"))
+UROPAY_MAX_CONCURRENT_CALLS = int(os.getenv("UROPAY_MAX_CONCURRENT_CALLS", "8"))
+UROPAY_BULKHEAD_WAIT_SECONDS = float(os.getenv("UROPAY_BULKHEAD_WAIT_SECONDS", "0.05"))
+# Lease on a GENERATING/CONFIRMING payment claim; must exceed the provider timeout incl. retries
+PAYMENT_CLAIM_TIMEOUT_SECONDS = int(os.getenv("PAYMENT_CLAIM_TIMEOUT_SECONDS", "60"))
 
 # Celery / broker config (default to local redis)
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
+
+# Cache shared by all web/Celery processes (Redis) when CACHE_URL is set
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Order status stream (/api/orders/<id>/events/): Redis pub/sub when available,
+# else each ASGI worker polls the cache for the orders it is streaming
+ORDER_EVENTS_REDIS_URL = os.getenv("ORDER_EVENTS_REDIS_URL", CACHE_URL)
+ORDER_STREAM_HEARTBEAT_SECONDS = float(os.getenv("ORDER_STREAM_HEARTBEAT_SECONDS", "15"))
+ORDER_STREAM_TIMEOUT_SECONDS = float(os.getenv("ORDER_STREAM_TIMEOUT_SECONDS", "300"))
+ORDER_STREAM_POLL_SECONDS = float(os.getenv("ORDER_STREAM_POLL_SECONDS", "1"))
+ORDER_STREAM_RETRY_MS = 3000
+
+CELERY_BEAT_SCHEDULE = {
+    "refresh-sales-rollups": {
+        "task": "orders.tasks.refresh_sales_rollups_task",
+        "schedule": float(os.getenv("SALES_ROLLUP_INTERVAL_SECONDS", "300")),
+    },
+    # Safety net for webhook events whose processing task was never enqueued
+    "process-webhook-events": {
+        "task": "payments.tasks.process_webhook_events_task",
+        "schedule": float(os.getenv("WEBHOOK_SWEEP_INTERVAL_SECONDS", "60")),
+    },
+    # Safety net for buffered notifications whose flush was never enqueued
+    "flush-notification-buffers": {
+        "task": "notifications.tasks.flush_notification_buffers_task",
+        "schedule": 30.0,
+    },
+    "reconcile-stale-payments": {
+        "task": "payments.tasks.reconcile_payments_task",
+        "schedule": float(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "600")),
+    },
+    "purge-expired-rows": {
+        "task": "config.retention.purge_expired_rows_task",
+        "schedule": float(os.getenv("RETENTION_PURGE_INTERVAL_SECONDS", "3600")),
+    },
+}
+
+# Retention purge (config.retention): rows older than `days` by `date_field`
+# and matching `filters` are deleted in small pk-range batches. 0 days = keep forever
+RETENTION_POLICIES = {
+    "notifications.Notification": {
+        "days": int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90")),
+        "date_field": "created_at",
+        "filters": {"status__in": ["SENT", "FAILED"]},
+    },
+    "payments.WebhookEvent": {
+        "days": int(os.getenv("WEBHOOK_EVENT_RETENTION_DAYS", "30")),
+        "date_field": "received_at",
+        "filters": {"processed_at__isnull": False},
+    },
+}
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_PAUSE_SECONDS = float(os.getenv("RETENTION_PAUSE_SECONDS", "0.1"))
+RETENTION_MAX_SECONDS_PER_RUN = float(os.getenv("RETENTION_MAX_SECONDS_PER_RUN", "300"))
+RETENTION_LOCK_TIMEOUT_MS = 2000
+
+# Daily sales rollups (orders.services.sales_rollup)
+# Re-scan window behind the high-water mark to catch late-committing orders
+SALES_ROLLUP_OVERLAP_SECONDS = int(os.getenv("SALES_ROLLUP_OVERLAP_SECONDS", "300"))
+SALES_ROLLUP_DAYS_PER_BATCH = 31
+
+# Deferred UroPay webhook processing (payments.tasks.process_webhook_events_task)
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+WEBHOOK_MAX_BATCHES_PER_RUN = 50
+
+# Stale INITIATED payment reconciliation (payments.services.reconciliation)
+PAYMENT_RECONCILE_AFTER_SECONDS = int(os.getenv("PAYMENT_RECONCILE_AFTER_SECONDS", "900"))
+PAYMENT_RECONCILE_MAX_PER_RUN = int(os.getenv("PAYMENT_RECONCILE_MAX_PER_RUN", "2000"))
+PAYMENT_RECONCILE_CHUNK_SIZE = 100
+# Keep workers <= UROPAY_MAX_CONCURRENT_CALLS or the bulkhead rejects the excess
+PAYMENT_RECONCILE_WORKERS = int(os.getenv("PAYMENT_RECONCILE_WORKERS", "4"))
+PAYMENT_RECONCILE_RATE_PER_SECOND = float(os.getenv("PAYMENT_RECONCILE_RATE_PER_SECOND", "10"))
+
+# On-disk cache for the columnar order-item report (orders.services.reporting)
+REPORTING_CACHE_DIR = Path(os.getenv("REPORTING_CACHE_DIR", BASE_DIR / "var" / "reporting"))
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -194,6 +317,69 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 # This is what users see in the "From" field
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "webmaster@localhost")
 
+# Each worker keeps one SMTP session open (notifications.adapters.email); a dead
+# socket must fail fast so it can be reopened instead of hanging the task
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "10"))
+SMS_TIMEOUT = int(os.getenv("SMS_TIMEOUT", "10"))
+EMAIL_CONNECTION_MAX_IDLE_SECONDS = int(os.getenv("EMAIL_CONNECTION_MAX_IDLE_SECONDS", "60"))
+
+# Per-channel policy for deliver_notification: retries back off exponentially
+# from retry_backoff to retry_backoff_max seconds; time_limit bounds one send.
+# A notification is FAILED after max_retries + 1 attempts on every path
+# (deliver_notification, batches, buffer flushes, redrives).
+# Thread-pool workers (the email, sms, merchant_webhooks and webhooks queues in
+# docker-compose.yml) ignore time_limit, so there each network call is bounded
+# by EMAIL_TIMEOUT, SMS_TIMEOUT and NOTIFICATION_WEBHOOK_TIMEOUT; keep those
+# below the channel's time_limit
+NOTIFICATION_CHANNEL_OPTIONS = {
+    "EMAIL": {"max_retries": 5, "retry_backoff": 30, "retry_backoff_max": 600, "time_limit": 30},
+    "SMS": {"max_retries": 5, "retry_backoff": 60, "retry_backoff_max": 900, "time_limit": 20},
+    "WEBHOOK": {"max_retries": 8, "retry_backoff": 15, "retry_backoff_max": 1800, "time_limit": 30},
+}
+
+# Merchant webhooks (notifications.adapters.webhook): pooled keep-alive
+# connections, at most N concurrent requests per endpoint per process, and up
+# to BATCH_SIZE events per request on the batched paths
+NOTIFICATION_WEBHOOK_TIMEOUT = float(os.getenv("NOTIFICATION_WEBHOOK_TIMEOUT", "5"))
+NOTIFICATION_WEBHOOK_POOL_SIZE = 20
+NOTIFICATION_WEBHOOK_MAX_CONCURRENCY_PER_ENDPOINT = int(os.getenv("NOTIFICATION_WEBHOOK_MAX_CONCURRENCY_PER_ENDPOINT", "4"))
+NOTIFICATION_WEBHOOK_SLOT_WAIT_SECONDS = 5.0
+NOTIFICATION_WEBHOOK_BATCH_SIZE = int(os.getenv("NOTIFICATION_WEBHOOK_BATCH_SIZE", "50"))
+NOTIFICATION_WEBHOOK_PARALLEL_REQUESTS = 8
+
+# Sending limits shared by all workers (notifications.rate_limit): token buckets
+# refilling at `rate` per second up to `burst`. Keys are channels ("EMAIL",
+# "SMS") or providers ("smtp:<EMAIL_HOST>", "sms:<SMS_PROVIDER>"); a send
+# takes a token from each configured bucket it belongs to
+NOTIFICATION_RATE_LIMIT_REDIS_URL = os.getenv("NOTIFICATION_RATE_LIMIT_REDIS_URL", CACHE_URL)
+NOTIFICATION_RATE_LIMITS = {
+    "smtp:smtp.gmail.com": {"rate": float(os.getenv("GMAIL_RATE_PER_SECOND", "1")), "burst": 20},
+    "sms:twilio": {"rate": float(os.getenv("TWILIO_RATE_PER_SECOND", "1")), "burst": 1},
+}
+# How far ahead deliver_notification may reserve a token and schedule itself;
+# keep well below the Redis broker's visibility timeout (1 hour)
+NOTIFICATION_RATE_LIMIT_MAX_WAIT_SECONDS = 300
+
+# Windowed notification batching (notifications.tasks.enqueue_notification):
+# events are buffered and flushed per channel when the window closes or the
+# batch is full, instead of one send_notification task per event
+NOTIFICATION_BATCHING = os.getenv("NOTIFICATION_BATCHING") == "True"
+NOTIFICATION_BATCH_WINDOW_MS = int(os.getenv("NOTIFICATION_BATCH_WINDOW_MS", "500"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "200"))
+
+# Per-order digests on these channels (comma-separated, e.g. "EMAIL,SMS"):
+# events for one order within the window go out as a single message
+NOTIFICATION_DIGEST_CHANNELS = [c for c in os.getenv("NOTIFICATION_DIGEST_CHANNELS", "").split(",") if c]
+NOTIFICATION_DIGEST_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_DIGEST_WINDOW_SECONDS", "10"))
+
+# Bulk SMS (notifications.adapters.sms_async): requests in flight and pooled
+# connections per dispatch, and the stub provider's simulated round trip
+SMS_ASYNC_CONCURRENCY = int(os.getenv("SMS_ASYNC_CONCURRENCY", "200"))
+SMS_ASYNC_POOL_SIZE = int(os.getenv("SMS_ASYNC_POOL_SIZE", "200"))
+SMS_ASYNC_TIMEOUT = int(os.getenv("SMS_ASYNC_TIMEOUT", "10"))
+SMS_STUB_LATENCY_MS = float(os.getenv("SMS_STUB_LATENCY_MS", "0"))
+SMS_BROADCAST_CHUNK_SIZE = int(os.getenv("SMS_BROADCAST_CHUNK_SIZE", "5000"))
+
 # Log file path
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(exist_ok=True)
@@ -0,0 +1,130 @@
+"""
+Tests for project-level configuration helpers.
+Covers the orjson renderer and parser, and the retention purge.
+"""
+import io
+import uuid
+import datetime
+import pytest
+from decimal import Decimal
+
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from config.parsers import ORJSONParser
+from config.retention import purge_all, purge_expired
+from config.renderers import ORJSONRenderer
+from notifications.models import Notification
+from orders.api.serializers import OrderResponseSerializer
+from payments.models import WebhookEvent
+
+
+orjson = pytest.importorskip("orjson")
+
+
+# ============================================================================
+# RENDERER TESTS (5 tests)
+# ============================================================================
+
+class TestORJSONRenderer:
+    """ORJSONRenderer must produce the same bytes as DRF's JSONRenderer."""
+
+    def test_matches_drf_for_serializer_output(self, order_with_items):
+        """Test serializer data renders byte-identically."""
+        data = OrderResponseSerializer(order_with_items).data
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_matches_drf_for_native_types(self):
+        """Test Decimal, datetime, date, UUID and unicode match DRF."""
+        data = {
+            "amount": Decimal("199.98"),
+            "aware": timezone.now(),
+            "naive": datetime.datetime(2026, 1, 20, 10, 30, 0, 123456),
+            "day": datetime.date(2026, 1, 20),
+            "uuid": uuid.uuid4(),
+            "text": "\u20b9 \u2028 \u2029",
+            1: None,
+        }
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_and_none(self):
+        """Test indent=2 pretty-printing and empty body for None."""
+        assert ORJSONRenderer().render(None) == b""
+        out = ORJSONRenderer().render({"a": [1]}, "application/json; indent=2")
+        assert out == JSONRenderer().render({"a": [1]}, "application/json; indent=2")
+
+    def test_non_finite_numbers_raise_like_drf(self):
+        """Test NaN/Infinity raise ValueError as in DRF instead of rendering as null."""
+        for value in (float("nan"), float("inf"), Decimal("-Infinity")):
+            data = {"ok": None, "rows": [{"value": value}]}
+            with pytest.raises(ValueError):
+                JSONRenderer().render(data)
+            with pytest.raises(ValueError):
+                ORJSONRenderer().render(data)
+
+    def test_big_integers_match_drf(self):
+        """Test integers wider than 64 bits render instead of failing in orjson."""
+        data = {"big": 2 ** 64, "negative": -(2 ** 70)}
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+# ============================================================================
+# PARSER TESTS (2 tests)
+# ============================================================================
+
+class TestORJSONParser:
+    """Tests for ORJSONParser."""
+
+    def test_parse_matches_drf(self):
+        """Test parsed payloads equal the stdlib parser's result."""
+        body = '{"order_id": 42, "note": "₹", "items": [1.5, null, true]}'.encode()
+        assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+    def test_parse_error(self):
+        """Test malformed JSON raises ParseError."""
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{not json"))
+
+
+# ============================================================================
+# RETENTION TESTS (2 tests)
+# ============================================================================
+
+class TestRetentionPurge:
+    """Tests for the chunked retention purge."""
+
+    def test_purges_expired_rows_in_batches(self, order):
+        """Test only expired rows matching the policy filter go, batch by batch."""
+        old = timezone.now() - datetime.timedelta(days=100)
+        rows = Notification.objects.bulk_create(
+            Notification(order=order, channel="EMAIL", payload={}, status=status)
+            for status in ["SENT"] * 4 + ["FAILED", "PENDING", "SENT"]
+        )
+        Notification.objects.filter(pk__in=[n.pk for n in rows[:6]]).update(created_at=old)
+
+        result = purge_expired(
+            "notifications.Notification", days=90, date_field="created_at",
+            filters={"status__in": ["SENT", "FAILED"]}, batch_size=2, pause=0,
+        )
+        assert (result.deleted, result.batches, result.incomplete) == (5, 3, False)
+        assert result.per_second > 0
+        assert sorted(Notification.objects.values_list("pk", flat=True)) == [rows[5].pk, rows[6].pk]
+
+    def test_purge_all_applies_policies_within_budget(self, db, settings):
+        """Test unprocessed webhook events are kept and an exhausted time budget leaves work for later."""
+        old = timezone.now() - datetime.timedelta(days=31)
+        for n, processed in enumerate([True, True, False]):
+            WebhookEvent.objects.create(webhook_id=f"wh-{n}", payload={}, processed_at=timezone.now() if processed else None)
+        WebhookEvent.objects.update(received_at=old)
+        policies = {"payments.WebhookEvent": {"days": 30, "date_field": "received_at", "filters": {"processed_at__isnull": False}}}
+
+        settings.RETENTION_MAX_SECONDS_PER_RUN = 0
+        [result] = purge_all(policies)
+        assert (result.deleted, result.incomplete) == (0, True)
+
+        settings.RETENTION_MAX_SECONDS_PER_RUN = 60
+        [result] = purge_all(policies)
+        assert (result.deleted, result.incomplete) == (2, False)
+        assert list(WebhookEvent.objects.values_list("webhook_id", flat=True)) == ["wh-2"]
@@ -23,6 +23,7 @@ urlpatterns = [
     path("api/accounts/", include("accounts.urls")),
     path("api/orders/", include("orders.api.urls")),
     path("api/payments/", include("payments.api.urls")),
+    path("api/notifications/", include("notifications.api.urls")),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
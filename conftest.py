@@ -353,6 +353,33 @@ def mock_payment_provider(mocker):
     return instance
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache (circuit breaker state, counters)."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def rate_limit_buckets():
+    """Start every test with full per-process notification rate-limit buckets."""
+    from notifications import rate_limit
+    rate_limit.reset_local_buckets()
+    yield
+    rate_limit.reset_local_buckets()
+
+
+@pytest.fixture(autouse=True)
+def qr_blob_storage(settings):
+    """Keep payment QR blobs in memory so tests never write to var/payment_qr."""
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "payment_qr": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+
+
 @pytest.fixture
 def mock_email_backend(settings):
     """Configure email backend for testing."""
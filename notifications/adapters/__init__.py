@@ -1,4 +1,6 @@
 from .email import EmailAdapter
 from .sms import SmsAdapter
+from .sms_async import AsyncSmsDispatcher
+from .webhook import WebhookAdapter
 
-__all__ = ["EmailAdapter", "SmsAdapter"]
+__all__ = ["AsyncSmsDispatcher", "EmailAdapter", "SmsAdapter", "WebhookAdapter"]
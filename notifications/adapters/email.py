@@ -1,13 +1,125 @@
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
 import logging
+import os
+import smtplib
+import threading
+import time
+
+from notifications import rate_limit
 
 logger = logging.getLogger(__name__)
 
+# Errors after which the SMTP session is unusable and worth one reconnect.
+# Anything else (e.g. a refused recipient) is a problem with the message.
+_TRANSPORT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+_local = threading.local()
+
+
+def _shared_connection():
+    """This worker thread's long-lived email connection."""
+    backend = settings.EMAIL_BACKEND
+    max_idle = getattr(settings, "EMAIL_CONNECTION_MAX_IDLE_SECONDS", 60)
+    connection = getattr(_local, "connection", None)
+    if connection is not None and (
+        _local.backend != backend or time.monotonic() - _local.last_used > max_idle
+    ):
+        # Servers drop idle sessions; start a fresh one rather than fail on the next send
+        close_connection()
+        connection = None
+    if connection is None:
+        connection = get_connection(backend)
+        # Opened here, not by send_messages(), which would close it again after each call
+        connection.open()
+        _local.connection = connection
+        _local.backend = backend
+    _local.last_used = time.monotonic()
+    return connection
+
+
+def close_connection() -> None:
+    connection = getattr(_local, "connection", None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Error closing email connection", exc_info=True)
+
+
+if hasattr(os, "register_at_fork"):
+    # A forked worker must not share the parent's SMTP socket
+    os.register_at_fork(after_in_child=lambda: setattr(_local, "connection", None))
+
+
+def send_messages(messages):
+    """Send `messages` over the shared connection; return one exception (or None) per message.
+
+    A dropped session is reopened once per message, so a server that closed an
+    idle connection costs a reconnect rather than a failed notification.
+    """
+    results = []
+    for message in messages:
+        for attempt in (1, 2):
+            try:
+                _shared_connection().send_messages([message])
+            except _TRANSPORT_ERRORS as exc:
+                close_connection()
+                if attempt == 2:
+                    results.append(exc)
+                    break
+                logger.info("Email connection lost (%s); reconnecting", exc)
+            except Exception as exc:
+                results.append(exc)
+                break
+            else:
+                results.append(None)
+                break
+    return results
+
+
+# Headlines for the events listed in a digest
+EVENT_TITLES = {
+    'order.created': "Order placed",
+    'payment.succeeded': "Payment received",
+    'payment.confirmed': "Payment confirmed",
+}
+
+
 class EmailAdapter:
-    def send(self, order, event, payload) -> str:
+    @staticmethod
+    def build_context(order, payload) -> dict:
+        """Plain values for the templates, so rendering never touches the ORM.
+
+        Load the order with `select_related("user")` and
+        `prefetch_related("items")` to build this without extra queries.
+        """
+        items = [
+            {
+                "product_name": item.product_name,
+                "quantity": item.quantity,
+                "price": item.price,
+                "line_total": item.line_total,
+            }
+            for item in order.items.all()
+        ]
+        return {
+            "order_id": order.id,
+            "customer_name": order.user.first_name,
+            "status_display": order.get_status_display(),
+            "total_amount": order.total_amount,
+            "items": items,
+            "payload": payload,
+            "events": [
+                {"event": event, "title": EVENT_TITLES.get(event, event)}
+                for event in payload.get("events", [])
+            ],
+        }
+
+    def build_message(self, order, event, payload) -> EmailMultiAlternatives:
         recipient = getattr(order.user, 'email', None)
         if not recipient:
             logger.warning('No email recipient for order %s', order.pk)
@@ -27,8 +139,14 @@ class EmailAdapter:
         }
         subject = subject_map.get(event, f"Update on Order #{order.id}")
 
+        # A digest (several events merged, see NOTIFICATION_DIGEST_CHANNELS) lists them all
+        if len(payload.get('events', [])) > 1:
+            template_name = 'notifications/digest.html'
+            titles = [EVENT_TITLES.get(e, e) for e in payload['events']]
+            subject = f"Order #{order.id}: {', '.join(titles)}"
+
         # 3. Render HTML and create a plain-text fallback
-        context = {'order': order, 'payload': payload}
+        context = self.build_context(order, payload)
         html_content = render_to_string(template_name, context)
         text_content = strip_tags(html_content) # Fallback for old email clients
 
@@ -40,6 +158,26 @@ class EmailAdapter:
             [recipient]
         )
         msg.attach_alternative(html_content, "text/html")
-        msg.send()
+        return msg
+
+    @staticmethod
+    def rate_limit_keys() -> list:
+        """Buckets a send draws from (`notifications.rate_limit`)."""
+        keys = ['EMAIL']
+        if settings.EMAIL_BACKEND == 'django.core.mail.backends.smtp.EmailBackend':
+            keys.append(f"smtp:{settings.EMAIL_HOST}")
+        return keys
 
-        return f"email:{order.pk}:{event}"
\ No newline at end of file
+    def deliver(self, order, event, payload) -> str:
+        """Send without consulting the rate limits (the caller holds a token)."""
+        msg = self.build_message(order, event, payload)
+        error = send_messages([msg])[0]
+        if error is not None:
+            raise error
+
+        return f"email:{order.pk}:{event}"
+
+    def send(self, order, event, payload) -> str:
+        """Send one email, or raise `RateLimited` if the sending limits are used up."""
+        rate_limit.consume(self.rate_limit_keys())
+        return self.deliver(order, event, payload)
@@ -1,41 +1,97 @@
 import os
 import logging
+import threading
+import time
+
+from django.conf import settings
+
+from notifications import rate_limit
+from notifications.adapters.sms_async import SmsMessage
 
 logger = logging.getLogger(__name__)
 
+_twilio_client = None
+_twilio_lock = threading.Lock()
+
+
+def _get_twilio_client():
+    """This process's Twilio client, so its HTTP session is reused across sends.
+
+    Requests time out after `SMS_TIMEOUT`: the thread-pool workers that run
+    the sms queue do not enforce the channel's task `time_limit`.
+    """
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_lock:
+            if _twilio_client is None:
+                from twilio.http.http_client import TwilioHttpClient
+                from twilio.rest import Client
+
+                _twilio_client = Client(
+                    os.getenv('TWILIO_ACCOUNT_SID'),
+                    os.getenv('TWILIO_AUTH_TOKEN'),
+                    http_client=TwilioHttpClient(timeout=getattr(settings, 'SMS_TIMEOUT', 10)),
+                )
+    return _twilio_client
+
+
+def _reset_twilio_client_after_fork() -> None:
+    global _twilio_client, _twilio_lock
+    _twilio_client = None
+    _twilio_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_twilio_client_after_fork)
+
 
 class SmsAdapter:
     def __init__(self):
         # Placeholder for provider setup (e.g., Twilio)
         self.provider = os.getenv('SMS_PROVIDER', '')
 
+    def rate_limit_keys(self) -> list:
+        """Buckets a send draws from (`notifications.rate_limit`)."""
+        return ['SMS', f"sms:{self.provider}"] if self.provider else ['SMS']
+
     def send(self, order, event, payload) -> str:
-        """Send an SMS. This is a minimal provider-agnostic stub.
+        """Send one SMS, or raise `RateLimited` if the sending limits are used up."""
+        rate_limit.consume(self.rate_limit_keys())
+        return self.deliver(order, event, payload)
 
-        If `SMS_PROVIDER` and credentials are configured, integrate a real client.
-        """
+    @staticmethod
+    def build_message(order, event, payload) -> SmsMessage:
         phone = getattr(order.user, 'phone_number', None)
         if not phone:
             logger.warning('No phone number for order %s', order.pk)
             raise RuntimeError('No phone number')
 
-        message = f"[{event}] Order {order.order_number}"
+        # A digest names every event it covers
+        events = payload.get('events') or [event]
+        return SmsMessage(
+            to=phone,
+            body=f"[{', '.join(events)}] Order #{order.pk}",
+            reference=f"{order.pk}:{event}",
+        )
+
+    def deliver(self, order, event, payload) -> str:
+        """Send an SMS with one blocking provider call.
+
+        Bulk sends go through `notifications.adapters.sms_async` instead.
+        """
+        message = self.build_message(order, event, payload)
 
         # If no provider configured, just log (useful in development)
         if not self.provider:
-            logger.info('SMS stub send to %s: %s', phone, message)
-            return f"sms:stub:{order.pk}:{event}"
+            time.sleep(getattr(settings, 'SMS_STUB_LATENCY_MS', 0) / 1000)
+            logger.info('SMS stub send to %s: %s', message.to, message.body)
+            return f"sms:stub:{message.reference}"
 
-        # Example: integrate Twilio here using env vars if provider == 'twilio'
         if self.provider == 'twilio':
             try:
-                from twilio.rest import Client
-
-                account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-                auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-                from_number = os.getenv('TWILIO_FROM')
-                client = Client(account_sid, auth_token)
-                resp = client.messages.create(body=message, from_=from_number, to=phone)
+                resp = _get_twilio_client().messages.create(
+                    body=message.body, from_=os.getenv('TWILIO_FROM'), to=message.to,
+                )
                 return str(resp.sid)
             except Exception as exc:
                 logger.exception('Twilio send failed')
@@ -0,0 +1,129 @@
+"""
+asyncio SMS dispatch for bulk sends (SMS batches, broadcasts).
+
+`dispatch(messages)` sends a list of SMS from synchronous code, such as a
+Celery task. Up to `SMS_ASYNC_CONCURRENCY` requests are in flight at once over
+one aiohttp connection pool of `SMS_ASYNC_POOL_SIZE` keep-alive connections.
+One worker process can therefore keep hundreds of provider calls going where
+`SmsAdapter.deliver` makes one blocking call at a time.
+
+Without `SMS_PROVIDER` the stub answers after `SMS_STUB_LATENCY_MS`, so
+throughput can be measured without network access
+(`benchmarks/bench_sms_dispatch.py`).
+"""
+import asyncio
+import logging
+import os
+import weakref
+from dataclasses import dataclass
+from typing import List, Sequence, Union
+
+import aiohttp
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SmsDeliveryError(Exception):
+    """The SMS provider did not accept a message."""
+
+
+@dataclass(frozen=True)
+class SmsMessage:
+    to: str
+    body: str
+    # Identifies the message in stub external ids, e.g. "<order id>:<event>"
+    reference: str = ""
+
+
+# aiohttp sessions are bound to an event loop, so the pool is per loop
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def _get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=getattr(settings, "SMS_ASYNC_POOL_SIZE", 200),
+            keepalive_timeout=30,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=getattr(settings, "SMS_ASYNC_TIMEOUT", 10)),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_session() -> None:
+    """Close the running loop's SMS session."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class AsyncSmsDispatcher:
+    def __init__(self, provider: str | None = None, concurrency: int | None = None):
+        self.provider = os.getenv('SMS_PROVIDER', '') if provider is None else provider
+        self.concurrency = concurrency or getattr(settings, "SMS_ASYNC_CONCURRENCY", 200)
+
+    async def send(self, message: SmsMessage) -> str:
+        """Send one SMS; return the provider's message id."""
+        if not self.provider:
+            # Stand-in for a provider round trip
+            await asyncio.sleep(getattr(settings, "SMS_STUB_LATENCY_MS", 0) / 1000)
+            logger.debug('SMS stub send to %s: %s', message.to, message.body)
+            return f"sms:stub:{message.reference}"
+
+        if self.provider == 'twilio':
+            return await self._send_twilio(message)
+
+        logger.error('Unknown SMS_PROVIDER configured: %s', self.provider)
+        raise RuntimeError('Unknown SMS provider')
+
+    async def _send_twilio(self, message: SmsMessage) -> str:
+        account_sid = os.getenv('TWILIO_ACCOUNT_SID', '')
+        base_url = os.getenv('TWILIO_API_BASE_URL', 'https://api.twilio.com')
+        url = f"{base_url}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        form = {"To": message.to, "From": os.getenv('TWILIO_FROM', ''), "Body": message.body}
+        auth = aiohttp.BasicAuth(account_sid, os.getenv('TWILIO_AUTH_TOKEN', ''))
+        async with _get_session().post(url, data=form, auth=auth) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status >= 300:
+                raise SmsDeliveryError(f"Twilio answered {resp.status}: {(data or {}).get('message', '')}")
+        return str(data["sid"])
+
+    async def send_many(self, messages: Sequence[SmsMessage]) -> List[Union[str, Exception]]:
+        """Send `messages`; return one message id or exception per message, in order.
+
+        A fixed set of `concurrency` workers pulls from the list, so memory
+        stays flat however many messages there are.
+        """
+        results: List[Union[str, Exception]] = [None] * len(messages)
+        pending = iter(enumerate(messages))
+
+        async def worker():
+            for index, message in pending:
+                try:
+                    results[index] = await self.send(message)
+                except Exception as exc:
+                    logger.warning('SMS to %s failed: %s', message.to, exc)
+                    results[index] = exc
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(messages)))))
+        return results
+
+
+def dispatch(messages: Sequence[SmsMessage], **kwargs) -> List[Union[str, Exception]]:
+    """Send `messages` from synchronous code; see `AsyncSmsDispatcher.send_many`."""
+    if not messages:
+        return []
+
+    async def run():
+        try:
+            return await AsyncSmsDispatcher(**kwargs).send_many(messages)
+        finally:
+            await close_session()
+
+    return asyncio.run(run())
@@ -0,0 +1,189 @@
+"""
+Order event webhooks to merchant endpoints (`User.webhook_url`).
+
+Each request carries a batch of events:
+
+    POST <webhook_url>
+    X-Webhook-Timestamp: 1760870000
+    X-Webhook-Signature: sha256=<hex HMAC-SHA256 of "<timestamp>.<body>" with webhook_secret>
+
+    {"events": [{"id": "order:42:payment.confirmed", "type": "payment.confirmed", ...}]}
+
+Receivers should check the signature and timestamp and de-duplicate on the
+event `id`, since a failed request is retried as a whole.
+
+Requests go through one keep-alive session per process. A per-endpoint
+bulkhead caps concurrent requests to one merchant, so a slow endpoint
+cannot take every worker thread.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from requests.adapters import HTTPAdapter
+
+from notifications import rate_limit
+from payments.clients.resilience import get_bulkhead
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDeliveryError(Exception):
+    """The endpoint did not accept a webhook request."""
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """This process's keep-alive session for webhook requests."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = getattr(settings, "NOTIFICATION_WEBHOOK_POOL_SIZE", 20)
+                # No transport retries: a failed batch is retried by the task with backoff
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_session() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _reset_session_after_fork() -> None:
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_session_after_fork)
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def post_events(url: str, secret: str, events: List[dict]) -> None:
+    """POST one signed batch of events; raise unless the endpoint answers 2xx."""
+    body = json.dumps({"events": events}, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "order-notifications-webhooks",
+        "X-Webhook-Timestamp": timestamp,
+        "X-Webhook-Signature": sign(secret, timestamp, body),
+    }
+    bulkhead = get_bulkhead(
+        "webhook",
+        getattr(settings, "NOTIFICATION_WEBHOOK_MAX_CONCURRENCY_PER_ENDPOINT", 4),
+        getattr(settings, "NOTIFICATION_WEBHOOK_SLOT_WAIT_SECONDS", 5.0),
+        key=f"webhook:{urlsplit(url).netloc}",
+    )
+    with bulkhead.acquire():
+        response = get_session().post(
+            url, data=body, headers=headers, timeout=getattr(settings, "NOTIFICATION_WEBHOOK_TIMEOUT", 5),
+        )
+    if not 200 <= response.status_code < 300:
+        raise WebhookDeliveryError(f"Webhook endpoint answered {response.status_code}")
+
+
+class WebhookAdapter:
+    @staticmethod
+    def rate_limit_keys() -> list:
+        """Buckets a send draws from (`notifications.rate_limit`)."""
+        return ['WEBHOOK']
+
+    @staticmethod
+    def build_event(order, event, payload) -> dict:
+        return {
+            "id": f"order:{order.pk}:{event}",
+            "type": event,
+            "created": int(time.time()),
+            "data": {
+                "order_id": order.pk,
+                "status": order.status,
+                "total_amount": order.total_amount,
+                "updated_at": order.updated_at,
+            },
+        }
+
+    def build_events(self, order, event, payload) -> List[dict]:
+        """Events for one notification; a digest is sent as the events it merged."""
+        return [self.build_event(order, e, payload) for e in payload.get("events") or [event]]
+
+    def deliver_many(self, items: List[Tuple]) -> List[Optional[Exception]]:
+        """Deliver `(order, event, payload)` items; return one exception (or None) per item.
+
+        Items for the same endpoint share requests of up to
+        `NOTIFICATION_WEBHOOK_BATCH_SIZE` events. Requests to different
+        endpoints go out in parallel.
+        """
+        results: List[Optional[Exception]] = [None] * len(items)
+        endpoints: Dict[Tuple[str, str], List[int]] = {}
+        for index, (order, event, payload) in enumerate(items):
+            url = getattr(order.user, 'webhook_url', '')
+            secret = getattr(order.user, 'webhook_secret', '')
+            if not url or not secret:
+                logger.warning('No webhook endpoint for order %s', order.pk)
+                results[index] = RuntimeError('No webhook endpoint')
+                continue
+            endpoints.setdefault((url, secret), []).append(index)
+
+        batch_size = getattr(settings, "NOTIFICATION_WEBHOOK_BATCH_SIZE", 50)
+        batches = [
+            (url, secret, indexes[start:start + batch_size])
+            for (url, secret), indexes in endpoints.items()
+            for start in range(0, len(indexes), batch_size)
+        ]
+
+        def post(batch):
+            url, secret, indexes = batch
+            try:
+                post_events(url, secret, [e for i in indexes for e in self.build_events(*items[i])])
+            except Exception as exc:
+                logger.warning('Webhook delivery to %s failed: %s', urlsplit(url).netloc, exc)
+                for i in indexes:
+                    results[i] = exc
+
+        if len(batches) == 1:
+            post(batches[0])
+        elif batches:
+            workers = min(len(batches), getattr(settings, "NOTIFICATION_WEBHOOK_PARALLEL_REQUESTS", 8))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(post, batches))
+        return results
+
+    def deliver(self, order, event, payload) -> str:
+        """Send without consulting the rate limits (the caller holds a token)."""
+        error = self.deliver_many([(order, event, payload)])[0]
+        if error is not None:
+            raise error
+
+        return f"webhook:{order.pk}:{event}"
+
+    def send(self, order, event, payload) -> str:
+        """Send one event, or raise `RateLimited` if the sending limits are used up."""
+        rate_limit.consume(self.rate_limit_keys())
+        return self.deliver(order, event, payload)
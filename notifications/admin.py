@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "order",
+        "channel",
+        "status",
+        "attempts",
+        "error_class",
+        "failed_at",
+        "created_at",
+    )
+    # status=FAILED + error_class is the dead-letter view; redrive with `manage.py redrive_notifications`
+    list_filter = ("status", "channel", "error_class")
+    search_fields = ("unique_key", "order__id")
+    raw_id_fields = ("order",)
+    readonly_fields = ("created_at", "sent_at", "failed_at", "task_id", "external_id")
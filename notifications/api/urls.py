@@ -0,0 +1,7 @@
+from django.urls import path
+
+from notifications.api.views import DeadLetterView
+
+urlpatterns = [
+    path("dead-letters/", DeadLetterView.as_view(), name="notification-dead-letters"),
+]
@@ -0,0 +1,24 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from notifications.models import Notification
+from notifications.services.dead_letters import dead_letter_groups
+
+
+class DeadLetterView(APIView):
+    """FAILED notifications grouped by channel and error class (staff only).
+
+    Optional `?channel=` narrows the summary. Redrive a group with
+    `manage.py redrive_notifications --channel <channel> --error-class <error_class>`.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        qs = Notification.objects.all()
+        channel = request.query_params.get("channel")
+        if channel:
+            qs = qs.filter(channel=channel)
+        groups = dead_letter_groups(qs)
+        return Response({"total": sum(group["count"] for group in groups), "groups": groups})
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from notifications.models import Notification
+from notifications.services.dead_letters import dead_letter_groups, redrive_notifications
+
+
+def _aware(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def _csv(value: str) -> list:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-enqueue FAILED notifications through the batching path in rate-limited chunks. "
+        "Redriven rows leave the FAILED set as each chunk commits, so an interrupted run "
+        "continues where it stopped when run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--channel", type=_csv, help="Comma-separated channels (EMAIL,SMS,WEBHOOK).")
+        parser.add_argument("--error-class", type=_csv, help="Comma-separated error classes, as in the dead-letter view.")
+        parser.add_argument("--since", type=_aware, help="failed_at >= this (ISO datetime).")
+        parser.add_argument("--until", type=_aware, help="failed_at < this (ISO datetime).")
+        parser.add_argument("--ids", help="Comma-separated Notification ids.")
+        parser.add_argument("--all", action="store_true", help="Redrive every FAILED notification.")
+        parser.add_argument("--chunk-size", type=int, default=200)
+        parser.add_argument("--rate", type=float, default=50.0, help="Notifications per second (0 = unlimited).")
+        parser.add_argument("--dry-run", action="store_true", help="Show what would be redriven without writing.")
+
+    def handle(self, *args, **options):
+        qs = Notification.objects.filter(status=Notification.Status.FAILED)
+        if options["channel"]:
+            qs = qs.filter(channel__in=options["channel"])
+        if options["error_class"]:
+            qs = qs.filter(error_class__in=options["error_class"])
+        if options["since"]:
+            qs = qs.filter(failed_at__gte=options["since"])
+        if options["until"]:
+            qs = qs.filter(failed_at__lt=options["until"])
+        if options["ids"]:
+            try:
+                qs = qs.filter(pk__in=[int(i) for i in _csv(options["ids"])])
+            except ValueError:
+                raise CommandError("--ids must be comma-separated integers")
+        if not options["all"] and not any(
+            options[k] for k in ("channel", "error_class", "since", "until", "ids")
+        ):
+            raise CommandError("Select notifications (--channel, --error-class, --since/--until, --ids) or pass --all.")
+        if options["chunk_size"] < 1 or options["rate"] < 0:
+            raise CommandError("--chunk-size must be positive and --rate not negative")
+
+        for group in dead_letter_groups(qs):
+            self.stdout.write(f"  {group['channel']:<8} {group['error_class'] or '-':<32} {group['count']}")
+
+        def progress(result):
+            if result.chunks % 10 == 0:
+                self.stdout.write(f"  {result.selected} selected, {result.per_second:.0f}/s")
+
+        result = redrive_notifications(
+            qs,
+            chunk_size=options["chunk_size"],
+            rate=options["rate"],
+            dry_run=options["dry_run"],
+            progress=progress,
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"[dry run] would redrive {result.selected} notifications")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"redriven={result.redriven} of {result.selected} selected in {result.chunks} chunks "
+            f"({result.per_second:.0f}/s)"
+        ))
@@ -28,6 +28,10 @@ class Notification(models.Model):
     )
     payload = models.JSONField()
     error_message = models.TextField(blank=True, null=True)
+    # Exception class of the last failed attempt; groups the dead-letter view
+    error_class = models.CharField(max_length=100, blank=True, default="")
+    # When the notification ran out of attempts (status FAILED)
+    failed_at = models.DateTimeField(blank=True, null=True)
     attempts = models.IntegerField(default=0)
     task_id = models.CharField(max_length=200, blank=True, null=True)
     external_id = models.CharField(max_length=200, blank=True, null=True)
@@ -36,10 +40,37 @@ class Notification(models.Model):
     sent_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
-        return f"{self.channel} | {self.order.order_number}"
+        return f"{self.channel} | Order #{self.order_id}"
 
     class Meta:
         # combination of unique_key + channel enforces idempotency per-channel
         constraints = [
             models.UniqueConstraint(fields=["unique_key", "channel"], name="unique_notification_per_channel", condition=models.Q(unique_key__isnull=False)),
         ]
+        indexes = [
+            # Dead letters only: grouping by error class and keyset redrive stay cheap
+            models.Index(
+                fields=["channel", "error_class", "id"],
+                name="notification_failed_idx",
+                condition=models.Q(status="FAILED"),
+            ),
+        ]
+
+
+class BufferedNotification(models.Model):
+    """An order event waiting for the next batch flush (NOTIFICATION_BATCHING).
+
+    One row per channel. The flusher turns rows into `Notification`s and
+    deletes them, so the table only holds the current window.
+    """
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="+")
+    unique_key = models.CharField(max_length=255, blank=True, null=True)
+    channel = models.CharField(max_length=20, choices=Notification.Channel.choices)
+    event = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["channel", "id"], name="bufferednotif_channel_idx"),
+        ]
@@ -0,0 +1,200 @@
+"""
+Token-bucket sending limits shared by every worker.
+
+Limits come from `NOTIFICATION_RATE_LIMITS`: `{key: {"rate": per second,
+"burst": bucket size}}`. A key names a channel (`"EMAIL"`, `"SMS"`) or a
+provider (`"smtp:<host>"`, `"sms:<SMS_PROVIDER>"`). A send needs one token
+from every configured bucket it belongs to, so a provider limit holds across
+channels and a channel limit across providers.
+
+With `NOTIFICATION_RATE_LIMIT_REDIS_URL` set, buckets live in Redis and are
+updated by one Lua script, so a check across several buckets is atomic.
+Otherwise, or while Redis is unreachable, each process keeps its own buckets.
+
+Besides taking a token now, a caller can reserve one up to `max_wait` seconds
+ahead. The bucket then goes into debt and the caller learns exactly when its
+token is due. That lets a task defer itself to that moment instead of
+retrying blindly and racing every other deferred task for the next token.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+KEY_PREFIX = "ratelimit:"
+
+
+class RateLimited(Exception):
+    """No token available; try again in `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited; retry in {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+# KEYS: bucket keys. ARGV: tokens, max_wait, partial, then rate and burst per key.
+# Returns {granted, wait}; wait as a string since Lua numbers become integers.
+_TAKE_SCRIPT = """
+local tokens = tonumber(ARGV[1])
+local max_wait = tonumber(ARGV[2])
+local partial = ARGV[3] == '1'
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rates, bursts, levels = {}, {}, {}
+for i, key in ipairs(KEYS) do
+  rates[i] = tonumber(ARGV[2 + 2 * i])
+  bursts[i] = tonumber(ARGV[3 + 2 * i])
+  local state = redis.call('HMGET', key, 'level', 'ts')
+  local level = tonumber(state[1]) or bursts[i]
+  local ts = tonumber(state[2]) or now
+  levels[i] = math.min(bursts[i], level + math.max(0, now - ts) * rates[i])
+end
+local granted, wait = tokens, 0
+if partial then
+  for i = 1, #KEYS do
+    granted = math.max(0, math.min(granted, math.floor(levels[i])))
+  end
+  if granted < tokens then
+    for i = 1, #KEYS do
+      local need = math.min(tokens - granted, bursts[i])
+      wait = math.max(wait, (need - (levels[i] - granted)) / rates[i])
+    end
+  end
+else
+  for i = 1, #KEYS do
+    wait = math.max(wait, (tokens - levels[i]) / rates[i])
+  end
+  if wait > max_wait then
+    granted, wait = 0, wait - max_wait
+  end
+end
+for i, key in ipairs(KEYS) do
+  local level = levels[i] - granted
+  redis.call('HSET', key, 'level', tostring(level), 'ts', tostring(now))
+  redis.call('EXPIRE', key, math.ceil((bursts[i] - level) / rates[i]) + 1)
+end
+return {granted, tostring(wait)}
+"""
+
+_redis_script = None
+_local_buckets: Dict[str, Tuple[float, float]] = {}
+_local_lock = threading.Lock()
+
+
+def _limits(keys: Iterable[str]) -> List[Tuple[str, float, float]]:
+    configured = getattr(settings, "NOTIFICATION_RATE_LIMITS", {})
+    limits = []
+    for key in dict.fromkeys(keys):
+        limit = configured.get(key) if key else None
+        if limit and limit.get("rate", 0) > 0:
+            limits.append((key, float(limit["rate"]), max(1.0, float(limit.get("burst", 1)))))
+    return limits
+
+
+def _redis_url():
+    return getattr(settings, "NOTIFICATION_RATE_LIMIT_REDIS_URL", None)
+
+
+def _take_redis(limits, tokens: int, max_wait: float, partial: bool) -> Tuple[int, float]:
+    global _redis_script
+    if _redis_script is None:
+        import redis
+
+        _redis_script = redis.Redis.from_url(_redis_url()).register_script(_TAKE_SCRIPT)
+    args = [tokens, max_wait, int(partial)]
+    for _, rate, burst in limits:
+        args += [rate, burst]
+    granted, wait = _redis_script(keys=[f"{KEY_PREFIX}{key}" for key, _, _ in limits], args=args)
+    return int(granted), float(wait)
+
+
+def _take_local(limits, tokens: int, max_wait: float, partial: bool) -> Tuple[int, float]:
+    # Same arithmetic as _TAKE_SCRIPT, on this process's buckets
+    with _local_lock:
+        now = time.monotonic()
+        levels = []
+        for key, rate, burst in limits:
+            level, ts = _local_buckets.get(key, (burst, now))
+            levels.append(min(burst, level + max(0.0, now - ts) * rate))
+        granted, wait = tokens, 0.0
+        if partial:
+            for level in levels:
+                granted = max(0, min(granted, math.floor(level)))
+            if granted < tokens:
+                for (_, rate, burst), level in zip(limits, levels):
+                    need = min(tokens - granted, burst)
+                    wait = max(wait, (need - (level - granted)) / rate)
+        else:
+            for (_, rate, _), level in zip(limits, levels):
+                wait = max(wait, (tokens - level) / rate)
+            if wait > max_wait:
+                granted, wait = 0, wait - max_wait
+        for (key, _, _), level in zip(limits, levels):
+            _local_buckets[key] = (level - granted, now)
+    return granted, wait
+
+
+def _take(keys, tokens: int, max_wait: float = 0.0, partial: bool = False) -> Tuple[int, float]:
+    limits = _limits(keys)
+    if not limits:
+        return tokens, 0.0
+    if _redis_url():
+        try:
+            return _take_redis(limits, tokens, max_wait, partial)
+        except Exception as exc:
+            logger.warning("Rate limiter Redis unavailable (%s); using per-process buckets", exc)
+    return _take_local(limits, tokens, max_wait, partial)
+
+
+def reserve(keys: Iterable[str], *, max_wait: float) -> Tuple[bool, float]:
+    """Reserve one token from each bucket, at most `max_wait` seconds ahead.
+
+    Returns `(True, wait)` with the reserved token usable after `wait`
+    seconds (0 = now), or `(False, wait)` when even a reservation would be
+    further out than `max_wait`. Then nothing is taken and `wait` is how long
+    until a reservation fits.
+    """
+    granted, wait = _take(keys, 1, max_wait=max_wait)
+    return bool(granted), wait
+
+
+def consume(keys: Iterable[str]) -> None:
+    """Take one token now, or raise `RateLimited`."""
+    granted, wait = _take(keys, 1)
+    if not granted:
+        raise RateLimited(wait)
+
+
+def take_up_to(keys: Iterable[str], count: int) -> Tuple[int, float]:
+    """Take as many of `count` tokens as are available now, for a batch.
+
+    Returns `(granted, wait)`, where `wait` is how long until the rest (up to
+    one bucket's worth) is available. `wait` is 0 when everything was granted.
+    """
+    if count <= 0:
+        return 0, 0.0
+    return _take(keys, count, partial=True)
+
+
+def reset_local_buckets() -> None:
+    with _local_lock:
+        _local_buckets.clear()
+
+
+def _reset_after_fork() -> None:
+    global _local_lock, _redis_script
+    _local_buckets.clear()
+    _local_lock = threading.Lock()
+    # redis-py connections must not be shared with the parent
+    _redis_script = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,139 @@
+"""
+Dead-lettered notifications: rows that ran out of attempts (status FAILED).
+
+`dead_letter_groups` summarises them by channel and error class for the
+dead-letter view. `redrive_notifications` puts a selection back through the
+batching path in rate-limited chunks.
+
+Each chunk is flipped back to PENDING and written to the notification buffer
+in one transaction, and the buffer flush does the sending. A redriven row
+therefore stops matching the FAILED selection the moment its chunk commits.
+An interrupted run resumes where it stopped when the same command is run
+again. If the process dies before scheduling the flush, the beat sweep
+(`flush-notification-buffers`) still delivers the chunk.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from notifications.models import BufferedNotification, Notification
+
+
+def dead_letter_groups(queryset=None) -> List[Dict]:
+    """FAILED notifications grouped by channel and error class, largest group first."""
+    queryset = Notification.objects.all() if queryset is None else queryset
+    return list(
+        queryset.filter(status=Notification.Status.FAILED)
+        .values("channel", "error_class")
+        .annotate(
+            count=Count("id"),
+            first_failed_at=Min("failed_at"),
+            last_failed_at=Max("failed_at"),
+            latest_id=Max("id"),
+        )
+        .order_by("-count", "channel", "error_class")
+    )
+
+
+@dataclass
+class RedriveResult:
+    selected: int = 0
+    redriven: int = 0
+    chunks: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.redriven / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def _buffer_key(notification_id: int, unique_key: Optional[str], channel: str) -> str:
+    # The flush looks rows up by "<buffer key>:<channel>", the form send_notification writes
+    suffix = f":{channel}"
+    if unique_key and unique_key.endswith(suffix):
+        return unique_key[: -len(suffix)]
+    return f"redrive:{notification_id}"
+
+
+def _redrive_chunk(ids: List[int]) -> Dict[str, int]:
+    """Flip one chunk back to PENDING and buffer it; return redriven counts per channel."""
+    from notifications.tasks import _schedule_flush
+
+    with transaction.atomic():
+        rows = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=ids, status=Notification.Status.FAILED)
+            .values_list("pk", "unique_key", "channel", "order_id", "payload")
+        )
+        if not rows:
+            return {}
+        buffered, rekeyed = [], []
+        for pk, unique_key, channel, order_id, payload in rows:
+            key = _buffer_key(pk, unique_key, channel)
+            if unique_key != f"{key}:{channel}":
+                rekeyed.append((pk, f"{key}:{channel}"))
+            buffered.append(BufferedNotification(
+                unique_key=key, order_id=order_id, channel=channel, event=(payload or {}).get("event", ""),
+            ))
+        Notification.objects.filter(pk__in=[row[0] for row in rows]).update(
+            status=Notification.Status.PENDING, attempts=0, error_class="", failed_at=None,
+        )
+        for pk, unique_key in rekeyed:
+            Notification.objects.filter(pk=pk).update(unique_key=unique_key)
+        BufferedNotification.objects.bulk_create(buffered)
+
+        per_channel: Dict[str, int] = {}
+        for _, _, channel, _, _ in rows:
+            per_channel[channel] = per_channel.get(channel, 0) + 1
+
+        def schedule():
+            for channel, count in per_channel.items():
+                _schedule_flush([channel], count)
+
+        transaction.on_commit(schedule)
+    return per_channel
+
+
+def redrive_notifications(
+    queryset,
+    *,
+    chunk_size: int = 200,
+    rate: float = 0.0,
+    dry_run: bool = False,
+    progress: Optional[Callable[[RedriveResult], None]] = None,
+) -> RedriveResult:
+    """Re-enqueue the FAILED notifications in `queryset` through the batching path.
+
+    Ids are walked in primary-key order, `chunk_size` at a time. With
+    `rate`, chunks are spaced so no more than `rate` notifications per second
+    are handed to the flusher.
+    """
+    result = RedriveResult()
+    started = time.monotonic()
+    # Rows that fail again during this run are left for the next one
+    failed = queryset.filter(status=Notification.Status.FAILED).filter(
+        Q(failed_at__isnull=True) | Q(failed_at__lte=timezone.now())
+    )
+    last_id = 0
+    while True:
+        chunk_started = time.monotonic()
+        ids = list(failed.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        result.selected += len(ids)
+        result.chunks += 1
+        if not dry_run:
+            result.redriven += sum(_redrive_chunk(ids).values())
+        result.elapsed_seconds = time.monotonic() - started
+        if progress:
+            progress(result)
+        if rate > 0 and not dry_run:
+            time.sleep(max(0.0, len(ids) / rate - (time.monotonic() - chunk_started)))
+
+    result.elapsed_seconds = time.monotonic() - started
+    return result
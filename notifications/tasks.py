@@ -1,37 +1,59 @@
 import logging
+import random
+from datetime import timedelta
+
 from celery import shared_task
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, F, Q, Value, When
 from django.utils import timezone
 from django.db import transaction, IntegrityError
 
-from notifications.models import Notification
+from config.celery import channel_queue, event_priority
+from notifications import rate_limit
+from notifications.models import BufferedNotification, Notification
 from orders.models import Order
-from notifications.adapters.email import EmailAdapter
+from notifications.adapters.email import EmailAdapter, close_connection, send_messages
 from notifications.adapters.sms import SmsAdapter
+from notifications.adapters import sms_async
+from notifications.adapters.sms_async import SmsMessage
+from notifications.adapters import webhook
+from notifications.adapters.webhook import WebhookAdapter
 
 logger = logging.getLogger(__name__)
 
+ADAPTERS = {
+    'EMAIL': EmailAdapter,
+    'SMS': SmsAdapter,
+    'WEBHOOK': WebhookAdapter,
+}
+
+
+def channel_options(channel: str) -> dict:
+    """Retry/backoff/time limits for one channel (`NOTIFICATION_CHANNEL_OPTIONS`)."""
+    defaults = {"max_retries": 5, "retry_backoff": 30, "retry_backoff_max": 600, "time_limit": 60}
+    return {**defaults, **getattr(settings, "NOTIFICATION_CHANNEL_OPTIONS", {}).get(channel, {})}
 
-@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+
+@shared_task(bind=True)
 def send_notification(self, unique_key: str, order_id: int, event: str, channels: list):
     """Send notification for an order for the given channels.
 
     - `unique_key` should be provided to make the operation idempotent per-channel.
     - `channels` is a list like ['EMAIL', 'SMS']
+
+    Only records one Notification per channel and fans out a
+    `deliver_notification` task for each, so channels retry and time out
+    independently and a slow SMS provider never delays email. Each delivery
+    goes to its channel's queue at the event's priority (`config.celery`).
     """
-    try:
-        order = Order.objects.get(pk=order_id)
-    except Order.DoesNotExist:
+    if not Order.objects.filter(pk=order_id).exists():
         logger.error('Order %s does not exist', order_id)
         return
 
-    adapters = {
-        'EMAIL': EmailAdapter(),
-        'SMS': SmsAdapter(),
-    }
-
     for channel in channels:
-        adapter = adapters.get(channel)
-        if not adapter:
+        if channel not in ADAPTERS:
             logger.warning('No adapter for channel %s', channel)
             continue
 
@@ -45,7 +67,7 @@ def send_notification(self, unique_key: str, order_id: int, event: str, channels
                     unique_key=per_channel_key,
                     channel=channel,
                     defaults={
-                        'order': order,
+                        'order_id': order_id,
                         'payload': {'event': event, 'order_id': order_id},
                         'status': Notification.Status.PENDING,
                     },
@@ -58,28 +80,473 @@ def send_notification(self, unique_key: str, order_id: int, event: str, channels
         if not created and notification.status == Notification.Status.SENT:
             logger.info('Notification already sent (id=%s)', notification.pk)
             continue
+        if notification.status == Notification.Status.FAILED:
+            # Same event sent again: give the channel a fresh round of retries
+            Notification.objects.filter(pk=notification.pk).update(status=Notification.Status.PENDING)
+
+        options = channel_options(channel)
+        if self.request.is_eager:
+            # Run inline when this task itself runs inline (tests, scripts)
+            deliver_notification.apply(args=[notification.pk])
+        else:
+            deliver_notification.apply_async(
+                args=[notification.pk],
+                queue=channel_queue(channel),
+                priority=event_priority(event),
+                time_limit=options["time_limit"] + 5,
+                soft_time_limit=options["time_limit"],
+            )
+
+
+@shared_task(bind=True, max_retries=None)
+def deliver_notification(self, notification_id: int, reserved: bool = False, deferrals: int = 0):
+    """Deliver one notification on its channel, with that channel's retry policy.
+
+    Retries back off exponentially (with jitter) from the channel's
+    `retry_backoff` up to `retry_backoff_max`. A retry only repeats this
+    channel's send.
+
+    Before sending, a token is reserved from the channel's and provider's
+    rate limits. If it is not due yet, the task re-queues itself for the
+    moment it is (`reserved=True`). That deferral counts neither as an
+    attempt nor against `max_retries`.
+    """
+    notification = (
+        Notification.objects.select_related('order__user')
+        .prefetch_related('order__items')
+        .filter(pk=notification_id)
+        .first()
+    )
+    if notification is None or notification.status != Notification.Status.PENDING:
+        return
+
+    options = channel_options(notification.channel)
+    event = notification.payload.get('event')
+    adapter = ADAPTERS[notification.channel]()
+    if not reserved:
+        max_wait = getattr(settings, 'NOTIFICATION_RATE_LIMIT_MAX_WAIT_SECONDS', 300)
+        reserved, wait = rate_limit.reserve(adapter.rate_limit_keys(), max_wait=max_wait)
+        if wait > 0:
+            logger.info('Notification %s rate limited; deferring %.2fs', notification.pk, wait)
+            raise self.retry(countdown=wait, kwargs={'reserved': reserved, 'deferrals': deferrals + 1})
+
+    try:
+        # render message; adapters implement deliver(order, event, payload)
+        external_id = adapter.deliver(order=notification.order, event=event, payload=notification.payload)
+    except Exception as exc:
+        logger.exception(
+            'Failed to send notification for order=%s channel=%s', notification.order_id, notification.channel,
+        )
+        Notification.objects.filter(pk=notification.pk).update(
+            attempts=F('attempts') + 1,
+            task_id=self.request.id,
+            error_message=str(exc),
+            error_class=type(exc).__name__,
+        )
+        failures = self.request.retries - deferrals
+        if failures >= options["max_retries"]:
+            # Dead letter; see DeadLetterView and the redrive_notifications command
+            Notification.objects.filter(pk=notification.pk).update(
+                status=Notification.Status.FAILED, failed_at=timezone.now(),
+            )
+            return
+        backoff = min(options["retry_backoff"] * 2 ** failures, options["retry_backoff_max"])
+        raise self.retry(
+            exc=exc,
+            countdown=backoff + random.uniform(0, options["retry_backoff"]),
+            kwargs={'deferrals': deferrals},
+        )
+
+    Notification.objects.filter(pk=notification.pk).update(
+        attempts=F('attempts') + 1,
+        task_id=self.request.id,
+        status=Notification.Status.SENT,
+        sent_at=timezone.now(),
+        external_id=external_id,
+        error_message='',
+    )
+
+
+def _send_batch(channel: str, notifications):
+    """Deliver loaded notifications; return ({pk: external_id}, {pk: exception})."""
+    sent, errors = {}, {}
+    if channel == Notification.Channel.EMAIL:
+        # Render everything, then send over the worker's single SMTP session
+        adapter = EmailAdapter()
+        messages, queued = [], []
+        for notification in notifications:
+            try:
+                messages.append(adapter.build_message(
+                    order=notification.order, event=notification.payload.get("event"), payload=notification.payload,
+                ))
+                queued.append(notification)
+            except Exception as exc:
+                logger.exception("Failed to render notification %s", notification.pk)
+                errors[notification.pk] = exc
+        for notification, error in zip(queued, send_messages(messages)):
+            if error is None:
+                sent[notification.pk] = f"email:{notification.order_id}:{notification.payload.get('event')}"
+            else:
+                logger.warning("Failed to send notification %s: %s", notification.pk, error)
+                errors[notification.pk] = error
+        return sent, errors
 
-        # Attempt send
+    if channel == Notification.Channel.WEBHOOK:
+        # Events for the same endpoint share signed requests
+        results = WebhookAdapter().deliver_many([
+            (notification.order, notification.payload.get("event"), notification.payload)
+            for notification in notifications
+        ])
+        for notification, error in zip(notifications, results):
+            if error is None:
+                sent[notification.pk] = f"webhook:{notification.order_id}:{notification.payload.get('event')}"
+            else:
+                errors[notification.pk] = error
+        return sent, errors
+
+    if channel == Notification.Channel.SMS:
+        # All of the batch in flight at once over one connection pool
+        adapter = SmsAdapter()
+        messages, queued = [], []
+        for notification in notifications:
+            try:
+                messages.append(adapter.build_message(
+                    order=notification.order, event=notification.payload.get("event"), payload=notification.payload,
+                ))
+                queued.append(notification)
+            except Exception as exc:
+                logger.warning("Failed to send notification %s: %s", notification.pk, exc)
+                errors[notification.pk] = exc
+        for notification, result in zip(queued, sms_async.dispatch(messages, provider=adapter.provider)):
+            if isinstance(result, Exception):
+                errors[notification.pk] = result
+            else:
+                sent[notification.pk] = result
+        return sent, errors
+
+    adapter = ADAPTERS[channel]()
+    for notification in notifications:
         try:
-            notification.attempts = (notification.attempts or 0) + 1
-            notification.task_id = self.request.id
-            notification.save(update_fields=['attempts', 'task_id'])
-
-            # render message; adapters implement send(order, event, payload)
-            external_id = adapter.send(order=order, event=event, payload=notification.payload)
-
-            notification.status = Notification.Status.SENT
-            notification.sent_at = timezone.now()
-            notification.external_id = external_id
-            notification.error_message = ''
-            notification.save()
+            sent[notification.pk] = adapter.deliver(
+                order=notification.order, event=notification.payload.get("event"), payload=notification.payload,
+            )
         except Exception as exc:
-            logger.exception('Failed to send notification for order=%s channel=%s', order_id, channel)
-            notification.attempts = (notification.attempts or 0) + 0
-            notification.error_message = str(exc)
-            notification.save(update_fields=['attempts', 'error_message'])
-            try:
-                raise self.retry(exc=exc)
-            except self.MaxRetriesExceededError:
-                notification.status = Notification.Status.FAILED
-                notification.save(update_fields=['status'])
+            logger.warning("Failed to send notification %s: %s", notification.pk, exc)
+            errors[notification.pk] = exc
+    return sent, errors
+
+
+def _retry_countdown(channel: str, notifications, retry_ids: list) -> float:
+    """Backoff for re-sending a batch: the channel's delay, doubled per attempt so far."""
+    options = channel_options(channel)
+    retrying = set(retry_ids)
+    attempts = min(n.attempts + 1 for n in notifications if n.pk in retrying)
+    return min(options["retry_backoff"] * 2 ** (attempts - 1), options["retry_backoff_max"])
+
+
+def _record_outcomes(notifications, sent: dict, errors: dict, task_id) -> list:
+    """Write a batch's results in a few statements; return the ids worth retrying."""
+    now = timezone.now()
+    with transaction.atomic():
+        Notification.objects.filter(pk__in=[n.pk for n in notifications]).update(
+            attempts=F("attempts") + 1, task_id=task_id,
+        )
+        if sent:
+            Notification.objects.filter(pk__in=list(sent)).update(
+                status=Notification.Status.SENT,
+                sent_at=now,
+                error_message="",
+                external_id=Case(
+                    *[When(pk=pk, then=Value(external_id)) for pk, external_id in sent.items()],
+                    output_field=CharField(),
+                ),
+            )
+        for pk, exc in errors.items():
+            Notification.objects.filter(pk=pk).update(error_message=str(exc), error_class=type(exc).__name__)
+
+    if not errors:
+        return []
+    # Same policy as deliver_notification: the first attempt plus max_retries
+    exhausted = [
+        n.pk for n in notifications
+        if n.pk in errors and n.attempts + 1 >= channel_options(n.channel)["max_retries"] + 1
+    ]
+    Notification.objects.filter(pk__in=exhausted).update(status=Notification.Status.FAILED, failed_at=now)
+    return [pk for pk in errors if pk not in exhausted]
+
+
+def _take_tokens(channel: str, notifications: list):
+    """Split a batch by what the rate limits allow now: (send now, deferred ids, wait)."""
+    granted, wait = rate_limit.take_up_to(ADAPTERS[channel]().rate_limit_keys(), len(notifications))
+    return notifications[:granted], [n.pk for n in notifications[granted:]], wait
+
+
+def _load_pending(channel: str, filters) -> list:
+    return list(
+        Notification.objects.filter(filters, channel=channel, status=Notification.Status.PENDING)
+        .select_related("order__user")
+        .prefetch_related("order__items")
+        .order_by("pk")
+    )
+
+
+@shared_task(bind=True)
+def send_notification_batch(self, notification_ids: list, channel: str = Notification.Channel.EMAIL):
+    """Deliver many PENDING notifications of one channel in one go.
+
+    Orders, users and items for the whole batch are loaded in three queries.
+    Emails go out over one SMTP session. Outcomes are written with a few bulk
+    statements rather than per row. Failed messages stay PENDING and are
+    re-queued as a smaller batch, backing off exponentially, until the
+    channel's `max_retries` are used up. What the rate limits do not cover
+    yet is re-queued, without counting an attempt, for when the tokens will
+    be there.
+    """
+    notifications = _load_pending(channel, Q(pk__in=notification_ids))
+    if not notifications:
+        return {"sent": 0, "failed": 0, "deferred": 0}
+
+    notifications, deferred, wait = _take_tokens(channel, notifications)
+    if deferred:
+        send_notification_batch.apply_async(args=[deferred, channel], countdown=wait)
+    sent, errors = _send_batch(channel, notifications) if notifications else ({}, {})
+    retry_ids = _record_outcomes(notifications, sent, errors, self.request.id) if notifications else []
+    if retry_ids:
+        send_notification_batch.apply_async(
+            args=[retry_ids, channel], countdown=_retry_countdown(channel, notifications, retry_ids),
+        )
+    return {"sent": len(sent), "failed": len(errors), "deferred": len(deferred)}
+
+
+@shared_task
+def send_sms_broadcast(recipients: list, body: str):
+    """Send one text to many phone numbers (campaigns, reminders).
+
+    Lists longer than `SMS_BROADCAST_CHUNK_SIZE` are split into one task per
+    chunk. Each chunk goes out through the async dispatcher, as much of it as
+    the SMS rate limits allow, and the rest is re-queued for when tokens
+    refill. Broadcasts are not order events, so no `Notification` rows are
+    written. Failed numbers are logged and counted but not retried.
+    """
+    chunk_size = getattr(settings, "SMS_BROADCAST_CHUNK_SIZE", 5000)
+    if len(recipients) > chunk_size:
+        for start in range(0, len(recipients), chunk_size):
+            send_sms_broadcast.delay(recipients[start:start + chunk_size], body)
+        return {"chunks": -(-len(recipients) // chunk_size)}
+
+    adapter = SmsAdapter()
+    granted, wait = rate_limit.take_up_to(adapter.rate_limit_keys(), len(recipients))
+    if granted < len(recipients):
+        send_sms_broadcast.apply_async(args=[recipients[granted:], body], countdown=wait)
+    results = sms_async.dispatch([SmsMessage(to=to, body=body) for to in recipients[:granted]], provider=adapter.provider)
+    failed = sum(isinstance(result, Exception) for result in results)
+    return {"sent": len(results) - failed, "failed": failed, "deferred": len(recipients) - granted}
+
+
+# ----------------------------------------------------------------------
+# Windowed batching (NOTIFICATION_BATCHING)
+#
+# Events are buffered as BufferedNotification rows, written inside the
+# caller's transaction. A flusher per channel runs once the window
+# (NOTIFICATION_BATCH_WINDOW_MS) closes or NOTIFICATION_BATCH_SIZE events have
+# piled up. Each run turns up to one batch into Notification rows and
+# delivers them with the batch path above.
+#
+# Digest channels (NOTIFICATION_DIGEST_CHANNELS) are always buffered, with a
+# per-order window instead: an order's first buffered event opens it, and
+# whatever else that order raised before it closes
+# (NOTIFICATION_DIGEST_WINDOW_SECONDS) goes out as one message.
+# ----------------------------------------------------------------------
+
+def _digest_channels() -> set:
+    return set(getattr(settings, "NOTIFICATION_DIGEST_CHANNELS", ())) & set(ADAPTERS)
+
+
+def _flush_scheduled_key(channel: str) -> str:
+    return f"notifications:flush-scheduled:{channel}"
+
+
+def _buffered_count_key(channel: str) -> str:
+    return f"notifications:buffered:{channel}"
+
+
+def _schedule_digest_flush(channel: str, countdown: float) -> None:
+    # At most one pending flush per digest channel; the flush clears the key when it starts
+    if cache.add(_flush_scheduled_key(channel), 1, timeout=countdown + 60):
+        flush_notification_buffer.apply_async(args=[channel], countdown=countdown, retry=False)
+
+
+def _schedule_flush(channels, added: int) -> None:
+    window = getattr(settings, "NOTIFICATION_BATCH_WINDOW_MS", 500) / 1000
+    size = getattr(settings, "NOTIFICATION_BATCH_SIZE", 200)
+    digest = _digest_channels()
+    for channel in channels:
+        try:
+            if channel in digest:
+                # A full batch is no reason to flush early: no order's window has closed yet
+                _schedule_digest_flush(channel, getattr(settings, "NOTIFICATION_DIGEST_WINDOW_SECONDS", 10))
+                continue
+            count_key = _buffered_count_key(channel)
+            cache.add(count_key, 0, timeout=None)
+            buffered = cache.incr(count_key, added)
+            if buffered >= size:
+                # Full batch: flush now rather than waiting for the window
+                cache.set(count_key, 0, timeout=None)
+                flush_notification_buffer.apply_async(args=[channel], retry=False)
+            elif cache.add(_flush_scheduled_key(channel), 1, timeout=window):
+                # First event of a window schedules the flush that closes it
+                flush_notification_buffer.apply_async(args=[channel], countdown=window, retry=False)
+        except Exception:
+            # The beat sweep (flush-notification-buffers) picks the events up
+            logger.warning("Could not schedule notification flush for %s", channel, exc_info=True)
+
+
+def enqueue_notification(unique_key: str, order_id: int, event: str, channels: list) -> None:
+    """Queue a notification: one `send_notification` task, or the batching buffer.
+
+    In batching mode, and for digest channels, the buffer rows are part of the
+    caller's transaction, so an event is only delivered if the change it
+    reports was committed.
+    """
+    if not getattr(settings, "NOTIFICATION_BATCHING", False):
+        digest = _digest_channels()
+        direct = [channel for channel in channels if channel not in digest]
+        if direct:
+            send_notification.delay(unique_key, order_id, event, direct)
+        channels = [channel for channel in channels if channel in digest]
+        if not channels:
+            return
+
+    channels = [channel for channel in channels if channel in ADAPTERS]
+    # Own savepoint: a failed insert must not doom the caller's transaction,
+    # which callers like create_order keep using after swallowing the error
+    with transaction.atomic():
+        BufferedNotification.objects.bulk_create(
+            BufferedNotification(unique_key=unique_key, order_id=order_id, event=event, channel=channel)
+            for channel in channels
+        )
+    transaction.on_commit(lambda: _schedule_flush(channels, 1))
+
+
+def _digest_rows(channel: str, events: list) -> list:
+    """One Notification per order for buffered events of a digest channel.
+
+    Events already recorded, as a notification's own key or as one of the
+    `keys` an earlier digest merged, are left out, so a repeat is not sent
+    again. Their rows are still picked up by key, as on the plain path.
+    """
+    keys = {f"{e.unique_key}:{channel}" for e in events if e.unique_key}
+    known = set(Notification.objects.filter(channel=channel, unique_key__in=keys).values_list("unique_key", flat=True))
+    # A digest row is keyed by its first event; the others live in payload["keys"]
+    for payload in Notification.objects.filter(
+        channel=channel, order_id__in={e.order_id for e in events}, payload__has_key="keys",
+    ).values_list("payload", flat=True):
+        known.update(keys.intersection(payload["keys"]))
+    orders: dict = {}
+    rows = []
+    for e in events:
+        key = f"{e.unique_key or f'buffer:{e.pk}'}:{channel}"
+        if key in known:
+            rows.append(Notification(unique_key=key, channel=channel))
+            continue
+        known.add(key)
+        orders.setdefault(e.order_id, []).append((key, e.event))
+
+    for order_id, merged in orders.items():
+        payload = {"event": merged[-1][1], "order_id": order_id}
+        if len(merged) > 1:
+            # The latest event names the digest; `events` lists everything it covers
+            payload["events"] = [event for _, event in merged]
+            payload["keys"] = [key for key, _ in merged]
+        rows.append(Notification(
+            unique_key=merged[0][0],
+            order_id=order_id,
+            channel=channel,
+            payload=payload,
+            status=Notification.Status.PENDING,
+        ))
+    return rows
+
+
+def flush_buffered_notifications(channel: str, *, batch_size: int | None = None, task_id=None) -> dict:
+    """Drain up to one batch of buffered events for `channel` and deliver it.
+
+    For a digest channel only orders whose digest window has closed are
+    drained, and `next_in` says when the next one will.
+    """
+    batch_size = batch_size or getattr(settings, "NOTIFICATION_BATCH_SIZE", 200)
+    digest = channel in _digest_channels()
+    window = timedelta(seconds=getattr(settings, "NOTIFICATION_DIGEST_WINDOW_SECONDS", 10))
+    with transaction.atomic():
+        buffered = BufferedNotification.objects.select_for_update(skip_locked=True).filter(channel=channel)
+        if digest:
+            buffered = buffered.filter(order_id__in=BufferedNotification.objects.filter(
+                channel=channel, created_at__lte=timezone.now() - window,
+            ).values("order_id"))
+        events = list(buffered.order_by("pk")[:batch_size])
+        if events:
+            BufferedNotification.objects.filter(pk__in=[e.pk for e in events]).delete()
+
+        if digest:
+            rows = _digest_rows(channel, events)
+        else:
+            # Coalesce repeats of the same event; the unique constraint catches ones already delivered
+            rows = {}
+            for e in events:
+                key = e.unique_key or f"buffer:{e.pk}"
+                rows.setdefault(key, Notification(
+                    unique_key=f"{key}:{channel}",
+                    order_id=e.order_id,
+                    channel=channel,
+                    payload={"event": e.event, "order_id": e.order_id},
+                    status=Notification.Status.PENDING,
+                ))
+            rows = list(rows.values())
+        Notification.objects.bulk_create([n for n in rows if n.order_id], ignore_conflicts=True)
+
+    result = {"events": len(events), "sent": 0, "failed": 0, "deferred": 0, "more": len(events) == batch_size}
+    if digest:
+        oldest = BufferedNotification.objects.filter(channel=channel).order_by("pk").values_list("created_at", flat=True).first()
+        # Never less than a second, so rows locked by another flusher don't make this spin
+        result["next_in"] = None if oldest is None else max(1.0, (oldest + window - timezone.now()).total_seconds())
+    if not events:
+        return result
+
+    notifications = _load_pending(channel, Q(unique_key__in=[n.unique_key for n in rows]))
+    notifications, deferred, wait = _take_tokens(channel, notifications)
+    if deferred:
+        send_notification_batch.apply_async(args=[deferred, channel], countdown=wait)
+    sent, errors = _send_batch(channel, notifications) if notifications else ({}, {})
+    retry_ids = _record_outcomes(notifications, sent, errors, task_id) if notifications else []
+    if retry_ids:
+        send_notification_batch.apply_async(
+            args=[retry_ids, channel], countdown=_retry_countdown(channel, notifications, retry_ids),
+        )
+    return {**result, "sent": len(sent), "failed": len(errors), "deferred": len(deferred)}
+
+
+@shared_task(bind=True)
+def flush_notification_buffer(self, channel: str):
+    if channel in _digest_channels():
+        # This is the pending flush; let the next one be scheduled
+        cache.delete(_flush_scheduled_key(channel))
+    result = flush_buffered_notifications(channel, task_id=self.request.id)
+    if result["more"]:
+        flush_notification_buffer.apply_async(args=[channel], retry=False)
+    elif result.get("next_in") is not None:
+        _schedule_digest_flush(channel, result["next_in"])
+    return result
+
+
+@shared_task
+def flush_notification_buffers_task():
+    """Beat safety net: flush channels whose scheduled flush was lost."""
+    channels = BufferedNotification.objects.values_list("channel", flat=True).distinct()
+    for channel in list(channels):
+        flush_notification_buffer.delay(channel)
+
+
+@worker_process_shutdown.connect
+def _close_connections(**kwargs):
+    close_connection()
+    webhook.close_session()
@@ -1,19 +1,49 @@
 """
-Tests for the notifications app - 20 tests.
-Covers models, tasks, and adapters.
+Tests for the notifications app - 48 tests.
+Covers models, tasks, adapters, batched email delivery, windowed batching, rate limits, webhooks, dead-letter redrive, per-order digests, and async SMS dispatch.
 """
+import datetime
+import hashlib
+import base64
+import hmac
+import json
+from io import StringIO
+import smtplib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
 import pytest
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
 from django.db import IntegrityError
 
 from orders.models import Order, OrderItem
-from notifications.models import Notification
-from notifications.tasks import send_notification
+from notifications.models import BufferedNotification, Notification
+from notifications.tasks import (
+    deliver_notification,
+    enqueue_notification,
+    flush_buffered_notifications,
+    flush_notification_buffer,
+    send_notification,
+    send_notification_batch,
+    send_sms_broadcast,
+)
+from notifications import rate_limit
+from notifications.adapters import email as email_adapter
 from notifications.adapters.email import EmailAdapter
+from notifications.adapters import sms as sms_adapter
 from notifications.adapters.sms import SmsAdapter
+from notifications.adapters import sms_async
+from notifications.adapters.sms_async import AsyncSmsDispatcher, SmsDeliveryError, SmsMessage
+from notifications.adapters import webhook as webhook_adapter
+from notifications.adapters.webhook import WebhookAdapter
 
 
 User = get_user_model()
@@ -74,7 +104,7 @@ class TestNotificationModel:
 
 
 # ============================================================================
-# EMAIL ADAPTER TESTS (4 tests)
+# EMAIL ADAPTER TESTS (5 tests)
 # ============================================================================
 
 class TestEmailAdapter:
@@ -107,9 +137,19 @@ class TestEmailAdapter:
         email = mail.outbox[0]
         assert email.body and email.alternatives
 
+    def test_render_runs_no_queries(self, order_with_items, mock_email_backend, django_assert_num_queries):
+        """Test rendering a preloaded order needs no further queries."""
+        order = Order.objects.select_related("user").prefetch_related("items").get(pk=order_with_items.pk)
+        with django_assert_num_queries(0):
+            message = EmailAdapter().build_message(order=order, event="order.created", payload={})
+        html = message.alternatives[0][0]
+        for item in order.items.all():
+            assert item.product_name in html
+        assert f"#{order.pk}" in html
+
 
 # ============================================================================
-# SMS ADAPTER TESTS (2 tests)
+# SMS ADAPTER TESTS (3 tests)
 # ============================================================================
 
 class TestSmsAdapter:
@@ -120,6 +160,15 @@ class TestSmsAdapter:
         adapter = SmsAdapter()
         assert adapter.provider == ""
 
+    def test_twilio_client_has_request_timeout(self, settings, monkeypatch):
+        """Test the shared Twilio client times out, since thread-pool workers ignore task time limits."""
+        settings.SMS_TIMEOUT = 7
+        monkeypatch.setattr(sms_adapter, "_twilio_client", None)
+        client = sms_adapter._get_twilio_client()
+        assert client.http_client.timeout == 7
+        assert sms_adapter._get_twilio_client() is client
+        monkeypatch.setattr(sms_adapter, "_twilio_client", None)
+
     def test_send_no_phone_number(self, order):
         """Test sending fails when user has no phone number."""
         order.user.phone_number = None
@@ -130,7 +179,7 @@ class TestSmsAdapter:
 
 
 # ============================================================================
-# TASK TESTS (7 tests)
+# TASK TESTS (11 tests)
 # ============================================================================
 
 class TestSendNotificationTask:
@@ -180,3 +229,662 @@ class TestSendNotificationTask:
         send_notification.apply(args=["sent:at:test", order_with_items.pk, "order.created", ["EMAIL"]])
         notification = Notification.objects.filter(order=order_with_items).first()
         assert notification.sent_at is not None
+
+    def test_failing_channel_retries_alone(self, settings, user_with_sms, mock_email_backend):
+        """Test SMS retries never resend the email or wait for it."""
+        settings.NOTIFICATION_CHANNEL_OPTIONS = {"SMS": {"max_retries": 2, "retry_backoff": 0}}
+        order = Order.objects.create(user=user_with_sms, address="Test Address")
+        with patch.object(SmsAdapter, "deliver", side_effect=RuntimeError("twilio 429")) as sms_send:
+            send_notification.apply(args=["fanout:test", order.pk, "order.created", ["EMAIL", "SMS"]])
+
+        email = Notification.objects.get(order=order, channel=Notification.Channel.EMAIL)
+        sms = Notification.objects.get(order=order, channel=Notification.Channel.SMS)
+        assert (email.status, email.attempts) == (Notification.Status.SENT, 1)
+        assert (sms.status, sms.attempts) == (Notification.Status.FAILED, 3)
+        assert sms.error_message == "twilio 429"
+        assert sms_send.call_count == 3
+        assert len(mail.outbox) == 1
+
+    def test_fan_out_uses_channel_time_limits(self, settings, user_with_sms):
+        """Test each channel gets its own delivery task with that channel's time limit."""
+        settings.NOTIFICATION_CHANNEL_OPTIONS = {"EMAIL": {"time_limit": 30}, "SMS": {"time_limit": 10}}
+        order = Order.objects.create(user=user_with_sms, address="Test Address")
+        with patch.object(deliver_notification, "apply_async") as deliver:
+            send_notification("fanout:limits", order.pk, "order.created", ["EMAIL", "SMS"])
+
+        limits = {
+            Notification.objects.get(pk=c.kwargs["args"][0]).channel: c.kwargs["soft_time_limit"]
+            for c in deliver.call_args_list
+        }
+        assert limits == {"EMAIL": 30, "SMS": 10}
+
+    def test_fan_out_routes_by_channel_and_event(self, user_with_sms):
+        """Test deliveries go to their channel's queue and payment confirmations jump ahead."""
+        order = Order.objects.create(user=user_with_sms, address="Test Address")
+        with patch.object(deliver_notification, "apply_async") as deliver:
+            send_notification("route:created", order.pk, "order.created", ["EMAIL", "SMS"])
+            send_notification("route:paid", order.pk, "payment.confirmed", ["EMAIL"])
+
+        routes = [(c.kwargs["queue"], c.kwargs["priority"]) for c in deliver.call_args_list]
+        assert routes == [("email", 5), ("sms", 5), ("email", 0)]
+
+    def test_router_assigns_queues(self):
+        """Test the Celery router sends provider and batch work to dedicated queues."""
+        from config.celery import app
+
+        def route(name, args=(), kwargs=None):
+            options = app.amqp.router.route({}, name, args, kwargs)
+            return options["queue"].name, options.get("priority")
+
+        assert route("notifications.tasks.send_notification_batch", ([1, 2], "SMS")) == ("sms", None)
+        assert route("notifications.tasks.flush_notification_buffer", ("EMAIL",)) == ("email", None)
+        # Merchant endpoints never share a queue with UroPay callbacks
+        assert route("notifications.tasks.send_notification_batch", ([1], "WEBHOOK")) == ("merchant_webhooks", None)
+        assert route("payments.tasks.process_webhook_events_task") == ("webhooks", None)
+        assert route("notifications.tasks.send_notification", ("k", 1, "payment.confirmed", ["EMAIL"])) == ("celery", 0)
+        assert route("payments.tasks.reconcile_payments_task") == ("reconciliation", None)
+        assert route("orders.tasks.refresh_sales_rollups_task") == ("reports", None)
+
+
+# ============================================================================
+# EMAIL DELIVERY TESTS (3 tests)
+# ============================================================================
+
+@pytest.fixture
+def fresh_email_connection(mock_email_backend):
+    email_adapter.close_connection()
+    yield
+    email_adapter.close_connection()
+
+
+class FlakyConnection:
+    """Email connection whose first send fails as if the server dropped the session."""
+
+    opened = 0
+
+    def __init__(self, *args, **kwargs):
+        FlakyConnection.opened += 1
+
+    def open(self):
+        return True
+
+    def send_messages(self, messages):
+        if FlakyConnection.opened == 1:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        mail.outbox.extend(messages)
+        return len(messages)
+
+    def close(self):
+        pass
+
+
+class TestEmailDelivery:
+    """Tests for SMTP connection reuse and batched email delivery."""
+
+    def test_connection_is_reused(self, order_with_items, fresh_email_connection):
+        """Test consecutive sends share one backend connection."""
+        with patch.object(email_adapter, "get_connection", wraps=email_adapter.get_connection) as get_connection:
+            EmailAdapter().send(order=order_with_items, event="order.created", payload={})
+            EmailAdapter().send(order=order_with_items, event="payment.confirmed", payload={})
+        assert get_connection.call_count == 1
+        assert len(mail.outbox) == 2
+
+    def test_reconnects_after_dropped_session(self, order_with_items, fresh_email_connection):
+        """Test a dropped SMTP session is reopened and the message still goes out."""
+        FlakyConnection.opened = 0
+        with patch.object(email_adapter, "get_connection", FlakyConnection):
+            result = EmailAdapter().send(order=order_with_items, event="order.created", payload={})
+        assert result == f"email:{order_with_items.pk}:order.created"
+        assert FlakyConnection.opened == 2
+        assert len(mail.outbox) == 1
+
+    def test_send_notification_batch(self, order_with_items, order_another_user, fresh_email_connection, django_assert_max_num_queries):
+        """Test a batch is sent over one connection and statuses are written in bulk."""
+        order = order_another_user
+        order.user.email = ""
+        order.user.save()
+        good = [
+            Notification.objects.create(order=order_with_items, channel=Notification.Channel.EMAIL, payload={"event": event})
+            for event in ("order.created", "payment.confirmed")
+        ]
+        bad = Notification.objects.create(order=order, channel=Notification.Channel.EMAIL, payload={"event": "order.created"})
+
+        with patch.object(send_notification_batch, "apply_async") as requeue:
+            with django_assert_max_num_queries(12):
+                result = send_notification_batch.apply(args=[[n.pk for n in good] + [bad.pk]]).get()
+        assert result == {"sent": 2, "failed": 1, "deferred": 0}
+        assert len(mail.outbox) == 2
+        for notification in good:
+            notification.refresh_from_db()
+            assert notification.status == Notification.Status.SENT
+            assert notification.attempts == 1
+            assert notification.external_id == f"email:{order_with_items.pk}:{notification.payload['event']}"
+        bad.refresh_from_db()
+        assert bad.status == Notification.Status.PENDING
+        assert "No email recipient" in bad.error_message
+        requeue.assert_called_once_with(args=[[bad.pk], "EMAIL"], countdown=30)
+
+
+# ============================================================================
+# WINDOWED BATCHING TESTS (2 tests)
+# ============================================================================
+
+class TestNotificationBatching:
+    """Tests for the buffered, windowed notification mode."""
+
+    def test_enqueue_buffers_and_schedules_flush(self, settings, order, django_capture_on_commit_callbacks):
+        """Test events are buffered per channel, one flush per window, and a full batch flushes at once."""
+        settings.NOTIFICATION_BATCHING = True
+        settings.NOTIFICATION_BATCH_WINDOW_MS = 250
+        settings.NOTIFICATION_BATCH_SIZE = 3
+
+        with patch.object(flush_notification_buffer, "apply_async") as flush:
+            for n in range(3):
+                with django_capture_on_commit_callbacks(execute=True):
+                    enqueue_notification(f"order:{order.pk}:{n}", order.pk, "order.created", ["EMAIL", "SMS", "PIGEON"])
+
+        assert BufferedNotification.objects.filter(channel="EMAIL").count() == 3
+        assert BufferedNotification.objects.filter(channel="SMS").count() == 3
+        assert not BufferedNotification.objects.filter(channel="PIGEON").exists()
+        calls = [(c.kwargs["args"], c.kwargs.get("countdown")) for c in flush.call_args_list]
+        # First event opens each channel's window; the third fills the batch
+        assert calls == [(["EMAIL"], 0.25), (["SMS"], 0.25), (["EMAIL"], None), (["SMS"], None)]
+
+    def test_flush_coalesces_and_delivers(self, order_with_items, fresh_email_connection, django_assert_max_num_queries):
+        """Test a flush creates, sends and marks a whole batch, coalescing repeated events."""
+        orders = [order_with_items] + [
+            Order.objects.create(user=order_with_items.user, address="Batch Street") for _ in range(3)
+        ]
+        BufferedNotification.objects.bulk_create(
+            BufferedNotification(order=o, unique_key=f"order:{o.pk}:created", channel="EMAIL", event="order.created")
+            for o in orders + orders[:1]
+        )
+
+        with django_assert_max_num_queries(12):
+            result = flush_buffered_notifications("EMAIL", batch_size=10)
+        assert result == {"events": 5, "sent": 4, "failed": 0, "deferred": 0, "more": False}
+        assert len(mail.outbox) == 4
+        assert not BufferedNotification.objects.exists()
+        assert Notification.objects.filter(status=Notification.Status.SENT).count() == 4
+
+        # Same event buffered again after delivery is not re-sent
+        BufferedNotification.objects.create(
+            order=order_with_items, unique_key=f"order:{order_with_items.pk}:created", channel="EMAIL", event="order.created",
+        )
+        assert flush_buffered_notifications("EMAIL")["sent"] == 0
+        assert len(mail.outbox) == 4
+
+
+# ============================================================================
+# RATE LIMIT TESTS (3 tests)
+# ============================================================================
+
+class TestRateLimits:
+    """Tests for the token-bucket sending limits."""
+
+    def test_bucket_grants_reserves_and_defers(self, settings):
+        """Test a bucket grants its burst, then reserves consecutive slots up to max_wait."""
+        settings.NOTIFICATION_RATE_LIMITS = {"EMAIL": {"rate": 1, "burst": 2}}
+        assert rate_limit.reserve(["EMAIL", "unlimited"], max_wait=0) == (True, 0)
+        rate_limit.consume(["EMAIL"])
+        with pytest.raises(rate_limit.RateLimited) as exc_info:
+            rate_limit.consume(["EMAIL"])
+        assert exc_info.value.retry_after == pytest.approx(1, abs=0.05)
+
+        reserved, wait = rate_limit.reserve(["EMAIL"], max_wait=2.5)
+        assert reserved and wait == pytest.approx(1, abs=0.05)
+        reserved, wait = rate_limit.reserve(["EMAIL"], max_wait=2.5)
+        assert reserved and wait == pytest.approx(2, abs=0.05)
+        # The next slot (3s out) is past max_wait: nothing reserved, ask again in 0.5s
+        reserved, wait = rate_limit.reserve(["EMAIL"], max_wait=2.5)
+        assert not reserved and wait == pytest.approx(0.5, abs=0.05)
+
+    def test_deliver_defers_without_counting_attempt(self, settings, order_with_items, mock_email_backend):
+        """Test a rate-limited delivery is re-queued for its reserved slot, not failed or retried."""
+        settings.NOTIFICATION_RATE_LIMITS = {"EMAIL": {"rate": 0.5, "burst": 1}}
+        rate_limit.consume(["EMAIL"])
+        notification = Notification.objects.create(
+            order=order_with_items, channel=Notification.Channel.EMAIL, payload={"event": "payment.confirmed"},
+        )
+        with patch.object(deliver_notification, "retry", side_effect=RuntimeError("deferred")) as retry:
+            with pytest.raises(RuntimeError):
+                deliver_notification(notification.pk)
+        assert retry.call_args.kwargs["countdown"] == pytest.approx(2, abs=0.05)
+        assert retry.call_args.kwargs["kwargs"] == {"reserved": True, "deferrals": 1}
+        notification.refresh_from_db()
+        assert (notification.status, notification.attempts) == (Notification.Status.PENDING, 0)
+        assert len(mail.outbox) == 0
+
+        # The re-queued run holds its token and sends straight away
+        deliver_notification(notification.pk, reserved=True, deferrals=1)
+        notification.refresh_from_db()
+        assert (notification.status, notification.attempts) == (Notification.Status.SENT, 1)
+        assert len(mail.outbox) == 1
+
+    def test_batch_sends_what_tokens_allow(self, settings, order_with_items, fresh_email_connection):
+        """Test a batch sends up to the available tokens and re-queues the rest for when they refill."""
+        settings.NOTIFICATION_RATE_LIMITS = {"EMAIL": {"rate": 2, "burst": 2}}
+        notifications = Notification.objects.bulk_create(
+            Notification(order=order_with_items, channel=Notification.Channel.EMAIL, payload={"event": "order.created"})
+            for _ in range(5)
+        )
+        with patch.object(send_notification_batch, "apply_async") as requeue:
+            result = send_notification_batch.apply(args=[[n.pk for n in notifications]]).get()
+
+        assert result == {"sent": 2, "failed": 0, "deferred": 3}
+        assert len(mail.outbox) == 2
+        deferred = [n.pk for n in notifications[2:]]
+        assert requeue.call_args.kwargs["args"] == [deferred, "EMAIL"]
+        assert requeue.call_args.kwargs["countdown"] == pytest.approx(1, abs=0.05)
+        assert set(Notification.objects.filter(pk__in=deferred).values_list("attempts", flat=True)) == {0}
+
+
+# ============================================================================
+# WEBHOOK TESTS (4 tests)
+# ============================================================================
+
+class WebhookReceiver:
+    """Local HTTP endpoint that records webhook requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        self.delay = 0.0
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with receiver._lock:
+                    receiver.in_flight += 1
+                    receiver.max_in_flight = max(receiver.max_in_flight, receiver.in_flight)
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(receiver.delay)
+                with receiver._lock:
+                    receiver.in_flight -= 1
+                    receiver.requests.append((self.path, dict(self.headers), body))
+                self.send_response(receiver.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def events(self, path=None):
+        return [
+            json.loads(body)["events"] for request_path, _, body in self.requests
+            if path is None or request_path == path
+        ]
+
+
+@pytest.fixture
+def webhook_receiver():
+    receiver = WebhookReceiver()
+    thread = threading.Thread(target=receiver.server.serve_forever, daemon=True)
+    thread.start()
+    yield receiver
+    receiver.server.shutdown()
+    receiver.server.server_close()
+    webhook_adapter.close_session()
+
+
+@pytest.fixture
+def merchant(user, webhook_receiver):
+    user.webhook_url = f"{webhook_receiver.url}/hooks/merchant"
+    user.webhook_secret = "whsec_test"
+    user.save()
+    return user
+
+
+class TestWebhookAdapter:
+    """Tests for signed, batched webhook delivery."""
+
+    def test_delivers_signed_event(self, merchant, webhook_receiver):
+        """Test a notification is posted with a verifiable HMAC signature."""
+        order = Order.objects.create(user=merchant, address="Hook Street", total_amount="12.50")
+        send_notification.apply(args=["hook:1", order.pk, "payment.confirmed", ["WEBHOOK"]])
+
+        notification = Notification.objects.get(order=order, channel=Notification.Channel.WEBHOOK)
+        assert notification.status == Notification.Status.SENT
+        assert notification.external_id == f"webhook:{order.pk}:payment.confirmed"
+        [(path, headers, body)] = webhook_receiver.requests
+        assert path == "/hooks/merchant"
+        expected = hmac.new(
+            b"whsec_test", headers["X-Webhook-Timestamp"].encode() + b"." + body, hashlib.sha256,
+        ).hexdigest()
+        assert headers["X-Webhook-Signature"] == f"sha256={expected}"
+        [event] = json.loads(body)["events"]
+        assert event["id"] == f"order:{order.pk}:payment.confirmed"
+        assert event["data"]["total_amount"] == "12.50"
+
+    def test_batch_groups_events_per_endpoint(self, settings, merchant, order_another_user, webhook_receiver):
+        """Test a batch shares requests per endpoint, split at NOTIFICATION_WEBHOOK_BATCH_SIZE."""
+        settings.NOTIFICATION_WEBHOOK_BATCH_SIZE = 2
+        other = order_another_user.user
+        other.webhook_url = f"{webhook_receiver.url}/hooks/other"
+        other.webhook_secret = "whsec_other"
+        other.save()
+        orders = [Order.objects.create(user=merchant, address="Hook Street") for _ in range(3)] + [order_another_user]
+        notifications = Notification.objects.bulk_create(
+            Notification(order=o, channel=Notification.Channel.WEBHOOK, payload={"event": "order.created"})
+            for o in orders
+        )
+
+        result = send_notification_batch.apply(args=[[n.pk for n in notifications], "WEBHOOK"]).get()
+        assert result == {"sent": 4, "failed": 0, "deferred": 0}
+        assert sorted(len(events) for events in webhook_receiver.events("/hooks/merchant")) == [1, 2]
+        assert [[e["data"]["order_id"] for e in events] for events in webhook_receiver.events("/hooks/other")] == [
+            [order_another_user.pk]
+        ]
+
+    def test_failed_batch_backs_off(self, merchant, webhook_receiver):
+        """Test a rejected request leaves its events pending for an exponentially delayed retry."""
+        webhook_receiver.status = 503
+        order = Order.objects.create(user=merchant, address="Hook Street")
+        notification = Notification.objects.create(
+            order=order, channel=Notification.Channel.WEBHOOK, payload={"event": "order.created"}, attempts=2,
+        )
+        with patch.object(send_notification_batch, "apply_async") as requeue:
+            result = send_notification_batch.apply(args=[[notification.pk], "WEBHOOK"]).get()
+
+        assert result == {"sent": 0, "failed": 1, "deferred": 0}
+        notification.refresh_from_db()
+        assert (notification.status, notification.attempts) == (Notification.Status.PENDING, 3)
+        assert "503" in notification.error_message
+        # Third attempt of the WEBHOOK channel: 15s doubled twice
+        requeue.assert_called_once_with(args=[[notification.pk], "WEBHOOK"], countdown=60)
+
+        # The batch path dead-letters on the channel's max_retries (8), like deliver_notification
+        Notification.objects.filter(pk=notification.pk).update(attempts=7)
+        with patch.object(send_notification_batch, "apply_async") as requeue:
+            send_notification_batch.apply(args=[[notification.pk], "WEBHOOK"])
+        notification.refresh_from_db()
+        assert (notification.status, notification.attempts) == (Notification.Status.PENDING, 8)
+        with patch.object(send_notification_batch, "apply_async") as requeue:
+            send_notification_batch.apply(args=[[notification.pk], "WEBHOOK"])
+        notification.refresh_from_db()
+        assert (notification.status, notification.attempts) == (Notification.Status.FAILED, 9)
+        assert not requeue.called
+
+    def test_concurrency_capped_per_endpoint(self, settings, merchant, webhook_receiver):
+        """Test parallel requests to one endpoint never exceed its concurrency limit."""
+        settings.NOTIFICATION_WEBHOOK_BATCH_SIZE = 1
+        settings.NOTIFICATION_WEBHOOK_MAX_CONCURRENCY_PER_ENDPOINT = 2
+        webhook_receiver.delay = 0.05
+        orders = [Order.objects.create(user=merchant, address="Hook Street") for _ in range(6)]
+
+        results = WebhookAdapter().deliver_many([(o, "order.created", {}) for o in orders])
+        assert results == [None] * 6
+        assert len(webhook_receiver.requests) == 6
+        assert webhook_receiver.max_in_flight == 2
+
+
+# ============================================================================
+# DEAD LETTER TESTS (3 tests)
+# ============================================================================
+
+class TestDeadLetters:
+    """Tests for dead-lettered notifications and the redrive command."""
+
+    def test_exhausted_delivery_records_error_class(self, settings, user_with_sms):
+        """Test a notification that runs out of retries keeps its error class and failure time."""
+        settings.NOTIFICATION_CHANNEL_OPTIONS = {"SMS": {"max_retries": 0}}
+        order = Order.objects.create(user=user_with_sms, address="Test Address")
+        with patch.object(SmsAdapter, "deliver", side_effect=ConnectionError("gateway down")):
+            send_notification.apply(args=["dead:1", order.pk, "order.created", ["SMS"]])
+
+        notification = Notification.objects.get(order=order)
+        assert notification.status == Notification.Status.FAILED
+        assert notification.error_class == "ConnectionError"
+        assert notification.failed_at is not None
+
+    def test_dead_letter_view_groups_by_error_class(self, admin_client, auth_client, order):
+        """Test the staff-only view counts failures per channel and error class."""
+        for error_class, count in (("SMTPServerDisconnected", 3), ("RuntimeError", 1)):
+            Notification.objects.bulk_create(
+                Notification(order=order, channel="EMAIL", payload={}, status="FAILED", error_class=error_class)
+                for _ in range(count)
+            )
+        Notification.objects.create(order=order, channel="EMAIL", payload={}, status="SENT")
+
+        assert auth_client.get(reverse("notification-dead-letters")).status_code == 403
+        response = admin_client.get(reverse("notification-dead-letters"))
+        assert response.status_code == 200
+        assert response.data["total"] == 4
+        assert [(g["error_class"], g["count"]) for g in response.data["groups"]] == [
+            ("SMTPServerDisconnected", 3), ("RuntimeError", 1),
+        ]
+
+    def test_redrive_goes_through_buffer_and_resumes(self, order_with_items, fresh_email_connection, django_capture_on_commit_callbacks):
+        """Test redrive re-buffers selected failures, they deliver on flush, and a re-run finds nothing left."""
+        failed = [
+            Notification.objects.create(
+                order=order_with_items, channel="EMAIL", unique_key=f"order:{order_with_items.pk}:{n}:EMAIL",
+                payload={"event": "order.created"}, status="FAILED", attempts=6, error_class="SMTPServerDisconnected",
+            )
+            for n in range(3)
+        ]
+        unkeyed = Notification.objects.create(
+            order=order_with_items, channel="EMAIL", payload={"event": "order.created"},
+            status="FAILED", error_class="SMTPServerDisconnected",
+        )
+        other = Notification.objects.create(
+            order=order_with_items, channel="EMAIL", payload={}, status="FAILED", error_class="RuntimeError",
+        )
+
+        with patch.object(flush_notification_buffer, "apply_async") as flush:
+            with django_capture_on_commit_callbacks(execute=True):
+                call_command(
+                    "redrive_notifications", "--error-class", "SMTPServerDisconnected",
+                    "--chunk-size", "2", "--rate", "0", stdout=StringIO(),
+                )
+        assert flush.called
+        assert BufferedNotification.objects.count() == 4
+        assert set(Notification.objects.filter(status="PENDING").values_list("attempts", flat=True)) == {0}
+
+        assert flush_buffered_notifications("EMAIL")["sent"] == 4
+        assert Notification.objects.filter(pk__in=[n.pk for n in failed + [unkeyed]], status="SENT").count() == 4
+        assert Notification.objects.count() == 5
+        assert len(mail.outbox) == 4
+
+        out = StringIO()
+        call_command("redrive_notifications", "--error-class", "SMTPServerDisconnected", stdout=out)
+        assert "redriven=0 of 0" in out.getvalue()
+        other.refresh_from_db()
+        assert other.status == Notification.Status.FAILED
+
+
+# ============================================================================
+# DIGEST TESTS (4 tests)
+# ============================================================================
+
+def buffer_events(order, channel, events, age_seconds=0):
+    """Buffer `events` for `order`, created `age_seconds` ago."""
+    rows = BufferedNotification.objects.bulk_create(
+        BufferedNotification(order=order, unique_key=f"order:{order.pk}:{event}", channel=channel, event=event)
+        for event in events
+    )
+    BufferedNotification.objects.filter(pk__in=[r.pk for r in rows]).update(
+        created_at=timezone.now() - datetime.timedelta(seconds=age_seconds),
+    )
+
+
+class TestNotificationDigests:
+    """Tests for per-order digests (NOTIFICATION_DIGEST_CHANNELS)."""
+
+    @pytest.fixture(autouse=True)
+    def digest_settings(self, settings):
+        settings.NOTIFICATION_DIGEST_CHANNELS = ["EMAIL", "WEBHOOK"]
+        settings.NOTIFICATION_DIGEST_WINDOW_SECONDS = 10
+
+    def test_enqueue_buffers_digest_channels_only(self, order, mock_send_notification, django_capture_on_commit_callbacks):
+        """Test digest channels are buffered with one flush per window while other channels go straight out."""
+        with patch.object(flush_notification_buffer, "apply_async") as flush:
+            for event in ["order.created", "payment.succeeded", "payment.confirmed"]:
+                with django_capture_on_commit_callbacks(execute=True):
+                    enqueue_notification(f"order:{order.pk}:{event}", order.pk, event, ["EMAIL", "SMS"])
+
+        assert BufferedNotification.objects.filter(channel="EMAIL").count() == 3
+        assert not BufferedNotification.objects.filter(channel="SMS").exists()
+        assert [c.args[3] for c in mock_send_notification.call_args_list] == [["SMS"]] * 3
+        assert [(c.kwargs["args"], c.kwargs["countdown"]) for c in flush.call_args_list] == [(["EMAIL"], 10)]
+
+    def test_flush_merges_events_per_order(self, order_with_items, fresh_email_connection):
+        """Test a closed window becomes one email per order, open windows wait, and repeats are not re-sent."""
+        order = order_with_items
+        buffer_events(order, "EMAIL", ["order.created", "payment.succeeded", "payment.confirmed"], age_seconds=11)
+        fresh = Order.objects.create(user=order.user, address="Later Street")
+        buffer_events(fresh, "EMAIL", ["order.created"], age_seconds=4)
+
+        result = flush_buffered_notifications("EMAIL")
+        assert (result["events"], result["sent"]) == (3, 1)
+        assert result["next_in"] == pytest.approx(6, abs=0.5)
+        [message] = mail.outbox
+        assert message.subject == f"Order #{order.pk}: Order placed, Payment received, Payment confirmed"
+        assert "Payment confirmed" in message.alternatives[0][0]
+        notification = Notification.objects.get(order=order)
+        assert notification.unique_key == f"order:{order.pk}:order.created:EMAIL"
+        assert notification.payload["events"] == ["order.created", "payment.succeeded", "payment.confirmed"]
+        assert notification.external_id == f"email:{order.pk}:payment.confirmed"
+        assert BufferedNotification.objects.get().order_id == fresh.pk
+
+        # A redelivered event joins the next window but is not sent again
+        buffer_events(order, "EMAIL", ["order.created"], age_seconds=11)
+        assert flush_buffered_notifications("EMAIL")["sent"] == 0
+        assert len(mail.outbox) == 1
+
+    def test_redelivered_later_event_not_resent(self, order_with_items, fresh_email_connection):
+        """Test an event merged after the first one in a sent digest is not sent again."""
+        order = order_with_items
+        buffer_events(order, "EMAIL", ["order.created", "payment.confirmed"], age_seconds=11)
+        assert flush_buffered_notifications("EMAIL")["sent"] == 1
+        assert Notification.objects.get().payload["keys"] == [
+            f"order:{order.pk}:order.created:EMAIL", f"order:{order.pk}:payment.confirmed:EMAIL",
+        ]
+
+        buffer_events(order, "EMAIL", ["payment.confirmed"], age_seconds=11)
+        assert flush_buffered_notifications("EMAIL")["sent"] == 0
+        assert len(mail.outbox) == 1
+        assert Notification.objects.count() == 1
+
+    def test_webhook_digest_posts_each_event(self, merchant, webhook_receiver):
+        """Test a webhook digest is one request carrying every merged event."""
+        order = Order.objects.create(user=merchant, address="Hook Street")
+        buffer_events(order, "WEBHOOK", ["order.created", "payment.confirmed"], age_seconds=11)
+
+        assert flush_buffered_notifications("WEBHOOK")["sent"] == 1
+        [(_, _, body)] = webhook_receiver.requests
+        assert [e["id"] for e in json.loads(body)["events"]] == [
+            f"order:{order.pk}:order.created", f"order:{order.pk}:payment.confirmed",
+        ]
+
+
+# ============================================================================
+# ASYNC SMS DISPATCH TESTS (3 tests)
+# ============================================================================
+
+class TwilioStub:
+    """Local stand-in for the Twilio Messages API, with keep-alive."""
+
+    def __init__(self):
+        self.requests = []
+        self.client_ports = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+                stub.requests.append((self.path, dict(self.headers), form))
+                stub.client_ports.add(self.client_address[1])
+                if form["To"] == ["+1invalid"]:
+                    status, body = 400, {"message": "Invalid 'To' Phone Number"}
+                else:
+                    status, body = 201, {"sid": f"SM{len(stub.requests)}"}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+
+@pytest.fixture
+def twilio_stub(monkeypatch):
+    stub = TwilioStub()
+    thread = threading.Thread(target=stub.server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("TWILIO_API_BASE_URL", stub.url)
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "AC123")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "secret")
+    monkeypatch.setenv("TWILIO_FROM", "+15550001111")
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+class TestAsyncSmsDispatch:
+    """Tests for the asyncio SMS dispatcher."""
+
+    def test_stub_sends_overlap(self, settings):
+        """Test stub sends with simulated latency run concurrently and keep their order."""
+        settings.SMS_STUB_LATENCY_MS = 50
+        messages = [SmsMessage(to=f"+1555{n:07d}", body="Reminder", reference=str(n)) for n in range(200)]
+
+        started = time.perf_counter()
+        results = sms_async.dispatch(messages, provider="", concurrency=100)
+        # Sequentially this is 10s; two waves of 100 take about 0.1s
+        assert time.perf_counter() - started < 2
+        assert results == [f"sms:stub:{n}" for n in range(200)]
+
+    def test_twilio_requests_share_pool(self, settings, twilio_stub):
+        """Test Twilio sends are authenticated, reuse pooled connections, and report failures per message."""
+        messages = [SmsMessage(to=f"+1555{n:07d}", body="Sale starts now") for n in range(20)]
+        messages[5] = SmsMessage(to="+1invalid", body="Sale starts now")
+
+        results = sms_async.dispatch(messages, provider="twilio", concurrency=4)
+        assert isinstance(results[5], SmsDeliveryError) and "400" in str(results[5])
+        assert all(result.startswith("SM") for n, result in enumerate(results) if n != 5)
+        path, headers, form = twilio_stub.requests[0]
+        assert path == "/2010-04-01/Accounts/AC123/Messages.json"
+        assert headers["Authorization"] == "Basic " + base64.b64encode(b"AC123:secret").decode()
+        assert (form["From"], form["Body"]) == (["+15550001111"], ["Sale starts now"])
+        # Keep-alive: 20 requests over at most `concurrency` connections
+        assert len(twilio_stub.client_ports) <= 4
+
+    def test_sms_batch_and_broadcast_use_dispatcher(self, settings, user_with_sms):
+        """Test SMS batches go through the dispatcher, and broadcasts chunk and respect rate limits."""
+        orders = [Order.objects.create(user=user_with_sms, address="Text Street") for _ in range(3)]
+        notifications = Notification.objects.bulk_create(
+            Notification(order=o, channel=Notification.Channel.SMS, payload={"event": "order.created"}) for o in orders
+        )
+        with patch.object(AsyncSmsDispatcher, "send_many", wraps=AsyncSmsDispatcher(provider="").send_many) as send_many:
+            result = send_notification_batch.apply(args=[[n.pk for n in notifications], "SMS"]).get()
+        assert result == {"sent": 3, "failed": 0, "deferred": 0}
+        assert send_many.call_count == 1
+        assert sorted(Notification.objects.values_list("external_id", flat=True)) == sorted(
+            f"sms:stub:{o.pk}:order.created" for o in orders
+        )
+
+        settings.NOTIFICATION_RATE_LIMITS = {"SMS": {"rate": 10, "burst": 3}}
+        recipients = [f"+1555{n:07d}" for n in range(5)]
+        with patch.object(send_sms_broadcast, "apply_async") as requeue:
+            assert send_sms_broadcast.apply(args=[recipients, "Hi"]).get() == {"sent": 3, "failed": 0, "deferred": 2}
+        assert requeue.call_args.kwargs["args"] == [recipients[3:], "Hi"]
+        assert requeue.call_args.kwargs["countdown"] == pytest.approx(0.2, abs=0.05)
+
+        settings.SMS_BROADCAST_CHUNK_SIZE = 2
+        with patch.object(send_sms_broadcast, "delay") as chunk:
+            assert send_sms_broadcast.apply(args=[recipients, "Hi"]).get() == {"chunks": 3}
+        assert [c.args[0] for c in chunk.call_args_list] == [recipients[0:2], recipients[2:4], recipients[4:]]
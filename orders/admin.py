@@ -1,7 +1,10 @@
 from django.contrib import admin
 from .models import Order, OrderItem
 from .models import Product
+from .models import DailySalesRollup
+from .services.order_events import publish_order_changes
 from django.core.cache import cache
+from django.db.models import Sum
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
@@ -33,6 +36,11 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInline]
     readonly_fields = ("total_amount", "created_at")
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "status" in form.changed_data:
+            publish_order_changes([obj.pk], "order.status")
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -53,6 +61,54 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    """
+    Sales dashboard backed by the rollup table, so totals stay fast
+    regardless of how many orders exist.
+    """
+    change_list_template = "admin/orders/dailysalesrollup/change_list.html"
+    list_display = (
+        "day",
+        "product_id",
+        "product_name",
+        "status",
+        "order_count",
+        "quantity",
+        "revenue",
+    )
+    list_filter = ("status", "day")
+    search_fields = ("product_name", "product_id")
+    date_hierarchy = "day"
+    readonly_fields = list_display + ("refreshed_at",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context=extra_context)
+        try:
+            qs = response.context_data["cl"].queryset
+        except (AttributeError, KeyError):
+            # Redirects / permission errors carry no changelist
+            return response
+
+        response.context_data["summary_totals"] = qs.aggregate(
+            revenue=Sum("revenue"),
+            quantity=Sum("quantity"),
+            order_count=Sum("order_count"),
+        )
+        response.context_data["summary_top_products"] = (
+            qs.values("product_id", "product_name")
+            .annotate(revenue=Sum("revenue"), quantity=Sum("quantity"))
+            .order_by("-revenue")[:10]
+        )
+        return response
+
+
 @receiver(post_save, sender=Product)
 @receiver(post_delete, sender=Product)
 def clear_product_master_cache(sender, **kwargs):
@@ -0,0 +1,88 @@
+"""
+Read-only fast path for order/product list endpoints.
+
+Builds response dicts straight from `.values()` rows instead of running DRF
+field objects per attribute per row. Output must stay identical to
+`OrderResponseSerializer` / `ProductListSerializer`; see the contract tests.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from orders.models import OrderItem
+
+
+ORDER_FIELDS = ("id", "total_amount", "created_at", "address")
+PRODUCT_FIELDS = ("id", "name", "price")
+
+_TWO_PLACES = Decimal("0.01")
+
+
+def decimal_to_str(value) -> str | None:
+    """Same representation as `serializers.DecimalField(decimal_places=2)`."""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return "{:f}".format(value.quantize(_TWO_PLACES))
+
+
+def datetime_to_str(value) -> str | None:
+    """Same representation as `serializers.DateTimeField()` with ISO-8601 output."""
+    if value is None:
+        return None
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def items_by_order(order_ids: Iterable[int]) -> Dict[int, List[dict]]:
+    """Fetch the items for many orders in one query, grouped by order id."""
+    grouped = defaultdict(list)
+    rows = (
+        OrderItem.objects.filter(order_id__in=list(order_ids))
+        .order_by("id")
+        .values_list("order_id", "product_id", "product_name", "price", "quantity")
+    )
+    for order_id, product_id, product_name, price, quantity in rows:
+        grouped[order_id].append({
+            "product_id": product_id,
+            "product_name": product_name,
+            "price": decimal_to_str(price),
+            "quantity": quantity,
+            "line_total": decimal_to_str(price * quantity),
+        })
+    return grouped
+
+
+def serialize_order_rows(rows: Iterable[dict]) -> List[dict]:
+    """
+    Serialize `Order.objects.values(*ORDER_FIELDS)` rows like
+    `OrderResponseSerializer(many=True)`, with nested items.
+    """
+    rows = list(rows)
+    items = items_by_order(row["id"] for row in rows)
+    return [
+        {
+            "id": row["id"],
+            "total_amount": decimal_to_str(row["total_amount"]),
+            "created_at": datetime_to_str(row["created_at"]),
+            "items": items.get(row["id"], []),
+            "address": row["address"],
+        }
+        for row in rows
+    ]
+
+
+def serialize_product_rows(rows: Iterable[dict]) -> List[dict]:
+    """Serialize `Product.objects.values(*PRODUCT_FIELDS)` rows like `ProductListSerializer`."""
+    return [
+        {"id": row["id"], "name": row["name"], "price": decimal_to_str(row["price"])}
+        for row in rows
+    ]
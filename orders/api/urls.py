@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import CreateOrderAPIView, OrderDetailAPIView, ListOrdersAPIView, ProductListAPIView
+from .views import CreateOrderAPIView, OrderDetailAPIView, OrderEventStreamView, ListOrdersAPIView, ProductListAPIView
 
 urlpatterns = [
     path("create/", CreateOrderAPIView.as_view(), name="create-order"),
     path("", ListOrdersAPIView.as_view(), name="order-list"),
     path("<int:pk>/", OrderDetailAPIView.as_view(), name="order-detail"),
+    # Server-Sent Events; serve under ASGI
+    path("<int:pk>/events/", OrderEventStreamView.as_view(), name="order-events"),
     path("products/", ProductListAPIView.as_view(), name="product-list"),
 ]
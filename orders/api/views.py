@@ -1,8 +1,18 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.shortcuts import get_object_or_404
 
 from orders.services.order_creation import (
@@ -10,7 +20,16 @@ from orders.services.order_creation import (
     OrderCreateRequest,
 )
 from orders.api.serializers import OrderCreateSerializer, OrderResponseSerializer, ProductListSerializer
+from orders.api.fast_serializers import (
+    ORDER_FIELDS,
+    PRODUCT_FIELDS,
+    datetime_to_str,
+    serialize_order_rows,
+    serialize_product_rows,
+)
 from orders.models import Order, Product
+from payments.models import Payment
+from orders.services.order_events import order_event_hub
 from config.pagination import StandardResultsPagination
 
 
@@ -39,13 +58,117 @@ class OrderDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        order = get_object_or_404(Order, id=pk)
+        row = get_object_or_404(Order.objects.values("user_id", *ORDER_FIELDS), id=pk)
 
-        if not request.user.is_superuser and order.user_id != request.user.id:
+        if not request.user.is_superuser and row["user_id"] != request.user.id:
             raise PermissionDenied("You do not have permission to view this order.")
 
-        serializer = OrderResponseSerializer(order)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Read-only fast path; same output as OrderResponseSerializer
+        data = serialize_order_rows([row])[0]
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class OrderEventStreamView(View):
+    """Server-Sent Events stream of one order's status (ASGI only).
+
+    Sends the current order and payment status, then a new `status` event on
+    every change published through `orders.services.order_events`. Comment
+    heartbeats keep proxies from closing an idle connection. The stream closes
+    once the order is delivered or cancelled, or after
+    `ORDER_STREAM_TIMEOUT_SECONDS`; EventSource then reconnects by itself.
+
+    EventSource cannot set headers, so the JWT may also be passed as
+    `?access_token=`.
+
+    Under WSGI Django would drain the whole stream before sending a byte and
+    hold a sync worker for the full timeout, so it answers 501 there instead.
+    """
+
+    http_method_names = ["get"]
+    final_statuses = {Order.Status.DELIVERED, Order.Status.CANCELLED}
+
+    @staticmethod
+    def authenticate(request):
+        auth = JWTAuthentication()
+        user_auth = auth.authenticate(request)
+        if user_auth is None and request.GET.get("access_token"):
+            user = auth.get_user(auth.get_validated_token(request.GET["access_token"]))
+            return user
+        return user_auth[0] if user_auth else None
+
+    async def get(self, request, pk):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"detail": "The order stream needs an ASGI server."}, status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        try:
+            user = await sync_to_async(self.authenticate)(request)
+        except (InvalidToken, TokenError) as exc:
+            return JsonResponse({"detail": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        owner_id = await Order.objects.filter(pk=pk).values_list("user_id", flat=True).afirst()
+        if owner_id is None:
+            return JsonResponse({"detail": "No Order matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        if not user.is_superuser and owner_id != user.id:
+            return JsonResponse(
+                {"detail": "You do not have permission to view this order."}, status=status.HTTP_403_FORBIDDEN,
+            )
+
+        response = StreamingHttpResponse(self.stream(pk), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    async def snapshot(pk):
+        row = await Order.objects.filter(pk=pk).values("id", "status", "updated_at", "payment__status").afirst()
+        if row is None:
+            return None
+        return {
+            "order_id": row["id"],
+            "status": row["status"],
+            "payment_status": Payment.public_status(row["payment__status"]),
+            "updated_at": datetime_to_str(row["updated_at"]),
+        }
+
+    @staticmethod
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    async def stream(self, pk):
+        heartbeat = getattr(settings, "ORDER_STREAM_HEARTBEAT_SECONDS", 15)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + getattr(settings, "ORDER_STREAM_TIMEOUT_SECONDS", 300)
+
+        yield f"retry: {getattr(settings, 'ORDER_STREAM_RETRY_MS', 3000)}\n\n"
+        # Subscribe before the first read so a change in between is not lost
+        async with order_event_hub().subscribe(pk) as changes:
+            last = await self.snapshot(pk)
+            if last is None:
+                return
+            yield self.event("status", last)
+            while last["status"] not in self.final_statuses:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    yield self.event("timeout", {"order_id": pk})
+                    return
+                try:
+                    await asyncio.wait_for(changes.get(), timeout=min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                current = await self.snapshot(pk)
+                if current is None:
+                    return
+                if current != last:
+                    last = current
+                    yield self.event("status", current)
+            yield self.event("end", {"order_id": pk})
 
 
 class ListOrdersAPIView(generics.ListAPIView):
@@ -57,14 +180,17 @@ class ListOrdersAPIView(generics.ListAPIView):
         - page_size: Items per page (default: 10, max: 100)
     """
     permission_classes = [IsAuthenticated]
+    # Used for the schema; responses are built by the fast path in list()
     serializer_class = OrderResponseSerializer
     pagination_class = StandardResultsPagination
 
     def get_queryset(self):
-        return (
-            Order.objects.filter(user=self.request.user)
-            .prefetch_related("items")
-        )
+        return Order.objects.filter(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*ORDER_FIELDS))
+        return self.get_paginated_response(serialize_order_rows(page))
 
 
 class ProductListAPIView(generics.ListAPIView):
@@ -77,6 +203,12 @@ class ProductListAPIView(generics.ListAPIView):
         - page_size: Items per page (default: 10, max: 100)
     """
     permission_classes = [IsAuthenticated]
+    # Used for the schema; responses are built by the fast path in list()
     serializer_class = ProductListSerializer
     pagination_class = StandardResultsPagination
     queryset = Product.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*PRODUCT_FIELDS))
+        return self.get_paginated_response(serialize_product_rows(page))
@@ -0,0 +1,54 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Order
+from orders.services.reporting import (
+    GROUP_BY_CHOICES,
+    load_order_items,
+    minor_to_decimal,
+)
+
+
+class Command(BaseCommand):
+    help = "Vectorised order-item analytics (revenue, quantity, percentiles, top products)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group-by", choices=GROUP_BY_CHOICES, default="product")
+        parser.add_argument("--top", type=int, default=10, help="Number of top products to show.")
+        parser.add_argument("--since", type=date.fromisoformat, help="First order day (YYYY-MM-DD).")
+        parser.add_argument("--until", type=date.fromisoformat, help="Last order day (YYYY-MM-DD).")
+        parser.add_argument("--status", action="append", choices=Order.Status.values, help="Repeatable.")
+        parser.add_argument(
+            "--percentiles",
+            default="50,90,95,99",
+            help="Comma-separated order-total percentiles.",
+        )
+        parser.add_argument("--limit", type=int, default=50, help="Max grouped rows to print.")
+        parser.add_argument("--refresh", action="store_true", help="Ignore the on-disk cache and reload.")
+        parser.add_argument("--no-cache", action="store_true", help="Do not read or write the on-disk cache.")
+
+    def handle(self, *args, **options):
+        try:
+            percentiles = [float(p) for p in options["percentiles"].split(",") if p.strip()]
+        except ValueError:
+            raise CommandError("--percentiles must be comma-separated numbers")
+
+        frame = load_order_items(use_cache=not options["no_cache"], refresh=options["refresh"])
+        frame = frame.filter(since=options["since"], until=options["until"], statuses=options["status"])
+        self.stdout.write(f"order items: {len(frame)}")
+
+        by = options["group_by"]
+        totals = frame.grouped(by)
+        self.stdout.write(f"\nrevenue by {by}:")
+        for key, revenue, quantity in list(zip(totals.keys, totals.revenue_minor, totals.quantity))[: options["limit"]]:
+            self.stdout.write(f"  {frame.label_for(by, key):<40} qty={int(quantity):>8}  revenue={minor_to_decimal(revenue)}")
+
+        self.stdout.write(f"\ntop {options['top']} products by revenue:")
+        top = frame.top_products(options["top"])
+        for key, revenue, quantity in zip(top.keys, top.revenue_minor, top.quantity):
+            self.stdout.write(f"  {frame.label_for('product', key):<40} qty={int(quantity):>8}  revenue={minor_to_decimal(revenue)}")
+
+        self.stdout.write("\norder total percentiles:")
+        for p, value in frame.order_total_percentiles(percentiles).items():
+            self.stdout.write(f"  p{p:g}: {value}")
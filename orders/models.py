@@ -3,6 +3,9 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
 
 class Order(models.Model):
@@ -52,6 +55,8 @@ class Order(models.Model):
             models.Index(fields=["user"]),
             models.Index(fields=["status"]),
             models.Index(fields=["created_at"]),
+            # High-water-mark scan of refresh_sales_rollups
+            models.Index(fields=["updated_at"]),
         ]
 
     def __str__(self) -> str:
@@ -124,3 +129,75 @@ class Product(models.Model):
 
     def __str__(self) -> str:
         return f"{self.name} ({self.id})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Pre-aggregated sales per day x product x order status.
+    Maintained incrementally by `refresh_sales_rollups`; never edit by hand.
+    """
+
+    day = models.DateField()
+    product_id = models.PositiveIntegerField()
+    product_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+
+    order_count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal("0.00"),
+    )
+
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-day", "product_id", "status"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "product_id", "status"],
+                name="unique_sales_rollup_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product_id", "day"]),
+            models.Index(fields=["status", "day"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} | {self.product_name} | {self.status}"
+
+
+class RollupCheckpoint(models.Model):
+    """
+    High-water mark (max `Order.updated_at` already folded in) per rollup job.
+    """
+
+    name = models.CharField(max_length=64, unique=True)
+    high_water_mark = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class RollupDirtyDay(models.Model):
+    """
+    A day whose rollup buckets must be rebuilt although no remaining order
+    changed: deleted orders leave nothing behind for the high-water mark scan.
+    """
+
+    day = models.DateField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return str(self.day)
+
+
+@receiver(post_delete, sender=Order)
+def mark_rollup_day_dirty(sender, instance, **kwargs):
+    RollupDirtyDay.objects.bulk_create(
+        [RollupDirtyDay(day=timezone.localdate(instance.created_at))],
+        ignore_conflicts=True,
+    )
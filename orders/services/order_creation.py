@@ -9,7 +9,7 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 
 from orders.models import Order, OrderItem, Product
-from notifications.tasks import send_notification
+from notifications.tasks import enqueue_notification
 
 
 User = get_user_model()
@@ -96,10 +96,12 @@ class OrderCreationService:
                 channels.append('EMAIL')
             if getattr(user, 'notify_sms', False) and getattr(user, 'phone_number', None):
                 channels.append('SMS')
+            if getattr(user, 'has_webhook_endpoint', False):
+                channels.append('WEBHOOK')
 
             if channels:
                 unique_key = f"order:{order.pk}:created"
-                send_notification.delay(unique_key, order.id, 'order.created', channels)
+                enqueue_notification(unique_key, order.id, 'order.created', channels)
         except Exception:
             # Notification failure should not block order creation
             pass
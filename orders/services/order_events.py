@@ -0,0 +1,187 @@
+"""
+Order status change notifications for the SSE stream (`OrderEventStreamView`).
+
+Writers call `publish_order_changes` inside their transaction. After commit, a
+marker is written to the cache and, when `ORDER_EVENTS_REDIS_URL` is set, the
+change is published on the Redis channel `order-events:<id>`.
+
+Each ASGI worker runs one `OrderEventHub` per event loop. It holds a single
+pattern subscription, or without Redis polls the cache markers of the orders
+being watched, and fans changes out to the open streams. Messages only say
+that something changed. The stream re-reads the order, so a lost or
+duplicated message costs at most one extra read.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+CHANNEL_PREFIX = "order-events:"
+# Markers only need to outlive one poll interval
+MARKER_TTL_SECONDS = 300
+
+_publisher = None
+
+
+def order_channel(order_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{order_id}"
+
+
+def _redis_url() -> Optional[str]:
+    return getattr(settings, "ORDER_EVENTS_REDIS_URL", None)
+
+
+def _redis_publisher():
+    global _publisher
+    if _publisher is None:
+        import redis
+
+        _publisher = redis.Redis.from_url(_redis_url())
+    return _publisher
+
+
+def _async_redis_client():
+    import redis.asyncio as aioredis
+
+    return aioredis.Redis.from_url(_redis_url())
+
+
+def _publish(order_ids: list, reason: str) -> None:
+    message = {"reason": reason, "stamp": time.time_ns()}
+    try:
+        cache.set_many({order_channel(pk): message for pk in order_ids}, timeout=MARKER_TTL_SECONDS)
+    except Exception:
+        logger.warning("Could not write order change markers for %s", order_ids, exc_info=True)
+    if not _redis_url():
+        return
+    try:
+        with _redis_publisher().pipeline(transaction=False) as pipe:
+            for pk in order_ids:
+                pipe.publish(order_channel(pk), json.dumps({"order_id": pk, **message}))
+            pipe.execute()
+    except Exception:
+        # Streams fall back to their timeout/reconnect; the write itself succeeded
+        logger.warning("Could not publish order changes for %s", order_ids, exc_info=True)
+
+
+def publish_order_changes(order_ids: Iterable[int], reason: str) -> None:
+    """Tell open streams that these orders changed, once the current transaction commits."""
+    order_ids = sorted(set(order_ids))
+    if order_ids:
+        transaction.on_commit(lambda: _publish(order_ids, reason))
+
+
+class OrderEventHub:
+    """Fans order change messages out to the streams of one event loop."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        # Last marker stamp seen per watched order (cache polling mode)
+        self._seen: Dict[int, Optional[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Set while the Redis pattern subscription is active
+        self._listening = asyncio.Event()
+
+    @asynccontextmanager
+    async def subscribe(self, order_id: int):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        if order_id not in self._subscribers and not _redis_url():
+            # Baseline before the caller reads its snapshot, so nothing between is missed
+            marker = await cache.aget(order_channel(order_id))
+            self._seen[order_id] = marker["stamp"] if marker else None
+        self._subscribers[order_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        try:
+            if _redis_url():
+                # Messages published before the psubscribe lands are lost, so the
+                # caller may only read its snapshot once it is in place
+                listening = asyncio.ensure_future(self._listening.wait())
+                try:
+                    await asyncio.wait({listening, self._task}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    listening.cancel()
+            yield queue
+        finally:
+            queues = self._subscribers.get(order_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[order_id]
+                    self._seen.pop(order_id, None)
+
+    def _dispatch(self, order_id: int, message: dict) -> None:
+        for queue in self._subscribers.get(order_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # The stream is behind anyway; its next read picks up the latest state
+                pass
+
+    async def _run(self) -> None:
+        try:
+            # A stream can subscribe while the listener is shutting down (closing
+            # its Redis connection); it saw a running task, so start over for it
+            while self._subscribers:
+                if _redis_url():
+                    await self._listen_redis()
+                else:
+                    await self._poll_cache()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Order event hub stopped; streams will end at their timeout")
+
+    async def _listen_redis(self) -> None:
+        client = _async_redis_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            self._listening.set()
+            while self._subscribers:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message["type"] != "pmessage":
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                    self._dispatch(int(payload["order_id"]), payload)
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Ignoring malformed order event %r", message["data"])
+        finally:
+            self._listening.clear()
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def _poll_cache(self) -> None:
+        interval = getattr(settings, "ORDER_STREAM_POLL_SECONDS", 1.0)
+        while self._subscribers:
+            keys = {order_channel(pk): pk for pk in self._subscribers}
+            found = await cache.aget_many(list(keys))
+            for key, marker in found.items():
+                order_id = keys[key]
+                if self._seen.get(order_id) != marker["stamp"]:
+                    self._seen[order_id] = marker["stamp"]
+                    self._dispatch(order_id, {"order_id": order_id, **marker})
+            await asyncio.sleep(interval)
+
+
+_hubs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderEventHub]" = weakref.WeakKeyDictionary()
+
+
+def order_event_hub() -> OrderEventHub:
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = OrderEventHub()
+    return hub
@@ -0,0 +1,256 @@
+"""
+Columnar order-item analytics: money as integer paise in NumPy arrays,
+aggregated with vectorised sort/reduce, cached on disk as memory-mapped .npy.
+"""
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db.models import BigIntegerField, F, Max
+from django.db.models.functions import Cast, TruncDate
+
+from orders.models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+COLUMNS = ("order_id", "product_id", "quantity", "price_minor", "day", "status")
+COLUMN_DTYPES = {
+    "order_id": np.int64,
+    "product_id": np.int64,
+    "quantity": np.int64,
+    "price_minor": np.int64,
+    "day": np.int32,
+    "status": np.int8,
+}
+STATUS_CODES = {value: code for code, value in enumerate(Order.Status.values)}
+GROUP_BY_CHOICES = ("product", "day", "status", "order")
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def minor_to_decimal(value) -> Decimal:
+    """Convert an integer amount in paise to a 2dp Decimal."""
+    return Decimal(int(value)).scaleb(-2)
+
+
+def _day_number(value: date) -> int:
+    return int((np.datetime64(value, "D") - _EPOCH).astype(np.int64))
+
+
+@dataclass(frozen=True)
+class GroupedTotals:
+    keys: np.ndarray
+    revenue_minor: np.ndarray
+    quantity: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def group_sum(keys: np.ndarray, *values: np.ndarray):
+    """
+    Sum each of `values` per distinct key.
+
+    Sorting plus `np.add.reduceat` keeps the sums in exact int64 arithmetic,
+    unlike `np.bincount(weights=...)` which goes through float64.
+    """
+    if len(keys) == 0:
+        return (keys[:0],) + tuple(v[:0] for v in values)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    sums = tuple(np.add.reduceat(v[order], starts) for v in values)
+    return (sorted_keys[starts],) + sums
+
+
+class OrderItemFrame:
+    """Column arrays for a set of order items (one entry per item)."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], product_names: Optional[Dict[int, str]] = None):
+        self.columns = columns
+        self.product_names = product_names or {}
+
+    def __len__(self) -> int:
+        return len(self.columns["order_id"])
+
+    @property
+    def line_total_minor(self) -> np.ndarray:
+        return self.columns["price_minor"] * self.columns["quantity"]
+
+    def filter(self, *, since: date | None = None, until: date | None = None, statuses: Iterable[str] | None = None) -> "OrderItemFrame":
+        """Return a new frame restricted to a day range (inclusive) and/or statuses."""
+        mask = np.ones(len(self), dtype=bool)
+        if since is not None:
+            mask &= self.columns["day"] >= _day_number(since)
+        if until is not None:
+            mask &= self.columns["day"] <= _day_number(until)
+        if statuses:
+            codes = [STATUS_CODES[s] for s in statuses]
+            mask &= np.isin(self.columns["status"], codes)
+        return OrderItemFrame({name: col[mask] for name, col in self.columns.items()}, self.product_names)
+
+    def grouped(self, by: str = "product") -> GroupedTotals:
+        """Revenue and quantity per product, day, status or order."""
+        if by not in GROUP_BY_CHOICES:
+            raise ValueError(f"Unknown group_by {by!r}; expected one of {GROUP_BY_CHOICES}")
+        key_column = {"product": "product_id", "day": "day", "status": "status", "order": "order_id"}[by]
+        keys, revenue, quantity = group_sum(self.columns[key_column], self.line_total_minor, self.columns["quantity"])
+        return GroupedTotals(keys=keys, revenue_minor=revenue, quantity=quantity)
+
+    def top_products(self, n: int = 10, by: str = "revenue") -> GroupedTotals:
+        """The `n` products with the highest revenue (or quantity), descending."""
+        totals = self.grouped("product")
+        metric = totals.revenue_minor if by == "revenue" else totals.quantity
+        n = min(n, len(totals))
+        if n == 0:
+            return totals
+        # argpartition is O(N); only the selected head is fully sorted
+        head = np.argpartition(-metric, n - 1)[:n]
+        head = head[np.argsort(-metric[head], kind="stable")]
+        return GroupedTotals(keys=totals.keys[head], revenue_minor=totals.revenue_minor[head], quantity=totals.quantity[head])
+
+    def order_total_percentiles(self, percentiles: Sequence[float] = (50, 90, 95, 99)) -> Dict[float, Decimal]:
+        """Percentiles of per-order totals, in rupees."""
+        order_totals = self.grouped("order").revenue_minor
+        if len(order_totals) == 0:
+            return {p: Decimal("0.00") for p in percentiles}
+        values = np.percentile(order_totals, list(percentiles))
+        return {p: minor_to_decimal(np.rint(v)) for p, v in zip(percentiles, values)}
+
+    def label_for(self, by: str, key) -> str:
+        if by == "product":
+            return f"{self.product_names.get(int(key), '?')} ({int(key)})"
+        if by == "day":
+            return str(_EPOCH + np.timedelta64(int(key), "D"))
+        if by == "status":
+            return Order.Status.values[int(key)]
+        return str(int(key))
+
+
+# ----------------------------------------------------------------------------
+# Loading and on-disk cache
+# ----------------------------------------------------------------------------
+
+def _fingerprint() -> Dict[str, str]:
+    """Cheap summary that changes whenever order items or order statuses change."""
+    items = OrderItem.objects.aggregate(max_id=Max("id"))
+    orders = Order.objects.aggregate(latest=Max("updated_at"))
+    return {
+        "item_count": str(OrderItem.objects.count()),
+        "max_item_id": str(items["max_id"]),
+        "orders_updated_at": str(orders["latest"]),
+    }
+
+
+def load_from_db(chunk_size: int = 50000) -> OrderItemFrame:
+    """Stream every order item from the DB into column arrays."""
+    qs = (
+        OrderItem.objects.annotate(
+            price_minor=Cast(F("price") * 100, BigIntegerField()),
+            day=TruncDate("order__created_at"),
+            order_status=F("order__status"),
+        )
+        .values_list("order_id", "product_id", "quantity", "price_minor", "day", "order_status")
+        .order_by("id")
+    )
+
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name in COLUMNS}
+
+    def flush(rows):
+        if not rows:
+            return
+        order_ids, product_ids, quantities, prices, days, statuses = zip(*rows)
+        chunks["order_id"].append(np.fromiter(order_ids, np.int64, len(rows)))
+        chunks["product_id"].append(np.fromiter(product_ids, np.int64, len(rows)))
+        chunks["quantity"].append(np.fromiter(quantities, np.int64, len(rows)))
+        chunks["price_minor"].append(np.fromiter(prices, np.int64, len(rows)))
+        chunks["day"].append((np.array(days, dtype="datetime64[D]") - _EPOCH).astype(np.int32))
+        chunks["status"].append(np.fromiter((STATUS_CODES[s] for s in statuses), np.int8, len(rows)))
+
+    buffer = []
+    for row in qs.iterator(chunk_size=chunk_size):
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            flush(buffer)
+            buffer = []
+    flush(buffer)
+
+    columns = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=COLUMN_DTYPES[name])
+        for name, parts in chunks.items()
+    }
+    product_names = dict(
+        OrderItem.objects.values("product_id")
+        .annotate(name=Max("product_name"))
+        .values_list("product_id", "name")
+        .order_by()
+    )
+    return OrderItemFrame(columns, product_names)
+
+
+def _cache_dir() -> Path:
+    return Path(getattr(settings, "REPORTING_CACHE_DIR", settings.BASE_DIR / "var" / "reporting")) / "order_items"
+
+
+def _write_cache(frame: OrderItemFrame, fingerprint: Dict[str, str], target: Path) -> None:
+    # Build in a sibling directory and swap it in so readers never see a half-written cache
+    tmp = target.with_name(f"{target.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, column in frame.columns.items():
+        np.save(tmp / f"{name}.npy", column)
+    meta = {
+        "fingerprint": fingerprint,
+        "product_names": {str(k): v for k, v in frame.product_names.items()},
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta))
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+
+def _read_cache(target: Path, fingerprint: Dict[str, str]) -> Optional[OrderItemFrame]:
+    meta_path = target / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+    except ValueError:
+        return None
+    if meta.get("fingerprint") != fingerprint:
+        return None
+    columns = {name: np.load(target / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+    product_names = {int(k): v for k, v in meta.get("product_names", {}).items()}
+    return OrderItemFrame(columns, product_names)
+
+
+def load_order_items(*, use_cache: bool = True, refresh: bool = False) -> OrderItemFrame:
+    """
+    Return all order items as an `OrderItemFrame`.
+
+    With `use_cache`, columns are memory-mapped from the on-disk cache when the
+    tables have not changed since it was written; `refresh` forces a reload.
+    """
+    if not use_cache:
+        return load_from_db()
+
+    target = _cache_dir()
+    fingerprint = _fingerprint()
+    if not refresh:
+        frame = _read_cache(target, fingerprint)
+        if frame is not None:
+            logger.info("Order-item report cache hit (%s rows)", len(frame))
+            return frame
+
+    frame = load_from_db()
+    _write_cache(frame, fingerprint, target)
+    logger.info("Order-item report cache rebuilt (%s rows)", len(frame))
+    return frame
@@ -0,0 +1,154 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+from typing import Iterable, List, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.models import DailySalesRollup, Order, OrderItem, RollupCheckpoint, RollupDirtyDay
+
+logger = logging.getLogger(__name__)
+
+
+DAILY_SALES_CHECKPOINT = "daily_sales"
+
+
+@dataclass(frozen=True)
+class RollupResult:
+    changed_orders: int
+    days_refreshed: int
+    buckets_written: int
+    high_water_mark: object
+
+
+def _chunks(values: List, size: int) -> Iterable[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _created_on(days: List) -> Q:
+    """
+    Orders created on any of `days` (current timezone), as half-open
+    `created_at` ranges so the index is usable; runs of consecutive days
+    share one range.
+    """
+    tz = timezone.get_current_timezone()
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + timedelta(days=1)
+        else:
+            ranges.append([day, day + timedelta(days=1)])
+    return reduce(or_, (
+        Q(order__created_at__gte=timezone.make_aware(datetime.combine(start, datetime.min.time()), tz),
+          order__created_at__lt=timezone.make_aware(datetime.combine(end, datetime.min.time()), tz))
+        for start, end in ranges
+    ))
+
+
+def _rebuild_days(days: List) -> int:
+    """
+    Recompute every rollup bucket for the given days from the source tables.
+
+    Whole days are rebuilt rather than patched with deltas: an order moving
+    from PENDING to PAID has to leave one bucket and enter another, and
+    re-aggregating one day of order items is cheap with the created_at index.
+    """
+    line_total = ExpressionWrapper(
+        F("price") * F("quantity"),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    rows = (
+        OrderItem.objects.filter(_created_on(days))
+        .annotate(day=TruncDate("order__created_at"), status=F("order__status"))
+        .values("day", "product_id", "status")
+        .annotate(
+            product_name=Max("product_name"),
+            order_count=Count("order_id", distinct=True),
+            quantity_sum=Sum("quantity"),
+            revenue=Sum(line_total),
+        )
+        .order_by()
+    )
+    buckets = [
+        DailySalesRollup(
+            day=row["day"],
+            product_id=row["product_id"],
+            product_name=row["product_name"],
+            status=row["status"],
+            order_count=row["order_count"],
+            quantity=row["quantity_sum"] or 0,
+            revenue=row["revenue"] or 0,
+        )
+        for row in rows
+    ]
+
+    DailySalesRollup.objects.filter(day__in=days).delete()
+    DailySalesRollup.objects.bulk_create(buckets, batch_size=1000)
+    return len(buckets)
+
+
+def refresh_sales_rollups() -> RollupResult:
+    """
+    Fold orders changed since the last high-water mark into `DailySalesRollup`.
+
+    Only days that contain a changed order, or that lost one to a delete
+    (`RollupDirtyDay`), are recomputed. The scan re-reads a small overlap
+    window before the stored mark so rows committed late by long-running
+    transactions are not skipped; rebuilding a day is idempotent.
+    """
+    overlap = timedelta(seconds=getattr(settings, "SALES_ROLLUP_OVERLAP_SECONDS", 300))
+    days_per_batch = getattr(settings, "SALES_ROLLUP_DAYS_PER_BATCH", 31)
+
+    with transaction.atomic():
+        # Row lock serialises concurrent beat runs on the same checkpoint
+        RollupCheckpoint.objects.get_or_create(name=DAILY_SALES_CHECKPOINT)
+        checkpoint = RollupCheckpoint.objects.select_for_update().get(name=DAILY_SALES_CHECKPOINT)
+
+        changed = Order.objects.all()
+        if checkpoint.high_water_mark is not None:
+            changed = changed.filter(updated_at__gt=checkpoint.high_water_mark - overlap)
+
+        stats = changed.aggregate(count=Count("id"), latest=Max("updated_at"))
+        dirty = list(RollupDirtyDay.objects.values_list("pk", "day"))
+        if not stats["count"] and not dirty:
+            return RollupResult(0, 0, 0, checkpoint.high_water_mark)
+
+        days: Set = {day for _, day in dirty}
+        if stats["count"]:
+            days.update(
+                changed.annotate(day=TruncDate("created_at"))
+                .values_list("day", flat=True)
+                .order_by()
+                .distinct()
+            )
+
+        written = 0
+        for batch in _chunks(sorted(days), days_per_batch):
+            written += _rebuild_days(batch)
+        # By pk, so a day dirtied again by a concurrent delete stays queued
+        RollupDirtyDay.objects.filter(pk__in=[pk for pk, _ in dirty]).delete()
+
+        if stats["latest"] and (checkpoint.high_water_mark is None or stats["latest"] > checkpoint.high_water_mark):
+            checkpoint.high_water_mark = stats["latest"]
+        checkpoint.save(update_fields=["high_water_mark", "updated_at"])
+
+    logger.info(
+        "Sales rollup refreshed: orders=%s days=%s buckets=%s hwm=%s",
+        stats["count"], len(days), written, checkpoint.high_water_mark,
+    )
+    return RollupResult(stats["count"], len(days), written, checkpoint.high_water_mark)
+
+
+def rebuild_sales_rollups() -> RollupResult:
+    """Drop the checkpoint and every bucket, then recompute the full history."""
+    with transaction.atomic():
+        RollupCheckpoint.objects.filter(name=DAILY_SALES_CHECKPOINT).delete()
+        DailySalesRollup.objects.all().delete()
+        return refresh_sales_rollups()
@@ -0,0 +1,17 @@
+import logging
+from celery import shared_task
+
+from orders.services.sales_rollup import refresh_sales_rollups
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_sales_rollups_task():
+    """Beat-scheduled: fold recently changed orders into the daily sales rollups."""
+    result = refresh_sales_rollups()
+    return {
+        "changed_orders": result.changed_orders,
+        "days_refreshed": result.days_refreshed,
+        "buckets_written": result.buckets_written,
+    }
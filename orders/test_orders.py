@@ -1,29 +1,50 @@
 """
-Tests for the orders app - 20 tests.
-Covers models, serializers, views, and services.
+Tests for the orders app - 38 tests.
+Covers models, serializers, fast read serializers, views, order event stream, services, sales rollups, and reporting.
 """
+import asyncio
+import json
 import pytest
+import numpy as np
+from datetime import date, datetime, timezone as dt_timezone
 from decimal import Decimal
 
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth import get_user_model
+from django.test import AsyncClient
 from django.urls import reverse
 from django.core.cache import cache
+from django.core.management import call_command
+from io import StringIO
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from orders.models import Order, OrderItem, Product
+from orders.models import Order, OrderItem, Product, DailySalesRollup, RollupDirtyDay
+from notifications.models import BufferedNotification
 from orders.api.serializers import (
     OrderItemInputSerializer,
     OrderCreateSerializer,
     OrderResponseSerializer,
     ProductListSerializer,
 )
+from orders.api.fast_serializers import (
+    ORDER_FIELDS,
+    PRODUCT_FIELDS,
+    serialize_order_rows,
+    serialize_product_rows,
+)
 from orders.services.order_creation import (
     OrderCreationService,
     OrderCreateRequest,
     OrderItemRequest,
     load_product_master,
 )
+from orders.services import order_events
+from orders.services.order_events import OrderEventHub, publish_order_changes
+from orders.services.sales_rollup import refresh_sales_rollups
+from orders.services.reporting import load_order_items, minor_to_decimal
 
 
 User = get_user_model()
@@ -122,7 +143,35 @@ class TestOrderSerializers:
 
 
 # ============================================================================
-# SERVICE TESTS (5 tests)
+# FAST READ SERIALIZER CONTRACT TESTS (3 tests)
+# ============================================================================
+
+class TestFastReadSerializers:
+    """The fast path must render byte-identical JSON to the DRF serializers."""
+
+    def test_orders_match_order_response_serializer(self, order_with_items, paid_order, order):
+        """Test orders with and without items render identically."""
+        qs = Order.objects.filter(user=order_with_items.user)
+        expected = OrderResponseSerializer(qs.prefetch_related("items"), many=True).data
+        fast = serialize_order_rows(qs.values(*ORDER_FIELDS))
+        assert JSONRenderer().render(fast) == JSONRenderer().render(expected)
+
+    def test_products_match_product_list_serializer(self, products):
+        """Test product rows render identically."""
+        qs = Product.objects.all()
+        expected = ProductListSerializer(qs, many=True).data
+        fast = serialize_product_rows(qs.values(*PRODUCT_FIELDS))
+        assert JSONRenderer().render(fast) == JSONRenderer().render(expected)
+
+    def test_order_detail_matches_serializer(self, auth_client, order_with_items):
+        """Test the detail endpoint still returns the serializer's output."""
+        response = auth_client.get(reverse("order-detail", kwargs={"pk": order_with_items.pk}))
+        expected = OrderResponseSerializer(order_with_items).data
+        assert response.content == JSONRenderer().render(expected)
+
+
+# ============================================================================
+# SERVICE TESTS (6 tests)
 # ============================================================================
 
 class TestOrderCreationService:
@@ -140,6 +189,31 @@ class TestOrderCreationService:
         product.refresh_from_db()
         assert product.inventory == 98
 
+    def test_failed_buffer_insert_keeps_order(self, settings, monkeypatch, user, product):
+        """Test a notification buffer insert that fails in the DB does not roll back the order."""
+        settings.NOTIFICATION_BATCHING = True
+        real_bulk_create = BufferedNotification.objects.bulk_create
+        inserted = []
+
+        def broken_bulk_create(objs, **kwargs):
+            objs = list(objs)
+            inserted.extend(objs)
+            for obj in objs:
+                obj.event = None  # NOT NULL violation raised by the database
+            return real_bulk_create(objs, **kwargs)
+
+        request = OrderCreateRequest(
+            user_id=user.id,
+            items=[OrderItemRequest(product_id=product.id, quantity=2, product_name=product.name, price=product.price)],
+            address="123 Test St",
+        )
+        monkeypatch.setattr(BufferedNotification.objects, "bulk_create", broken_bulk_create)
+        order = OrderCreationService.create_order(request)
+        assert inserted
+        assert Order.objects.filter(pk=order.pk).exists()
+        product.refresh_from_db()
+        assert product.inventory == 98
+
     def test_create_order_empty_items(self, db, user):
         """Test order creation fails with empty items."""
         request = OrderCreateRequest(user_id=user.id, items=[], address="123 Test St")
@@ -220,3 +294,236 @@ class TestOrderAPIViews:
         assert len(response.data["results"]) == 2
         for p in response.data["results"]:
             assert "inventory" not in p
+
+
+# ============================================================================
+# ORDER EVENT STREAM TESTS (5 tests)
+# ============================================================================
+
+@pytest.fixture
+def stream_settings(settings):
+    settings.ORDER_EVENTS_REDIS_URL = None
+    settings.ORDER_STREAM_POLL_SECONDS = 0.02
+    settings.ORDER_STREAM_HEARTBEAT_SECONDS = 5
+    settings.ORDER_STREAM_TIMEOUT_SECONDS = 5
+    return settings
+
+
+class FakeRedisPubSub:
+    """In-memory pattern subscription with slow subscribe and close round trips."""
+
+    def __init__(self, log):
+        self.log = log
+        self.messages = asyncio.Queue()
+
+    async def psubscribe(self, pattern):
+        await asyncio.sleep(0.05)
+        self.log.append("psubscribe")
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.log.append("close")
+        await asyncio.sleep(0.1)
+
+
+class FakeRedis:
+    def __init__(self, log):
+        self._pubsub = FakeRedisPubSub(log)
+
+    def pubsub(self):
+        return self._pubsub
+
+    async def aclose(self):
+        pass
+
+
+class TestOrderEventStream:
+    """Tests for the Server-Sent Events order status stream."""
+
+    def test_redis_hub_subscribes_before_yielding_and_restarts(self, settings, monkeypatch):
+        """Test a stream only gets its queue once psubscribe is active, even while the last listener is closing."""
+        settings.ORDER_EVENTS_REDIS_URL = "redis://events"
+        log, clients = [], []
+        monkeypatch.setattr(order_events, "_async_redis_client", lambda: clients.append(FakeRedis(log)) or clients[-1])
+
+        async def run():
+            hub = OrderEventHub()
+            async with hub.subscribe(1):
+                assert log == ["psubscribe"]
+            # The last stream left; subscribe again while the listener closes its connection
+            while "close" not in log:
+                await asyncio.sleep(0.01)
+            async with hub.subscribe(2) as queue:
+                assert log == ["psubscribe", "close", "psubscribe"]
+                clients[-1].pubsub().messages.put_nowait(
+                    {"type": "pmessage", "data": json.dumps({"order_id": 2, "reason": "test"})}
+                )
+                return await asyncio.wait_for(queue.get(), 2)
+
+        assert async_to_sync(run)() == {"order_id": 2, "reason": "test"}
+
+    async def _open(self, order, user=None, **params):
+        headers = {}
+        if user is not None:
+            headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        return await AsyncClient().get(reverse("order-events", kwargs={"pk": order.pk}), params, headers=headers)
+
+    def test_stream_pushes_status_changes(self, stream_settings, django_capture_on_commit_callbacks, user, order):
+        """Test the stream sends the snapshot, each published change, and ends on a final status."""
+        def change(new_status):
+            with django_capture_on_commit_callbacks(execute=True):
+                Order.objects.filter(pk=order.pk).update(status=new_status)
+                publish_order_changes([order.pk], "test")
+
+        async def run():
+            response = await self._open(order, user)
+            assert response["Content-Type"] == "text/event-stream"
+            chunks = []
+            async for chunk in response.streaming_content:
+                chunks.append(chunk.decode())
+                if chunk.startswith(b"event: status"):
+                    await asyncio.sleep(0.05)
+                    await sync_to_async(change)(
+                        Order.Status.PAID if len(chunks) == 2 else Order.Status.CANCELLED
+                    )
+            return chunks
+
+        chunks = async_to_sync(run)()
+        assert chunks[0] == "retry: 3000\n\n"
+        statuses = [c for c in chunks if c.startswith("event: status")]
+        assert len(statuses) == 3
+        assert '"status":"PENDING"' in statuses[0]
+        assert '"status":"PAID"' in statuses[1]
+        assert '"status":"CANCELLED"' in statuses[2]
+        assert chunks[-1].startswith("event: end")
+
+    def test_stream_heartbeat_and_timeout(self, stream_settings, user, order):
+        """Test idle streams get comment heartbeats and close at the timeout."""
+        stream_settings.ORDER_STREAM_HEARTBEAT_SECONDS = 0.05
+        stream_settings.ORDER_STREAM_TIMEOUT_SECONDS = 0.2
+
+        async def run():
+            response = await self._open(order, user)
+            return [chunk.decode() async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(run)()
+        assert ": heartbeat\n\n" in chunks
+        assert chunks[-1].startswith("event: timeout")
+
+    def test_stream_authentication(self, stream_settings, user, another_user, order):
+        """Test the stream needs the owner's token, which may come as a query parameter."""
+        assert async_to_sync(self._open)(order).status_code == status.HTTP_401_UNAUTHORIZED
+        assert async_to_sync(self._open)(order, another_user).status_code == status.HTTP_403_FORBIDDEN
+        assert async_to_sync(self._open)(order, access_token="garbage").status_code == status.HTTP_401_UNAUTHORIZED
+
+        token = str(RefreshToken.for_user(user).access_token)
+        response = async_to_sync(self._open)(order, access_token=token)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Cache-Control"] == "no-cache"
+
+    def test_stream_refused_under_wsgi(self, client, stream_settings, user, order):
+        """Test the stream answers 501 rather than tie up a WSGI worker."""
+        token = str(RefreshToken.for_user(user).access_token)
+        response = client.get(reverse("order-events", kwargs={"pk": order.pk}), {"access_token": token})
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+# ============================================================================
+# SALES ROLLUP TESTS (5 tests)
+# ============================================================================
+
+class TestSalesRollups:
+    """Tests for the incremental daily sales rollups."""
+
+    def test_refresh_builds_buckets(self, order_with_items, product):
+        """Test refresh aggregates order items per day x product x status."""
+        result = refresh_sales_rollups()
+        assert result.changed_orders == 1
+        bucket = DailySalesRollup.objects.get(product_id=product.id, status=Order.Status.PENDING)
+        assert bucket.quantity == 2
+        assert bucket.revenue == product.price * 2
+        assert bucket.order_count == 1
+
+    def test_status_change_moves_bucket(self, order_with_items):
+        """Test a status transition is reflected on the next refresh."""
+        refresh_sales_rollups()
+        order_with_items.status = Order.Status.PAID
+        order_with_items.save(update_fields=["status", "updated_at"])
+        refresh_sales_rollups()
+        assert not DailySalesRollup.objects.filter(status=Order.Status.PENDING).exists()
+        assert DailySalesRollup.objects.filter(status=Order.Status.PAID).count() == 2
+
+    def test_refresh_skips_unchanged_orders(self, order_with_items, settings):
+        """Test orders behind the high-water mark are not reprocessed."""
+        settings.SALES_ROLLUP_OVERLAP_SECONDS = 0
+        refresh_sales_rollups()
+        result = refresh_sales_rollups()
+        assert result.changed_orders == 0
+
+    def test_days_follow_the_current_timezone(self, order_with_items, settings):
+        """Test an order is rolled up under its local day, not its UTC date."""
+        settings.TIME_ZONE = "Asia/Kolkata"
+        created = datetime(2026, 1, 1, 20, 0, tzinfo=dt_timezone.utc)  # 01:30 on Jan 2 in Kolkata
+        Order.objects.filter(pk=order_with_items.pk).update(created_at=created)
+        refresh_sales_rollups()
+        assert set(DailySalesRollup.objects.values_list("day", flat=True)) == {date(2026, 1, 2)}
+
+    def test_deleted_order_leaves_its_day(self, order_with_items, settings):
+        """Test deleting an order marks its day dirty and the next refresh drops its buckets."""
+        settings.SALES_ROLLUP_OVERLAP_SECONDS = 0
+        refresh_sales_rollups()
+        assert DailySalesRollup.objects.exists()
+
+        order_with_items.delete()
+        assert RollupDirtyDay.objects.count() == 1
+        result = refresh_sales_rollups()
+        assert result.days_refreshed == 1
+        assert not DailySalesRollup.objects.exists()
+        assert not RollupDirtyDay.objects.exists()
+
+
+# ============================================================================
+# REPORTING TESTS (4 tests)
+# ============================================================================
+
+class TestOrderItemReporting:
+    """Tests for the columnar order-item reporting engine."""
+
+    def test_grouped_revenue_matches_decimal_math(self, order_with_items, paid_order, product):
+        """Test vectorised totals equal the Decimal line totals."""
+        frame = load_order_items(use_cache=False)
+        totals = frame.grouped("product")
+        revenue = dict(zip(totals.keys.tolist(), totals.revenue_minor.tolist()))
+        expected = sum(i.line_total for i in OrderItem.objects.filter(product_id=product.id))
+        assert minor_to_decimal(revenue[product.id]) == expected
+
+    def test_filter_and_top_products(self, order_with_items, paid_order, product, product2):
+        """Test status filtering and top-N ordering."""
+        frame = load_order_items(use_cache=False).filter(statuses=[Order.Status.PAID])
+        assert len(frame) == 1
+        top = load_order_items(use_cache=False).top_products(1)
+        assert top.keys.tolist() == [product.id]
+
+    def test_disk_cache_is_reused(self, order_with_items, settings, tmp_path):
+        """Test the memory-mapped cache is served until the tables change."""
+        settings.REPORTING_CACHE_DIR = tmp_path
+        first = load_order_items()
+        cached = load_order_items()
+        assert len(cached) == len(first) == 2
+        assert isinstance(cached.columns["order_id"], np.memmap)
+        order_with_items.status = Order.Status.PAID
+        order_with_items.save(update_fields=["status", "updated_at"])
+        assert not isinstance(load_order_items().columns["status"], np.memmap)
+
+    def test_report_command(self, order_with_items, settings, tmp_path):
+        """Test the management command prints grouped totals and percentiles."""
+        settings.REPORTING_CACHE_DIR = tmp_path
+        out = StringIO()
+        call_command("order_item_report", "--group-by", "day", stdout=out)
+        assert "order items: 2" in out.getvalue()
+        assert "p50:" in out.getvalue()
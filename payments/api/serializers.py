@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from decimal import Decimal
+from django.urls import reverse
+
+from payments.models import Payment
 
 
 class PaymentGenerateSerializer(serializers.Serializer):
@@ -20,10 +23,20 @@ class PaymentResponseSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     order_id = serializers.IntegerField()
     amount = serializers.DecimalField(max_digits=10, decimal_places=2)
-    status = serializers.CharField()
+    status = serializers.SerializerMethodField()
     provider_reference = serializers.CharField(allow_null=True, allow_blank=True)
     uro_pay_order_id = serializers.CharField(allow_null=True, allow_blank=True)
     upi_string = serializers.CharField(allow_null=True, allow_blank=True)
+    # Inline QR payload, only for rows the backfill has not moved to the blob store yet
     qr_code = serializers.CharField(allow_null=True, allow_blank=True)
+    qr_code_url = serializers.SerializerMethodField()
     reference_number = serializers.CharField(allow_null=True, allow_blank=True)
     created_at = serializers.DateTimeField()
+
+    def get_status(self, payment):
+        return Payment.public_status(payment.status)
+
+    def get_qr_code_url(self, payment):
+        if not payment.qr_code_digest:
+            return None
+        return reverse("payment-qr", args=[payment.qr_code_digest])
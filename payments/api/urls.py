@@ -1,8 +1,19 @@
 from django.urls import path
-from payments.api.views import CreatePaymentAPIView, ConfirmPaymentAPIView, UroPayWebhookAPIView
+from payments.api.views import (
+    CreatePaymentAPIView,
+    ConfirmPaymentAPIView,
+    UroPayWebhookAPIView,
+    AsyncCreatePaymentView,
+    AsyncConfirmPaymentView,
+    PaymentQRCodeView,
+)
 
 urlpatterns = [
     path("create/", CreatePaymentAPIView.as_view(), name="payment-create"),
     path("confirm/", ConfirmPaymentAPIView.as_view(), name="payment-confirm"),
     path("webhook/", UroPayWebhookAPIView.as_view(), name="payment-webhook"),
+    path("qr/<str:digest>/", PaymentQRCodeView.as_view(), name="payment-qr"),
+    # Async variants; only worthwhile when served by an ASGI worker
+    path("async/create/", AsyncCreatePaymentView.as_view(), name="payment-create-async"),
+    path("async/confirm/", AsyncConfirmPaymentView.as_view(), name="payment-confirm-async"),
 ]
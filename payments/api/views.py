@@ -1,7 +1,20 @@
+import abc
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from config.renderers import ORJSONRenderer
 
 from payments.api.serializers import (
     PaymentGenerateSerializer,
@@ -9,6 +22,7 @@ from payments.api.serializers import (
     PaymentResponseSerializer,
 )
 from payments.services.payment_service import PaymentService
+from payments.services.qr_codes import open_qr_code, sniff_content_type
 
 
 class CreatePaymentAPIView(APIView):
@@ -61,11 +75,128 @@ class ConfirmPaymentAPIView(APIView):
 
 
 class UroPayWebhookAPIView(APIView):
-    """Endpoint for UroPay to post webhook events. Verifies signature and updates payment/order."""
+    """Endpoint for UroPay to post webhook events. Verifies the signature and queues the event.
+
+    Payment/order updates happen in `process_webhook_events_task`, so the
+    provider is acknowledged as soon as the event is stored.
+    """
 
     permission_classes = []
 
     def post(self, request):
-        # Delegate to service which verifies signature and processes payload idempotently
+        # Delegate to service which verifies signature and records the event idempotently
         PaymentService.handle_webhook(request)
         return Response({"status": "ok"}, status=status.HTTP_200_OK)
+
+
+class PaymentQRCodeView(View):
+    """Serve a stored QR image by its SHA-256.
+
+    Blobs are content-addressed and never change, so responses are public and
+    cacheable for a year; the digest doubles as the ETag. No database access:
+    the content type is read from the blob itself.
+
+    The bytes come from the provider and may be SVG, so every response is
+    sandboxed and marked nosniff: a script inside an image opened directly
+    cannot run with our origin.
+    """
+
+    http_method_names = ["get", "head"]
+    digest_re = re.compile(r"[0-9a-f]{64}")
+
+    def get(self, request, digest):
+        if not self.digest_re.fullmatch(digest):
+            raise Http404("Unknown QR code")
+        etag = f'"{digest}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                blob = open_qr_code(digest)
+            except FileNotFoundError:
+                raise Http404("Unknown QR code")
+            response = FileResponse(blob, content_type=sniff_content_type(blob))
+            response["Content-Disposition"] = f'inline; filename="{digest}"'
+        response["Content-Security-Policy"] = "sandbox; default-src 'none'; style-src 'unsafe-inline'"
+        response["X-Content-Type-Options"] = "nosniff"
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncPaymentView(abc.ABC, View):
+    """Base for async payment endpoints served under ASGI.
+
+    DRF views are sync-only, so these are plain Django async views that reuse
+    the DRF pieces that do no I/O (serializers, renderer, exceptions) and run
+    JWT authentication in a thread. The provider call is awaited, so a worker
+    is not blocked while UroPay responds.
+    """
+
+    http_method_names = ["post"]
+    success_status = status.HTTP_200_OK
+
+    def render(self, data, status_code):
+        return HttpResponse(ORJSONRenderer().render(data), status=status_code, content_type="application/json")
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            user_auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+            if user_auth is None:
+                raise NotAuthenticated()
+            user = user_auth[0]
+            request.user = user
+
+            try:
+                body = json.loads(request.body or b"{}")
+            except ValueError as exc:
+                raise ParseError("JSON parse error - %s" % str(exc))
+
+            payment = await self.handle(user, body)
+        except APIException as exc:
+            # Same body shape as DRF's default exception handler
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return self.render(data, exc.status_code)
+
+        return self.render(PaymentResponseSerializer(payment).data, self.success_status)
+
+    @abc.abstractmethod
+    async def handle(self, user, body):
+        """Validate `body` and run the payment step for `user`; return the Payment."""
+
+
+class AsyncCreatePaymentView(AsyncPaymentView):
+    """Async counterpart of `CreatePaymentAPIView`."""
+
+    success_status = status.HTTP_201_CREATED
+
+    async def handle(self, user, body):
+        serializer = PaymentGenerateSerializer(data=body)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        return await PaymentService.agenerate_payment(
+            user_id=user.id,
+            order_id=data["order_id"],
+            vpa=data["vpa"],
+            vpaName=data["vpaName"],
+            customerName=data["customerName"],
+            customerEmail=data["customerEmail"],
+            transactionNote=data.get("transactionNote"),
+        )
+
+
+class AsyncConfirmPaymentView(AsyncPaymentView):
+    """Async counterpart of `ConfirmPaymentAPIView`."""
+
+    async def handle(self, user, body):
+        serializer = PaymentConfirmSerializer(data=body)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        return await PaymentService.aconfirm_payment(
+            user_id=user.id,
+            order_id=data["order_id"],
+            reference_number=data["referenceNumber"],
+        )
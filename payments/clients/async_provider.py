@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict
+
+import aiohttp
+from django.conf import settings
+
+from payments.clients.provider import (
+    PaymentProviderError,
+    uropay_generate_payload,
+    uropay_headers,
+    uropay_update_payload,
+    uropay_breaker,
+    uropay_bulkhead,
+    uropay_url,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# aiohttp sessions are bound to an event loop, so the shared pool is per loop
+# (normally one per ASGI worker process).
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def _get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=getattr(settings, "UROPAY_ASYNC_POOL_SIZE", 100),
+            keepalive_timeout=30,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _sessions[loop] = session
+    return session
+
+
+async def close_async_session() -> None:
+    """Close the running loop's shared session (ASGI lifespan shutdown / tests)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class AsyncPaymentProviderClient:
+    """asyncio counterpart of `PaymentProviderClient` for the UroPay endpoints.
+
+    All instances on an event loop share one aiohttp connection pool
+    (`UROPAY_ASYNC_POOL_SIZE` connections), so one ASGI worker can keep many
+    provider calls in flight at once.
+    """
+
+    def __init__(self, base_url: str = None, timeout: int = 10):
+        self.base_url = base_url or settings.PAYMENT_PROVIDER_BASE_URL
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def _request(self, method: str, path: str, json: Any = None, params: Dict[str, str] | None = None):
+        url = uropay_url(path, self.base_url)
+        headers = uropay_headers()
+        # Same shared circuit as the sync client
+        async with uropay_bulkhead(for_async=True).acquire_async():
+            async with uropay_breaker().guard_async(failure_exceptions=(PaymentProviderError,)):
+                return await self._send(method, url, json, params, headers)
+
+    async def _send(self, method: str, url: str, json: Any, params: Dict[str, str] | None, headers: Dict[str, str]):
+        try:
+            async with _get_session().request(method, url, json=json, params=params, headers=headers, timeout=self.timeout) as resp:
+                text = await resp.text()
+                status_code = resp.status
+                try:
+                    data = await resp.json(content_type=None)
+                except ValueError:
+                    data = {"raw": text}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            logger.exception("Payment provider HTTP request failed")
+            raise PaymentProviderError("Payment provider unreachable") from exc
+
+        if status_code >= 500:
+            logger.error("Provider server error %s: %s", status_code, text)
+            raise PaymentProviderError(f"Provider server error: {status_code}")
+        return status_code, data if data is not None else {}
+
+    async def uropay_generate(self, **kwargs) -> Dict[str, Any]:
+        status_code, data = await self._request("POST", "/order/generate", json=uropay_generate_payload(**kwargs))
+        if status_code != 200:
+            raise PaymentProviderError(f"UroPay generate failed: {status_code}")
+        return data.get("data", {})
+
+    async def uropay_update(self, **kwargs) -> Dict[str, Any]:
+        status_code, data = await self._request("PATCH", "/order/update", json=uropay_update_payload(**kwargs))
+        if status_code != 200:
+            raise PaymentProviderError(f"UroPay update failed: {status_code}")
+        return data.get("data", {})
+
+    async def uropay_status(self, uroPayOrderId: str) -> Dict[str, Any]:
+        status_code, data = await self._request("GET", f"/order/status/{uroPayOrderId}")
+        if status_code != 200:
+            raise PaymentProviderError(f"UroPay status failed: {status_code}")
+        return data.get("data", {})
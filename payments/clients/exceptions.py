@@ -0,0 +1,14 @@
+class PaymentProviderError(Exception):
+    pass
+
+
+class ProviderUnavailableError(PaymentProviderError):
+    """The call was rejected locally without reaching the provider."""
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    pass
+
+
+class BulkheadFullError(ProviderUnavailableError):
+    pass
@@ -1,16 +1,163 @@
 import logging
+import os
+import threading
+from functools import lru_cache
 from typing import Tuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 import hashlib
 import hmac
+import json
 from typing import Any, Dict
 
+from payments.clients.exceptions import (  # noqa: F401 (re-exported)
+    BulkheadFullError,
+    CircuitOpenError,
+    PaymentProviderError,
+    ProviderUnavailableError,
+)
+from payments.clients.resilience import CircuitBreaker, get_bulkhead
+
 logger = logging.getLogger(__name__)
 
 
-class PaymentProviderError(Exception):
-    pass
+# Process-wide pooled HTTP session. Built lazily and rebuilt after fork so
+# gunicorn/Celery prefork children never share sockets with their parent.
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    pool_size = getattr(settings, "UROPAY_HTTP_POOL_SIZE", 10)
+    retries = Retry(
+        total=getattr(settings, "UROPAY_HTTP_MAX_RETRIES", 2),
+        backoff_factor=getattr(settings, "UROPAY_HTTP_RETRY_BACKOFF", 0.3),
+        status_forcelist=(502, 503, 504),
+        # Only idempotent verbs are retried; POST /order/generate and PATCH /order/update are not
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the keep-alive session for this process, creating it on first use."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def close_session() -> None:
+    """Drop the pooled session (e.g. on worker shutdown or in tests)."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def _reset_session_after_fork() -> None:
+    # The child must not close the parent's sockets; just forget them
+    global _session, _session_pid, _session_lock
+    _session = None
+    _session_pid = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_session_after_fork)
+
+
+@lru_cache(maxsize=8)
+def _uropay_auth_headers(api_key: str, secret: str) -> Dict[str, str]:
+    # Hashed once per credential pair instead of on every request
+    hashed = hashlib.sha512(secret.encode("utf-8")).hexdigest()
+    return {
+        "X-API-KEY": api_key.strip(),
+        "Authorization": f"Bearer {hashed.strip()}",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+
+
+def uropay_headers() -> Dict[str, str]:
+    # X-API-KEY + Authorization: Bearer <sha512(secret)>
+    secret = getattr(settings, "UROPAY_SECRET", None)
+    api_key = getattr(settings, "UROPAY_API_KEY", None)
+    if not api_key or not secret:
+        raise PaymentProviderError("UroPay API key/secret not configured")
+    return dict(_uropay_auth_headers(api_key, secret))
+
+
+def uropay_breaker() -> CircuitBreaker:
+    """Circuit shared by every worker calling UroPay (state lives in the cache)."""
+    return CircuitBreaker(
+        "uropay",
+        failure_threshold=getattr(settings, "UROPAY_CIRCUIT_FAILURE_THRESHOLD", 5),
+        failure_window=getattr(settings, "UROPAY_CIRCUIT_FAILURE_WINDOW_SECONDS", 30),
+        recovery_timeout=getattr(settings, "UROPAY_CIRCUIT_RECOVERY_SECONDS", 30),
+    )
+
+
+def uropay_bulkhead(*, for_async: bool = False):
+    """Per-process limit on in-flight UroPay calls (the async path is sized to its pool)."""
+    if for_async:
+        limit, key = getattr(settings, "UROPAY_ASYNC_POOL_SIZE", 100), "uropay-async"
+    else:
+        limit, key = getattr(settings, "UROPAY_MAX_CONCURRENT_CALLS", 8), "uropay"
+    return get_bulkhead("uropay", limit, getattr(settings, "UROPAY_BULKHEAD_WAIT_SECONDS", 0.05), key=key)
+
+
+def uropay_webhook_signature(payload: Dict[str, Any], environment: str | None, secret: str) -> str:
+    """HMAC-SHA256 UroPay puts in `X-Uropay-Signature`.
+
+    Key is sha512(secret) hex; message is the payload with sorted keys plus
+    `environment`, as compact JSON.
+    """
+    hashed_secret = hashlib.sha512(secret.encode("utf-8")).hexdigest()
+    payload_for_sig = {**dict(sorted(payload.items(), key=lambda kv: kv[0])), "environment": environment}
+    payload_str = json.dumps(payload_for_sig, separators=(",", ":"), ensure_ascii=False)
+    return hmac.new(hashed_secret.encode("utf-8"), payload_str.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def uropay_url(path: str, base_url: str | None = None) -> str:
+    return (getattr(settings, "UROPAY_BASE_URL", base_url) or base_url or "https://api.uropay.me").rstrip("/") + path
+
+
+def uropay_generate_payload(*, vpa: str, vpaName: str, amount_paise: int, merchantOrderId: str, customerName: str, customerEmail: str, transactionNote: str | None = None, notes: dict | None = None) -> Dict[str, Any]:
+    payload = {
+        "vpa": vpa,
+        "vpaName": vpaName,
+        "amount": amount_paise,
+        "merchantOrderId": merchantOrderId,
+        "customerName": customerName,
+        "customerEmail": customerEmail,
+    }
+    if transactionNote:
+        payload["transactionNote"] = transactionNote
+    if notes:
+        payload["notes"] = notes
+    return payload
+
+
+def uropay_update_payload(*, uroPayOrderId: str, referenceNumber: str, orderStatus: str | None = None) -> Dict[str, Any]:
+    payload = {"uroPayOrderId": uroPayOrderId, "referenceNumber": referenceNumber}
+    if orderStatus:
+        payload["orderStatus"] = orderStatus
+    return payload
 
 
 class PaymentProviderClient:
@@ -18,6 +165,9 @@ class PaymentProviderClient:
 
     This client expects `PAYMENT_PROVIDER_API_KEY` and optionally
     `PAYMENT_PROVIDER_BASE_URL` to be configured in Django settings.
+
+    Instances are cheap: connections come from the process-wide pooled
+    session (`get_session`) and UroPay auth headers are computed once.
     """
 
     def __init__(self, api_key: str = None, base_url: str = None, timeout: int = 10):
@@ -27,24 +177,18 @@ class PaymentProviderClient:
 
     # UroPay-specific helpers
     def _uropay_headers(self) -> Dict[str, str]:
-        # X-API-KEY + Authorization: Bearer <sha512(secret)>
-        secret = getattr(settings, "UROPAY_SECRET", None)
-        api_key = getattr(settings, "UROPAY_API_KEY", None)
-        if not api_key or not secret:
-            raise PaymentProviderError("UroPay API key/secret not configured")
-        hashed = hashlib.sha512(secret.encode("utf-8")).hexdigest()
-        return {
-            "X-API-KEY": api_key.strip(),
-            "Authorization": f"Bearer {hashed.strip()}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
+        return uropay_headers()
 
     def _request(self, method: str, path: str, json: Any = None, params: Dict[str, str] | None = None):
-        url = (getattr(settings, "UROPAY_BASE_URL", self.base_url) or self.base_url or "https://api.uropay.me").rstrip("/") + path
+        url = uropay_url(path, self.base_url)
         headers = self._uropay_headers()
+        # Fail fast while UroPay is down or this process already has enough calls waiting on it
+        with uropay_bulkhead().acquire(), uropay_breaker().guard(failure_exceptions=(PaymentProviderError,)):
+            return self._send(method, url, json, params, headers)
+
+    def _send(self, method: str, url: str, json: Any, params: Dict[str, str] | None, headers: Dict[str, str]):
         try:
-            resp = requests.request(method, url, json=json, params=params, headers=headers, timeout=self.timeout)
+            resp = get_session().request(method, url, json=json, params=params, headers=headers, timeout=self.timeout)
         except requests.RequestException as exc:
             logger.exception("Payment provider HTTP request failed")
             raise PaymentProviderError("Payment provider unreachable") from exc
@@ -88,18 +232,16 @@ class PaymentProviderClient:
 
     # UroPay-specific API methods
     def uropay_generate(self, *, vpa: str, vpaName: str, amount_paise: int, merchantOrderId: str, customerName: str, customerEmail: str, transactionNote: str | None = None, notes: dict | None = None) -> Dict[str, Any]:
-        payload = {
-            "vpa": vpa,
-            "vpaName": vpaName,
-            "amount": amount_paise,
-            "merchantOrderId": merchantOrderId,
-            "customerName": customerName,
-            "customerEmail": customerEmail,
-        }
-        if transactionNote:
-            payload["transactionNote"] = transactionNote
-        if notes:
-            payload["notes"] = notes
+        payload = uropay_generate_payload(
+            vpa=vpa,
+            vpaName=vpaName,
+            amount_paise=amount_paise,
+            merchantOrderId=merchantOrderId,
+            customerName=customerName,
+            customerEmail=customerEmail,
+            transactionNote=transactionNote,
+            notes=notes,
+        )
 
         status_code, data = self._request("POST", "/order/generate", json=payload)
         if status_code != 200:
@@ -107,9 +249,7 @@ class PaymentProviderClient:
         return data.get("data", {})
 
     def uropay_update(self, *, uroPayOrderId: str, referenceNumber: str, orderStatus: str | None = None) -> Dict[str, Any]:
-        payload = {"uroPayOrderId": uroPayOrderId, "referenceNumber": referenceNumber}
-        if orderStatus:
-            payload["orderStatus"] = orderStatus
+        payload = uropay_update_payload(uroPayOrderId=uroPayOrderId, referenceNumber=referenceNumber, orderStatus=orderStatus)
 
         status_code, data = self._request("PATCH", "/order/update", json=payload)
         if status_code != 200:
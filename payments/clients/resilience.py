@@ -0,0 +1,274 @@
+"""
+Fail-fast guards for payment provider calls.
+
+`CircuitBreaker` keeps its state in the Django cache, so every web and Celery
+worker trips and recovers together. `Bulkhead` caps in-flight provider calls
+per process, so a slow provider cannot tie up every worker thread.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from payments.clients.exceptions import BulkheadFullError, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+METRIC_EVENTS = ("opened", "half_opened", "closed", "failure", "rejected_open", "rejected_bulkhead")
+
+
+def record_metric(name: str, event: str) -> None:
+    """Bump a shared counter, e.g. `circuit:uropay:metrics:rejected_open`."""
+    key = f"circuit:{name}:metrics:{event}"
+    try:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+    except Exception:
+        logger.debug("Could not record metric %s", key, exc_info=True)
+
+
+def get_metrics(name: str) -> Dict[str, int]:
+    keys = {f"circuit:{name}:metrics:{event}": event for event in METRIC_EVENTS}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception:
+        logger.warning("Could not read metrics for %s", name, exc_info=True)
+        found = {}
+    return {event: int(found.get(key, 0)) for key, event in keys.items()}
+
+
+class CircuitBreaker:
+    """Shared-state circuit breaker.
+
+    Closed: calls pass, and failures are counted in a rolling window.
+    `failure_threshold` failures inside `failure_window` seconds open the circuit.
+    Open: calls are rejected with `CircuitOpenError` for `recovery_timeout` seconds.
+    Half-open: one probe call across all workers is let through. Success closes
+    the circuit and failure re-opens it.
+
+    If the cache itself is unreachable the breaker stays out of the way and
+    calls go through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, *, failure_threshold: int = 5, failure_window: int = 30, recovery_timeout: int = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.recovery_timeout = recovery_timeout
+        self._opened_key = f"circuit:{name}:opened_at"
+        self._failures_key = f"circuit:{name}:failures"
+        self._probe_key = f"circuit:{name}:probe"
+
+    def _opened_at(self):
+        try:
+            return cache.get(self._opened_key)
+        except Exception:
+            logger.warning("Circuit %s state unavailable; allowing call", self.name, exc_info=True)
+            return None
+
+    def state(self) -> str:
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return self.CLOSED
+        if time.time() - opened_at < self.recovery_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_call(self) -> bool:
+        """Raise `CircuitOpenError` if the call must not go out.
+
+        Returns True when this call is the half-open probe.
+        """
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return False
+        if time.time() - opened_at >= self.recovery_timeout:
+            # The probe lease expires on its own if the probing worker dies mid-call
+            try:
+                is_probe = cache.add(self._probe_key, os.getpid(), timeout=self.recovery_timeout)
+            except Exception:
+                is_probe = False
+            if is_probe:
+                logger.warning("Circuit %s half-open: probing provider", self.name)
+                record_metric(self.name, "half_opened")
+                return True
+        record_metric(self.name, "rejected_open")
+        raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def record_success(self, probe: bool) -> None:
+        if not probe:
+            return
+        try:
+            cache.delete_many([self._opened_key, self._probe_key, self._failures_key])
+        except Exception:
+            logger.warning("Could not close circuit %s", self.name, exc_info=True)
+            return
+        logger.warning("Circuit %s closed: provider recovered", self.name)
+        record_metric(self.name, "closed")
+
+    def record_failure(self, probe: bool) -> None:
+        record_metric(self.name, "failure")
+        try:
+            if probe:
+                cache.set(self._opened_key, time.time(), timeout=None)
+                cache.delete(self._probe_key)
+                logger.warning("Circuit %s re-opened: probe failed", self.name)
+                record_metric(self.name, "opened")
+                return
+
+            cache.add(self._failures_key, 0, timeout=self.failure_window)
+            try:
+                failures = cache.incr(self._failures_key)
+            except ValueError:
+                # Window expired between add and incr
+                cache.set(self._failures_key, 1, timeout=self.failure_window)
+                failures = 1
+            # add() so that only the worker that actually trips it logs the transition
+            if failures >= self.failure_threshold and cache.add(self._opened_key, time.time(), timeout=None):
+                cache.delete(self._failures_key)
+                logger.warning("Circuit %s opened after %s failures in %ss", self.name, failures, self.failure_window)
+                record_metric(self.name, "opened")
+        except Exception:
+            logger.warning("Could not record failure on circuit %s", self.name, exc_info=True)
+
+    def reset(self) -> None:
+        cache.delete_many([self._opened_key, self._probe_key, self._failures_key])
+
+    @contextmanager
+    def guard(self, failure_exceptions=(Exception,)):
+        """Wrap one provider call; `failure_exceptions` count against the circuit."""
+        probe = self.before_call()
+        try:
+            yield
+        except failure_exceptions:
+            self.record_failure(probe)
+            raise
+        except BaseException:
+            # Not a provider fault (e.g. a bug or cancellation): free the probe slot
+            if probe:
+                cache.delete(self._probe_key)
+            raise
+        else:
+            self.record_success(probe)
+
+    @asynccontextmanager
+    async def guard_async(self, failure_exceptions=(Exception,)):
+        """`guard` for coroutines; the cache round trips run off the event loop."""
+        probe = await sync_to_async(self.before_call, thread_sensitive=False)()
+        try:
+            yield
+        except failure_exceptions:
+            await sync_to_async(self.record_failure, thread_sensitive=False)(probe)
+            raise
+        except BaseException:
+            if probe:
+                await cache.adelete(self._probe_key)
+            raise
+        else:
+            await sync_to_async(self.record_success, thread_sensitive=False)(probe)
+
+
+class Bulkhead:
+    """Per-process cap on concurrent provider calls.
+
+    A caller that cannot get a slot within `wait_timeout` seconds gets
+    `BulkheadFullError` instead of queueing behind a slow provider.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, wait_timeout: float = 0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.wait_timeout = wait_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def _reject(self):
+        record_metric(self.name, "rejected_bulkhead")
+        return BulkheadFullError(f"Too many concurrent {self.name} calls (limit {self.max_concurrent})")
+
+    @contextmanager
+    def acquire(self):
+        if not self._semaphore.acquire(timeout=self.wait_timeout):
+            raise self._reject()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def acquire_async(self):
+        # Event-loop-bound semaphore; a threading one would block the loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.wait_timeout or 0.001)
+        except asyncio.TimeoutError:
+            raise await sync_to_async(self._reject, thread_sensitive=False)() from None
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class RateLimiter:
+    """Spaces calls from this process at most `rate` per second (thread-safe).
+
+    `acquire` blocks until the caller's slot comes up rather than rejecting,
+    so a bounded worker pool naturally slows to the provider's limit.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_bulkheads: Dict[str, Bulkhead] = {}
+_bulkheads_lock = threading.Lock()
+
+
+def get_bulkhead(name: str, max_concurrent: int, wait_timeout: float = 0.0, *, key: str | None = None) -> Bulkhead:
+    """Return this process's bulkhead for `key` (default `name`), rebuilding it if its size changed."""
+    key = key or name
+    bulkhead = _bulkheads.get(key)
+    if bulkhead is None or bulkhead.max_concurrent != max_concurrent or bulkhead.wait_timeout != wait_timeout:
+        with _bulkheads_lock:
+            bulkhead = _bulkheads.get(key)
+            if bulkhead is None or bulkhead.max_concurrent != max_concurrent or bulkhead.wait_timeout != wait_timeout:
+                bulkhead = _bulkheads[key] = Bulkhead(name, max_concurrent, wait_timeout)
+    return bulkhead
+
+
+def _reset_bulkheads_after_fork() -> None:
+    # Slots held by parent threads at fork time would otherwise leak into the child
+    global _bulkheads_lock
+    _bulkheads.clear()
+    _bulkheads_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_bulkheads_after_fork)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from payments.services.qr_codes import backfill_qr_codes
+
+
+class Command(BaseCommand):
+    help = (
+        "Move QR code payloads stored inline on Payment rows into the QR blob store. "
+        "Safe to re-run; rows already moved are not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Count rows that would be moved without writing.")
+
+    def handle(self, *args, **options):
+        def progress(counts):
+            self.stdout.write(f"scanned={counts['scanned']} moved={counts['moved']}")
+
+        counts = backfill_qr_codes(
+            batch_size=options["batch_size"], dry_run=options["dry_run"], progress=progress,
+        )
+        label = "would move" if options["dry_run"] else "moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{label} {counts['scanned'] if options['dry_run'] else counts['moved']} QR codes "
+            f"({counts['skipped']} changed meanwhile)"
+        ))
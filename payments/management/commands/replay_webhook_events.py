@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments.models import WebhookEvent
+from payments.services.webhook_replay import replay_webhook_events
+
+
+def _aware(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run stored UroPay webhook events through the webhook processing logic. "
+        "Idempotent: payments that are already settled are left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=_aware, help="received_at >= this (ISO datetime).")
+        parser.add_argument("--until", type=_aware, help="received_at < this (ISO datetime).")
+        parser.add_argument("--ids", help="Comma-separated WebhookEvent ids.")
+        parser.add_argument("--webhook-ids", help="Comma-separated provider webhook ids.")
+        parser.add_argument("--unprocessed", action="store_true", help="Only events not yet processed.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=4, help="Parallel batches (one DB connection each).")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+
+    def handle(self, *args, **options):
+        qs = WebhookEvent.objects.all()
+        if options["since"]:
+            qs = qs.filter(received_at__gte=options["since"])
+        if options["until"]:
+            qs = qs.filter(received_at__lt=options["until"])
+        if options["ids"]:
+            try:
+                qs = qs.filter(pk__in=[int(i) for i in options["ids"].split(",") if i.strip()])
+            except ValueError:
+                raise CommandError("--ids must be comma-separated integers")
+        if options["webhook_ids"]:
+            qs = qs.filter(webhook_id__in=[i.strip() for i in options["webhook_ids"].split(",") if i.strip()])
+        if options["unprocessed"]:
+            qs = qs.filter(processed_at__isnull=True)
+        if not any(options[k] for k in ("since", "until", "ids", "webhook_ids", "unprocessed")):
+            raise CommandError("Give a time range, --ids, --webhook-ids or --unprocessed (refusing to replay everything implicitly).")
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--batch-size and --workers must be positive")
+
+        every = max(1, 50000 // options["batch_size"]) * options["batch_size"]
+        next_report = [every]
+
+        def progress(total, elapsed):
+            if total.events >= next_report[0]:
+                next_report[0] += every
+                self.stdout.write(f"  {total.events} events, {total.events / max(elapsed, 1e-6):.0f}/s")
+
+        result = replay_webhook_events(
+            qs,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            dry_run=options["dry_run"],
+            progress=progress,
+        )
+        prefix = "[dry run] " if options["dry_run"] else ""
+        self.stdout.write(
+            f"{prefix}events={result.events} settled={result.settled} "
+            f"already_settled={result.already_settled} unmatched={result.unmatched} "
+            f"orders_repaired={result.orders_repaired}"
+        )
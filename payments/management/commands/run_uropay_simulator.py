@@ -0,0 +1,60 @@
+import logging
+
+from aiohttp import web
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.simulator import FaultProfile, LatencyModel, UroPaySimulator, WebhookConfig
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a local UroPay stand-in for load/soak tests. "
+        "Point UROPAY_BASE_URL at it; it accepts the configured UROPAY_API_KEY/UROPAY_SECRET."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8099)
+        parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:LO,HI | lognormal:MEDIAN,SIGMA | exp:MEAN")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 503.")
+        parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of calls that hang for --hang-seconds.")
+        parser.add_argument("--hang-seconds", type=float, default=30.0)
+        parser.add_argument("--decline-rate", type=float, default=0.0, help="Fraction of /charge calls declined.")
+        parser.add_argument("--seed", type=int, help="Seed for reproducible fault sequences.")
+        parser.add_argument("--webhook-url", help="e.g. http://localhost:8000/api/payments/webhook/")
+        parser.add_argument("--webhook-environment", default="TEST")
+        parser.add_argument("--auto-pay-after", type=float, help="Pay generated orders via webhook after N seconds.")
+        parser.add_argument("--duplicate-webhook-rate", type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        api_key = getattr(settings, "UROPAY_API_KEY", None)
+        secret = getattr(settings, "UROPAY_SECRET", None)
+        if not api_key or not secret:
+            raise CommandError("UROPAY_API_KEY and UROPAY_SECRET must be set (the simulator checks the same auth headers).")
+        try:
+            latency = LatencyModel.parse(options["latency"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        simulator = UroPaySimulator(
+            api_key=api_key,
+            secret=secret,
+            faults=FaultProfile(
+                latency=latency,
+                error_rate=options["error_rate"],
+                timeout_rate=options["timeout_rate"],
+                hang_seconds=options["hang_seconds"],
+                decline_rate=options["decline_rate"],
+                seed=options["seed"],
+            ),
+            webhooks=WebhookConfig(
+                url=options["webhook_url"],
+                environment=options["webhook_environment"],
+                auto_pay_after=options["auto_pay_after"],
+                duplicate_rate=options["duplicate_webhook_rate"],
+            ),
+        )
+        logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
+        self.stdout.write(f"UroPay simulator on http://{options['host']}:{options['port']} (stats at /_sim/stats)")
+        web.run_app(simulator.make_app(), host=options["host"], port=options["port"], print=None)
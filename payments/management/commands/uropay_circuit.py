@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from payments.clients.provider import uropay_breaker
+from payments.clients.resilience import get_metrics
+
+
+class Command(BaseCommand):
+    help = "Show the shared UroPay circuit breaker state and counters, or reset it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Close the circuit (e.g. after a confirmed provider fix).")
+
+    def handle(self, *args, **options):
+        breaker = uropay_breaker()
+        if options["reset"]:
+            breaker.reset()
+            self.stdout.write("circuit reset")
+
+        self.stdout.write(f"state: {breaker.state()}")
+        for event, count in get_metrics(breaker.name).items():
+            self.stdout.write(f"  {event:<18} {count}")
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('INITIATED', 'Initiated'), ('GENERATING', 'Generating'), ('CONFIRMING', 'Confirming'), ('SUCCESS', 'Success'), ('FAILED', 'Failed')], default='INITIATED', max_length=20),
+        ),
+    ]
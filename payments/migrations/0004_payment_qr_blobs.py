@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_webhook_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='qr_code_digest',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_payment_qr_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='last_reconciled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'INITIATED')), fields=['last_reconciled_at', 'id'], name='payment_reconcile_idx'),
+        ),
+    ]
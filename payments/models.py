@@ -5,9 +5,14 @@ from orders.models import Order
 class Payment(models.Model):
     class Status(models.TextChoices):
         INITIATED = "INITIATED", "Initiated"
+        # Transient claims held while a provider call is in flight (no DB locks held)
+        GENERATING = "GENERATING", "Generating"
+        CONFIRMING = "CONFIRMING", "Confirming"
         SUCCESS = "SUCCESS", "Success"
         FAILED = "FAILED", "Failed"
 
+    CLAIM_STATUSES = (Status.GENERATING, Status.CONFIRMING)
+
     order = models.OneToOneField(
         Order,
         on_delete=models.CASCADE,
@@ -23,21 +28,52 @@ class Payment(models.Model):
     # UroPay fields
     uro_pay_order_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     upi_string = models.TextField(blank=True, null=True)
+    # Legacy inline QR payload; new QR images go to the blob store (payments.services.qr_codes)
     qr_code = models.TextField(blank=True, null=True)
-    reference_number = models.CharField(max_length=64, blank=True, null=True)
-
+    qr_code_digest = models.CharField(max_length=64, blank=True, null=True)
+    reference_number = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # Set when a GENERATING/CONFIRMING claim is taken; identifies the claim for compare-and-set
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    # Last time reconciliation asked UroPay about this payment; oldest are checked first
+    last_reconciled_at = models.DateTimeField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["last_reconciled_at", "id"],
+                condition=models.Q(status="INITIATED"),
+                name="payment_reconcile_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Payment for Order #{self.order.id}"
 
+    @classmethod
+    def public_status(cls, status):
+        """Status as shown to API clients: claims are internal and read as INITIATED."""
+        return cls.Status.INITIATED if status in cls.CLAIM_STATUSES else status
+
 
 class WebhookEvent(models.Model):
     webhook_id = models.CharField(max_length=255, unique=True)
     payload = models.JSONField()
     received_at = models.DateTimeField(auto_now_add=True)
+    # Set by the batch processor; NULL means still queued
+    processed_at = models.DateTimeField(blank=True, null=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, blank=True, null=True, related_name="webhook_events")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(processed_at__isnull=True),
+                name="webhookevent_pending_idx",
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - tiny helper
         return f"WebhookEvent {self.webhook_id}"
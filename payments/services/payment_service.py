@@ -1,27 +1,65 @@
+import logging
+from asgiref.sync import sync_to_async
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Optional
 
 from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
 from django.core.exceptions import ObjectDoesNotExist
-from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError, PermissionDenied
 
 from payments.models import Payment
 from orders.models import Order, Product, OrderItem
-from payments.clients.provider import PaymentProviderClient, PaymentProviderError
+from orders.services.order_events import publish_order_changes
+from payments.clients.provider import (
+    PaymentProviderClient,
+    PaymentProviderError,
+    ProviderUnavailableError,
+    uropay_webhook_signature,
+)
+from payments.clients.async_provider import AsyncPaymentProviderClient
+from payments.services.qr_codes import store_qr_code
 import json
 import hashlib
 import hmac
 from django.utils import timezone
 from payments.models import Payment
 from django.conf import settings
-from notifications.tasks import send_notification
+from notifications.tasks import enqueue_notification
+
+logger = logging.getLogger(__name__)
 
 
 class PaymentNotFound(Exception):
     pass
 
 
+class PaymentProviderUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Payment provider is temporarily unavailable. Please try again shortly."
+    default_code = "provider_unavailable"
+
+
+@dataclass
+class WebhookApplyResult:
+    events: int = 0
+    settled: int = 0
+    already_settled: int = 0
+    unmatched: int = 0
+    # Orders left PENDING behind an already-SUCCESS payment, moved to PAID
+    orders_repaired: int = 0
+
+    def add(self, other: "WebhookApplyResult") -> None:
+        self.events += other.events
+        self.settled += other.settled
+        self.already_settled += other.already_settled
+        self.unmatched += other.unmatched
+        self.orders_repaired += other.orders_repaired
+
+
 @dataclass(frozen=True)
 class PaymentRequest:
     order_id: int
@@ -62,7 +100,7 @@ class PaymentService:
             success, reference = client.charge(amount=amount, currency=request.currency, provider_token=request.provider_token)
         except PaymentProviderError as exc:
             # Any provider exception should rollback the transaction
-            raise ValidationError("Payment processing failed") from exc
+            raise PaymentService._provider_failure(exc, "Payment processing failed") from exc
 
         if not success:
             # Treat as failure -> rollback
@@ -75,6 +113,7 @@ class PaymentService:
 
         order.status = Order.Status.PAID
         order.save(update_fields=["status", "updated_at"])
+        publish_order_changes([order.pk], "payment.succeeded")
 
         # Enqueue notification for payment succeeded
         try:
@@ -83,26 +122,71 @@ class PaymentService:
                 channels.append('EMAIL')
             if getattr(order.user, 'notify_sms', False) and getattr(order.user, 'phone_number', None):
                 channels.append('SMS')
+            if getattr(order.user, 'has_webhook_endpoint', False):
+                channels.append('WEBHOOK')
 
             if channels:
                 unique_key = f"order:{order.id}:payment_succeeded"
                 transaction.on_commit(
-                send_notification.delay(unique_key, order.id, 'payment.succeeded', channels)
+                    lambda: enqueue_notification(unique_key, order.id, 'payment.succeeded', channels)
                 )
         except Exception:
             pass
 
         return payment
 
+    # ------------------------------------------------------------------
+    # UroPay two-phase flow
+    #
+    # 1. claim: short transaction that validates the order and moves the
+    #    payment into GENERATING/CONFIRMING (stamped with claimed_at);
+    # 2. provider call with no transaction or row lock held;
+    # 3. apply: compare-and-set on (status, claimed_at) so a webhook or a
+    #    newer claim that got there first is never overwritten.
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _provider_failure(exc: PaymentProviderError, message: str) -> Exception:
+        """API error for a failed provider call.
+
+        Calls rejected locally by the circuit breaker or bulkhead become a 503 so
+        clients back off and retry instead of treating the payment as invalid.
+        """
+        if isinstance(exc, ProviderUnavailableError):
+            return PaymentProviderUnavailable()
+        return ValidationError(message)
+
+    @staticmethod
+    def _claim_expired_before():
+        lease = getattr(settings, "PAYMENT_CLAIM_TIMEOUT_SECONDS", 60)
+        return timezone.now() - timedelta(seconds=lease)
+
+    @staticmethod
+    def _claim(payment: Payment, from_statuses, to_status) -> datetime:
+        """Move `payment` into `to_status` if it is free; return the claim stamp."""
+        claimed_at = timezone.now()
+        # A claim older than the lease belongs to a crashed/timed-out worker and may be taken over
+        free = Q(status__in=from_statuses) | Q(status=to_status, claimed_at__lt=PaymentService._claim_expired_before())
+        claimed = Payment.objects.filter(Q(pk=payment.pk) & free).update(
+            status=to_status, claimed_at=claimed_at, updated_at=claimed_at,
+        )
+        if not claimed:
+            raise ValidationError("A payment operation for this order is already in progress.")
+        return claimed_at
+
+    @staticmethod
+    def _release(payment: Payment, claim_status, claimed_at) -> None:
+        """Hand a claim back (provider call failed) unless someone else moved the payment on."""
+        Payment.objects.filter(pk=payment.pk, status=claim_status, claimed_at=claimed_at).update(
+            status=Payment.Status.INITIATED, claimed_at=None, updated_at=timezone.now(),
+        )
+
     @staticmethod
     @transaction.atomic
-    def generate_payment(*, user_id: int, order_id: int, vpa: str, vpaName: str, customerName: str, customerEmail: str, transactionNote: str | None = None) -> Payment:
+    def _begin_generate(*, user_id: int, order_id: int):
+        """Phase 1 of generate: validate the order and claim its payment."""
         try:
-            order = (
-                Order.objects.select_for_update()
-                .prefetch_related("items")
-                .get(id=order_id)
-            )
+            order = Order.objects.select_for_update().get(id=order_id)
         except ObjectDoesNotExist:
             raise ValidationError("Order does not exist")
 
@@ -114,90 +198,200 @@ class PaymentService:
 
         # Ensure a Payment record exists (or create)
         payment, _ = Payment.objects.get_or_create(order=order, defaults={"amount": order.total_amount, "status": Payment.Status.INITIATED})
+        claimed_at = PaymentService._claim(
+            payment, [Payment.Status.INITIATED, Payment.Status.FAILED], Payment.Status.GENERATING,
+        )
+        return order, payment, claimed_at
 
-        # Call UroPay generate
-        client = PaymentProviderClient()
-        amount_paise = int(order.total_amount * 100)
-        merchant_order_id = f"ORDER-{order.id}"
+    @staticmethod
+    def _generate_kwargs(order: Order, *, vpa, vpaName, customerName, customerEmail, transactionNote) -> dict:
+        return {
+            "vpa": vpa,
+            "vpaName": vpaName,
+            "amount_paise": int(order.total_amount * 100),
+            "merchantOrderId": f"ORDER-{order.id}",
+            "customerName": customerName,
+            "customerEmail": customerEmail,
+            "transactionNote": transactionNote,
+        }
 
+    @staticmethod
+    def _finish_generate(payment: Payment, claimed_at, data: dict) -> Payment:
+        """Phase 3 of generate: persist provider data if our claim still stands."""
+        qr_fields = {"qr_code": data.get("qrCode"), "qr_code_digest": None}
         try:
-            data = client.uropay_generate(
-                vpa=vpa,
-                vpaName=vpaName,
-                amount_paise=amount_paise,
-                merchantOrderId=merchant_order_id,
-                customerName=customerName,
-                customerEmail=customerEmail,
-                transactionNote=transactionNote,
-            )
+            digest = store_qr_code(data.get("qrCode"))
+        except Exception:
+            # Blob store trouble must not lose the payment; keep the QR inline for the backfill to move later
+            logger.exception("Could not store QR code for payment %s; keeping it inline", payment.pk)
+            digest = None
+        if digest is not None:
+            qr_fields = {"qr_code": None, "qr_code_digest": digest}
+
+        applied = Payment.objects.filter(
+            pk=payment.pk, status=Payment.Status.GENERATING, claimed_at=claimed_at,
+        ).update(
+            status=Payment.Status.INITIATED,
+            claimed_at=None,
+            uro_pay_order_id=data.get("uroPayOrderId"),
+            upi_string=data.get("upiString"),
+            updated_at=timezone.now(),
+            **qr_fields,
+        )
+        if not applied:
+            logger.warning("Payment %s changed while generating; keeping the newer state", payment.pk)
+
+        payment.refresh_from_db()
+        return payment
+
+    @staticmethod
+    def generate_payment(*, user_id: int, order_id: int, vpa: str, vpaName: str, customerName: str, customerEmail: str, transactionNote: str | None = None) -> Payment:
+        order, payment, claimed_at = PaymentService._begin_generate(user_id=user_id, order_id=order_id)
+
+        # Phase 2: call UroPay generate with no locks held
+        client = PaymentProviderClient()
+        try:
+            data = client.uropay_generate(**PaymentService._generate_kwargs(
+                order, vpa=vpa, vpaName=vpaName, customerName=customerName,
+                customerEmail=customerEmail, transactionNote=transactionNote,
+            ))
         except PaymentProviderError as exc:
-            raise ValidationError("UroPay generate failed") from exc
+            PaymentService._release(payment, Payment.Status.GENERATING, claimed_at)
+            raise PaymentService._provider_failure(exc, "UroPay generate failed") from exc
 
-        # Persist returned provider data onto payment
-        payment.uro_pay_order_id = data.get("uroPayOrderId")
-        payment.upi_string = data.get("upiString")
-        payment.qr_code = data.get("qrCode")
-        payment.save(update_fields=["uro_pay_order_id", "upi_string", "qr_code", "updated_at"])
+        return PaymentService._finish_generate(payment, claimed_at, data)
 
-        return payment
+    @staticmethod
+    async def agenerate_payment(*, user_id: int, order_id: int, vpa: str, vpaName: str, customerName: str, customerEmail: str, transactionNote: str | None = None) -> Payment:
+        """Async `generate_payment`: DB phases run in a thread, the provider call is awaited."""
+        order, payment, claimed_at = await sync_to_async(PaymentService._begin_generate)(user_id=user_id, order_id=order_id)
+
+        client = AsyncPaymentProviderClient()
+        try:
+            data = await client.uropay_generate(**PaymentService._generate_kwargs(
+                order, vpa=vpa, vpaName=vpaName, customerName=customerName,
+                customerEmail=customerEmail, transactionNote=transactionNote,
+            ))
+        except PaymentProviderError as exc:
+            await sync_to_async(PaymentService._release)(payment, Payment.Status.GENERATING, claimed_at)
+            raise PaymentService._provider_failure(exc, "UroPay generate failed") from exc
+
+        return await sync_to_async(PaymentService._finish_generate)(payment, claimed_at, data)
 
     @staticmethod
     @transaction.atomic
-    def confirm_payment(*, user_id: int, order_id: int, reference_number: str) -> Payment:
+    def _begin_confirm(*, user_id: int, order_id: int):
+        """Phase 1 of confirm: validate the order and claim its payment.
+
+        Returns (order, payment, None) when the payment is already settled.
+        """
         try:
-            order = (
-                Order.objects.select_for_update()
-                #.select_related("payment")
-                .get(id=order_id)
-            )
+            order = Order.objects.select_for_update().get(id=order_id)
         except ObjectDoesNotExist:
             raise ValidationError("Order does not exist")
 
         if order.user_id != user_id:
             raise PermissionDenied("You do not have permission to pay for this order.")
 
-        payment = getattr(order, "payment", None)
+        payment = Payment.objects.filter(order=order).first()
         if not payment or not payment.uro_pay_order_id:
             raise ValidationError("Payment has not been initiated for this order.")
 
+        if payment.status == Payment.Status.SUCCESS:
+            # Already settled (webhook or an earlier confirm)
+            return order, payment, None
+
+        claimed_at = PaymentService._claim(
+            payment, [Payment.Status.INITIATED, Payment.Status.FAILED], Payment.Status.CONFIRMING,
+        )
+        return order, payment, claimed_at
+
+    @staticmethod
+    @transaction.atomic
+    def _finish_confirm(order: Order, payment: Payment, claimed_at, reference_number: str) -> Payment:
+        """Phase 3 of confirm: mark payment and order success via compare-and-set."""
+        now = timezone.now()
+        applied = Payment.objects.filter(
+            pk=payment.pk, status=Payment.Status.CONFIRMING, claimed_at=claimed_at,
+        ).update(
+            status=Payment.Status.SUCCESS,
+            claimed_at=None,
+            reference_number=reference_number,
+            provider_reference=reference_number,
+            updated_at=now,
+        )
+        if applied:
+            Order.objects.filter(pk=order.pk, status=Order.Status.PENDING).update(
+                status=Order.Status.PAID, updated_at=now,
+            )
+            # Enqueue notification for payment confirmed (webhook/confirm)
+            PaymentService._enqueue_notification(order, "payment_confirmed", "payment.confirmed")
+            publish_order_changes([order.pk], "payment.confirmed")
+        else:
+            logger.info("Payment %s settled concurrently while confirming", payment.pk)
+
+        payment.refresh_from_db()
+        return payment
+
+    @staticmethod
+    def confirm_payment(*, user_id: int, order_id: int, reference_number: str) -> Payment:
+        order, payment, claimed_at = PaymentService._begin_confirm(user_id=user_id, order_id=order_id)
+        if claimed_at is None:
+            return payment
+
+        # Phase 2: call UroPay update with no locks held
         client = PaymentProviderClient()
         try:
             client.uropay_update(uroPayOrderId=payment.uro_pay_order_id, referenceNumber=reference_number)
         except PaymentProviderError as exc:
-            raise ValidationError("UroPay update failed") from exc
+            PaymentService._release(payment, Payment.Status.CONFIRMING, claimed_at)
+            raise PaymentService._provider_failure(exc, "UroPay update failed") from exc
 
-        # Mark payment and order success
-        payment.reference_number = reference_number
-        payment.status = Payment.Status.SUCCESS
-        payment.provider_reference = reference_number
-        payment.save(update_fields=["reference_number", "status", "provider_reference", "updated_at"])
+        return PaymentService._finish_confirm(order, payment, claimed_at, reference_number)
 
-        order.status = Order.Status.PAID
-        order.save(update_fields=["status", "updated_at"])
+    @staticmethod
+    async def aconfirm_payment(*, user_id: int, order_id: int, reference_number: str) -> Payment:
+        """Async `confirm_payment`: DB phases run in a thread, the provider call is awaited."""
+        order, payment, claimed_at = await sync_to_async(PaymentService._begin_confirm)(user_id=user_id, order_id=order_id)
+        if claimed_at is None:
+            return payment
 
-        # Enqueue notification for payment confirmed (webhook/confirm)
+        client = AsyncPaymentProviderClient()
         try:
-            channels = []
-            if getattr(order.user, 'notify_email', True) and getattr(order.user, 'email', None):
-                channels.append('EMAIL')
-            if getattr(order.user, 'notify_sms', False) and getattr(order.user, 'phone_number', None):
-                channels.append('SMS')
+            await client.uropay_update(uroPayOrderId=payment.uro_pay_order_id, referenceNumber=reference_number)
+        except PaymentProviderError as exc:
+            await sync_to_async(PaymentService._release)(payment, Payment.Status.CONFIRMING, claimed_at)
+            raise PaymentService._provider_failure(exc, "UroPay update failed") from exc
 
-            if channels:
-                unique_key = f"order:{order.id}:payment_confirmed"
-                transaction.on_commit(
-                send_notification.delay(unique_key, order.id, 'payment.confirmed', channels)
-                )
-        except Exception:
-            pass
+        return await sync_to_async(PaymentService._finish_confirm)(order, payment, claimed_at, reference_number)
 
-        return payment
+    @staticmethod
+    def _enqueue_notification(order: Order, key_suffix: str, event: str) -> None:
+        channels = []
+        if getattr(order.user, 'notify_email', True) and getattr(order.user, 'email', None):
+            channels.append('EMAIL')
+        if getattr(order.user, 'notify_sms', False) and getattr(order.user, 'phone_number', None):
+            channels.append('SMS')
+        if getattr(order.user, 'has_webhook_endpoint', False):
+            channels.append('WEBHOOK')
+        if not channels:
+            return
+
+        unique_key = f"order:{order.id}:{key_suffix}"
+
+        def enqueue():
+            try:
+                enqueue_notification(unique_key, order.id, event, channels)
+            except Exception:
+                # Notification failure should not affect the payment outcome
+                logger.exception("Failed to enqueue %s notification for order %s", event, order.id)
+
+        transaction.on_commit(enqueue)
 
     @staticmethod
-    def handle_webhook(request):
-        # Verify signature
+    def _verify_webhook(request) -> dict:
+        """Parse the webhook body and check its signature; returns the payload."""
         signature = request.headers.get("X-Uropay-Signature")
-        webhook_id = request.headers.get("X-Uropay-Webhook-Id")
         environment = request.headers.get("X-Uropay-Environment")
 
         raw = request.body
@@ -211,45 +405,155 @@ class PaymentService:
         if not secret:
             raise ValidationError("Webhook secret not configured")
 
-        # secret must be sha512-hashed before use
-        hashed_secret = hashlib.sha512(secret.encode("utf-8")).hexdigest()
-
-        # sorted transaction data
-        sorted_items = dict(sorted(data.items(), key=lambda kv: kv[0]))
-        payload_for_sig = {**sorted_items, "environment": environment}
-        payload_str = json.dumps(payload_for_sig, separators=(",", ":"), ensure_ascii=False)
-
-        expected = hmac.new(hashed_secret.encode("utf-8"), payload_str.encode("utf-8"), hashlib.sha256).hexdigest()
+        expected = uropay_webhook_signature(data, environment, secret)
         if not signature or not hmac.compare_digest(expected, signature):
             raise PermissionDenied("Invalid webhook signature")
+        return data
 
-        # Idempotency: do not process duplicate webhook ids
+    @staticmethod
+    def handle_webhook(request):
+        """Verify and durably record a webhook; the payment update happens later.
+
+        The event is inserted with ON CONFLICT DO NOTHING on `webhook_id`, so
+        provider retries are idempotent without a racy exists() check, and the
+        provider gets its 200 without waiting on payment/order writes.
+        `process_webhook_events` applies queued events in batches.
+        """
         from payments.models import WebhookEvent
+        from payments.tasks import process_webhook_events_task
 
-        if WebhookEvent.objects.filter(webhook_id=webhook_id).exists():
-            return
+        data = PaymentService._verify_webhook(request)
+        webhook_id = request.headers.get("X-Uropay-Webhook-Id")
+        if not webhook_id:
+            # Stable id so a retried delivery of the same body still dedupes
+            webhook_id = "sha256:" + hashlib.sha256(request.body).hexdigest()
+
+        WebhookEvent.objects.bulk_create(
+            [WebhookEvent(webhook_id=webhook_id, payload=data, received_at=timezone.now())],
+            ignore_conflicts=True,
+        )
 
-        # Process basic payload keys
-        ref = data.get("referenceNumber")
-        amount = data.get("amount")
+        def enqueue():
+            try:
+                # No publish retries: the ack must stay fast; the beat sweep picks up anything missed
+                process_webhook_events_task.apply_async(retry=False)
+            except Exception:
+                logger.exception("Failed to enqueue webhook processing for %s", webhook_id)
 
-        # Try to find matching payment by reference_number or uro_pay_order_id
-        payment = None
-        if ref:
-            payment = Payment.objects.filter(reference_number=ref).first()
+        transaction.on_commit(enqueue)
 
-        if not payment and data.get("uroPayOrderId"):
-            payment = Payment.objects.filter(uro_pay_order_id=data.get("uroPayOrderId")).first()
+    @staticmethod
+    def process_webhook_events(batch_size: int = 200) -> int:
+        """Apply one batch of queued webhook events. Returns how many were consumed.
+
+        Events are claimed with SKIP LOCKED so concurrent workers take disjoint
+        batches.
+        """
+        from payments.models import WebhookEvent
+
+        with transaction.atomic():
+            events = list(
+                WebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True)
+                .order_by("id")[:batch_size]
+            )
+            if not events:
+                return 0
+            result = PaymentService.apply_webhook_events(events)
+
+        logger.info("Processed %s webhook events (%s payments settled)", result.events, result.settled)
+        return result.events
 
-        if payment:
-            payment.reference_number = ref or payment.reference_number
-            payment.status = Payment.Status.SUCCESS
-            payment.provider_reference = ref or payment.provider_reference
-            payment.save(update_fields=["reference_number", "status", "provider_reference", "updated_at"])
-            order = payment.order
-            order.status = Order.Status.PAID
-            order.save(update_fields=["status", "updated_at"])
+    @staticmethod
+    def apply_webhook_events(events, *, dry_run: bool = False) -> WebhookApplyResult:
+        """Apply webhook payloads to their payments and orders. Call inside a transaction.
+
+        Payments are matched with one query on the indexed `reference_number` /
+        `uro_pay_order_id` columns, and all writes are bulk. Payments that are
+        already SUCCESS are left alone, so re-applying events (replays) is
+        idempotent; only their order is moved to PAID if a lost or half-applied
+        webhook left it PENDING. With `dry_run` nothing is written or locked.
+        """
+        from payments.models import WebhookEvent
 
-        # Record webhook event
-        WebhookEvent.objects.create(webhook_id=webhook_id, payload=data, received_at=timezone.now())
+        now = timezone.now()
+        result = WebhookApplyResult(events=len(events))
+        refs = {e.payload.get("referenceNumber") for e in events} - {None, ""}
+        uro_ids = {e.payload.get("uroPayOrderId") for e in events} - {None, ""}
+        payments = []
+        if refs or uro_ids:
+            qs = Payment.objects.filter(Q(reference_number__in=refs) | Q(uro_pay_order_id__in=uro_ids))
+            if not dry_run:
+                # Consistent lock order so parallel replay batches cannot deadlock
+                qs = qs.select_for_update().order_by("pk")
+            payments = list(qs)
+        by_ref = {p.reference_number: p for p in payments if p.reference_number}
+        by_uro = {p.uro_pay_order_id: p for p in payments if p.uro_pay_order_id}
+
+        settled = {}
+        references = {}
+        links = {}
+        settled_order_ids = set()
+        for event in events:
+            ref = event.payload.get("referenceNumber")
+            payment = (by_ref.get(ref) if ref else None) or by_uro.get(event.payload.get("uroPayOrderId"))
+            if payment is None:
+                result.unmatched += 1
+                logger.debug("Webhook %s matched no payment", event.webhook_id)
+                continue
+            if event.payment_id != payment.pk:
+                links[event.pk] = payment.pk
+            if payment.status == Payment.Status.SUCCESS or payment.pk in settled:
+                result.already_settled += 1
+                if payment.status == Payment.Status.SUCCESS:
+                    settled_order_ids.add(payment.order_id)
+                continue
+            settled[payment.pk] = payment
+            if ref:
+                references[payment.pk] = ref
+        result.settled = len(settled)
+        stuck_order_ids = list(
+            Order.objects.filter(pk__in=settled_order_ids, status=Order.Status.PENDING).values_list("pk", flat=True)
+        ) if settled_order_ids else []
+        result.orders_repaired = len(stuck_order_ids)
+
+        if dry_run:
+            return result
+        # Plain UPDATEs for the columns that are the same for every row; CASE only
+        # where values differ (bulk_update's per-row CASE dominates at replay sizes)
+        if settled:
+            Payment.objects.filter(pk__in=list(settled)).update(
+                status=Payment.Status.SUCCESS,
+                # Clearing the claim makes an in-flight confirm see the webhook won
+                claimed_at=None,
+                reference_number=PaymentService._case_by_pk(Payment, references, "reference_number"),
+                provider_reference=PaymentService._case_by_pk(Payment, references, "provider_reference"),
+                updated_at=now,
+            )
+            Order.objects.filter(
+                pk__in=[p.order_id for p in settled.values()], status=Order.Status.PENDING,
+            ).update(status=Order.Status.PAID, updated_at=now)
+            publish_order_changes([p.order_id for p in settled.values()], "payment.webhook")
+        if stuck_order_ids:
+            Order.objects.filter(pk__in=stuck_order_ids, status=Order.Status.PENDING).update(
+                status=Order.Status.PAID, updated_at=now,
+            )
+            publish_order_changes(stuck_order_ids, "payment.webhook")
+        WebhookEvent.objects.filter(pk__in=[e.pk for e in events]).update(processed_at=now)
+        if links:
+            WebhookEvent.objects.filter(pk__in=list(links)).update(
+                payment=PaymentService._case_by_pk(WebhookEvent, links, "payment"),
+            )
+        return result
 
+    @staticmethod
+    def _case_by_pk(model, values: dict, field: str):
+        """`CASE pk WHEN .. THEN ..` over `values`, keeping `field` for other rows."""
+        if not values:
+            return F(field)
+        output_field = model._meta.get_field(field)
+        return Case(
+            *[When(pk=pk, then=Value(value, output_field=output_field)) for pk, value in values.items()],
+            default=F(field),
+            output_field=output_field,
+        )
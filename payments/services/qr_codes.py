@@ -0,0 +1,118 @@
+"""
+Content-addressed storage for provider QR code images.
+
+Blobs live in the `payment_qr` storage (see `STORAGES`; local filesystem by
+default, swappable for any Django storage backend) under their SHA-256, so a
+stored blob never changes and can be cached forever. `Payment` keeps only the
+digest.
+"""
+import base64
+import binascii
+import hashlib
+from typing import Dict, Optional
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+
+
+STORAGE_ALIAS = "payment_qr"
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def qr_storage():
+    return storages[STORAGE_ALIAS]
+
+
+def blob_name(digest: str) -> str:
+    # Two-level fan-out keeps directories small on filesystem backends
+    return f"qr/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def decode_qr_payload(raw: str) -> bytes:
+    """Turn the provider's `qrCode` (data URL, bare base64 or inline SVG) into the image bytes."""
+    data = raw.strip()
+    if data.startswith("data:") and "," in data:
+        header, data = data.split(",", 1)
+        if ";base64" not in header:
+            return data.encode("utf-8")
+    if data.startswith(("<svg", "<?xml")):
+        return data.encode("utf-8")
+    try:
+        return base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        # Not base64 after all: keep the text as-is
+        return data.encode("utf-8")
+
+
+def _sniff(head: bytes) -> str:
+    if head.lstrip().startswith((b"<svg", b"<?xml")):
+        return "image/svg+xml"
+    return next((ct for magic, ct in _SIGNATURES if head.startswith(magic)), "application/octet-stream")
+
+
+def sniff_content_type(blob) -> str:
+    """Content type of an open stored blob, from its first bytes; rewinds the file."""
+    head = blob.read(64)
+    blob.seek(0)
+    return _sniff(head)
+
+
+def store_qr_code(raw: Optional[str]) -> Optional[str]:
+    """Write the QR payload to the blob store (once per distinct content) and return its digest."""
+    if not raw:
+        return None
+    blob = decode_qr_payload(raw)
+    digest = hashlib.sha256(blob).hexdigest()
+    storage = qr_storage()
+    name = blob_name(digest)
+    if not storage.exists(name):
+        saved = storage.save(name, ContentFile(blob))
+        if saved != name:
+            # Lost a race with a concurrent save of the same content: the
+            # storage picked a free name instead, so drop the duplicate
+            storage.delete(saved)
+    return digest
+
+
+def open_qr_code(digest: str):
+    """Open a stored blob for reading; raises FileNotFoundError if it is missing."""
+    return qr_storage().open(blob_name(digest), "rb")
+
+
+def backfill_qr_codes(*, batch_size: int = 500, dry_run: bool = False, progress=None) -> Dict[str, int]:
+    """Move inline `Payment.qr_code` payloads into the blob store.
+
+    Walks payments in primary-key batches, loading only the QR column. Each
+    row is cleared only if its payload is still the one that was stored, so a
+    payment regenerated meanwhile keeps its newer QR code.
+    """
+    from payments.models import Payment
+
+    counts = {"scanned": 0, "moved": 0, "skipped": 0}
+    last_pk = 0
+    while True:
+        batch = list(
+            Payment.objects.filter(pk__gt=last_pk, qr_code__isnull=False)
+            .exclude(qr_code="")
+            .order_by("pk")
+            .values_list("pk", "qr_code")[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        counts["scanned"] += len(batch)
+        if not dry_run:
+            digests = [(pk, raw, store_qr_code(raw)) for pk, raw in batch]
+            with transaction.atomic():
+                for pk, raw, digest in digests:
+                    moved = Payment.objects.filter(pk=pk, qr_code=raw).update(qr_code=None, qr_code_digest=digest)
+                    counts["moved" if moved else "skipped"] += 1
+        if progress:
+            progress(counts)
+    return counts
@@ -0,0 +1,214 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from orders.models import Order
+from orders.services.order_events import publish_order_changes
+from payments.clients.provider import PaymentProviderClient, PaymentProviderError, ProviderUnavailableError
+from payments.clients.resilience import RateLimiter
+from payments.models import Payment
+from payments.services.payment_service import PaymentService
+
+logger = logging.getLogger(__name__)
+
+
+# UroPay orderStatus values that settle a payment; anything else leaves it INITIATED
+PROVIDER_SUCCESS_STATUSES = {"COMPLETED", "SUCCESS", "PAID"}
+PROVIDER_FAILED_STATUSES = {"FAILED", "EXPIRED", "CANCELLED", "REJECTED"}
+
+
+@dataclass
+class ReconciliationResult:
+    checked: int = 0
+    settled: int = 0
+    failed: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    # Provider state differs from ours (settled + failed) / provider amount differs from ours
+    mismatches: int = 0
+    amount_mismatches: int = 0
+    aborted: bool = False
+    elapsed_seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.checked / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {**self.__dict__, "per_second": round(self.per_second, 2)}
+
+
+def _stale_chunks(cutoff, chunk_size: int, limit: int, run_started):
+    """Yield stale INITIATED payments, never-checked then least recently checked first.
+
+    The caller stamps `last_reconciled_at` on each chunk it checks, so rows
+    UroPay leaves unresolved move behind the rest and cannot starve newer
+    stale payments once there are more than `limit` of them.
+    """
+    seen = 0
+    while seen < limit:
+        chunk = list(
+            Payment.objects.filter(
+                Q(last_reconciled_at__isnull=True) | Q(last_reconciled_at__lt=run_started),
+                status=Payment.Status.INITIATED,
+                uro_pay_order_id__isnull=False,
+                updated_at__lt=cutoff,
+            )
+            .order_by(F("last_reconciled_at").asc(nulls_first=True), "pk")
+            .only("pk", "order_id", "amount", "uro_pay_order_id", "reference_number")[: min(chunk_size, limit - seen)]
+        )
+        if not chunk:
+            return
+        yield chunk
+        seen += len(chunk)
+
+
+def _fetch_statuses(payments: List[Payment], max_workers: int, limiter: RateLimiter):
+    """Query UroPay for each payment on a bounded thread pool.
+
+    Returns {payment pk: status data or exception}. No DB access happens in the
+    worker threads.
+    """
+    client = PaymentProviderClient()
+
+    def fetch(payment: Payment):
+        limiter.acquire()
+        try:
+            return payment.pk, client.uropay_status(payment.uro_pay_order_id)
+        except PaymentProviderError as exc:
+            return payment.pk, exc
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="uropay-reconcile") as pool:
+        return dict(pool.map(fetch, payments))
+
+
+def _amount_matches(payment: Payment, data: Dict) -> bool:
+    amount = data.get("amount")
+    if amount is None:
+        return True
+    try:
+        return int(amount) == int(payment.amount * 100)
+    except (TypeError, ValueError, ArithmeticError):
+        return False
+
+
+def _apply(settle: Dict[int, Optional[str]], fail: List[int]) -> Tuple[int, int]:
+    """Write outcomes in bulk, only for payments that are still INITIATED."""
+    now = timezone.now()
+    with transaction.atomic():
+        settled_rows = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=list(settle), status=Payment.Status.INITIATED)
+            .values_list("pk", "order_id")
+        )
+        if settled_rows:
+            references = [When(pk=pk, then=Value(settle[pk])) for pk, _ in settled_rows if settle[pk]]
+            Payment.objects.filter(pk__in=[pk for pk, _ in settled_rows]).update(
+                status=Payment.Status.SUCCESS,
+                reference_number=Case(*references, default=F("reference_number")) if references else F("reference_number"),
+                provider_reference=Case(*references, default=F("provider_reference")) if references else F("provider_reference"),
+                updated_at=now,
+            )
+            order_ids = [order_id for _, order_id in settled_rows]
+            paid = list(Order.objects.select_related("user").filter(pk__in=order_ids, status=Order.Status.PENDING))
+            Order.objects.filter(pk__in=[o.pk for o in paid]).update(status=Order.Status.PAID, updated_at=now)
+            for order in paid:
+                PaymentService._enqueue_notification(order, "payment_confirmed", "payment.confirmed")
+            publish_order_changes(order_ids, "payment.reconciled")
+
+        failed_rows = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=fail, status=Payment.Status.INITIATED)
+            .values_list("pk", "order_id")
+        ) if fail else []
+        if failed_rows:
+            Payment.objects.filter(pk__in=[pk for pk, _ in failed_rows]).update(
+                status=Payment.Status.FAILED, updated_at=now,
+            )
+            publish_order_changes([order_id for _, order_id in failed_rows], "payment.reconciled")
+        failed_count = len(failed_rows)
+    return len(settled_rows), failed_count
+
+
+def reconcile_stale_payments(*, older_than: timedelta | None = None, limit: int | None = None) -> ReconciliationResult:
+    """
+    Resolve INITIATED payments whose webhook/confirm never arrived by asking UroPay.
+
+    Stale payments are read in chunks, least recently checked first. Each chunk's status calls run
+    concurrently on a bounded pool, paced by a per-process rate limit, and the
+    outcomes are applied with a few bulk statements that skip rows changed
+    meanwhile. An open circuit stops the run early.
+    """
+    older_than = older_than or timedelta(seconds=getattr(settings, "PAYMENT_RECONCILE_AFTER_SECONDS", 900))
+    limit = limit or getattr(settings, "PAYMENT_RECONCILE_MAX_PER_RUN", 2000)
+    chunk_size = getattr(settings, "PAYMENT_RECONCILE_CHUNK_SIZE", 100)
+    max_workers = getattr(settings, "PAYMENT_RECONCILE_WORKERS", 4)
+    limiter = RateLimiter(getattr(settings, "PAYMENT_RECONCILE_RATE_PER_SECOND", 10))
+
+    result = ReconciliationResult()
+    started = time.monotonic()
+    run_started = timezone.now()
+    cutoff = run_started - older_than
+
+    for chunk in _stale_chunks(cutoff, chunk_size, limit, run_started):
+        outcomes = _fetch_statuses(chunk, max_workers, limiter)
+        settle: Dict[int, Optional[str]] = {}
+        fail: List[int] = []
+        checked: List[int] = []
+
+        for payment in chunk:
+            data = outcomes[payment.pk]
+            if isinstance(data, ProviderUnavailableError):
+                result.aborted = True
+                continue
+            result.checked += 1
+            checked.append(payment.pk)
+            if isinstance(data, Exception):
+                result.errors += 1
+                continue
+
+            provider_status = str(data.get("orderStatus", "")).upper()
+            if provider_status in PROVIDER_SUCCESS_STATUSES:
+                if not _amount_matches(payment, data):
+                    # Never settle on a mismatched amount; leave it for a human
+                    result.amount_mismatches += 1
+                    logger.warning(
+                        "Payment %s: UroPay reports amount %s, expected %s",
+                        payment.pk, data.get("amount"), payment.amount * 100,
+                    )
+                    continue
+                settle[payment.pk] = data.get("referenceNumber") or None
+            elif provider_status in PROVIDER_FAILED_STATUSES:
+                fail.append(payment.pk)
+            else:
+                result.unchanged += 1
+
+        # update() leaves updated_at alone, so the row's staleness is unchanged
+        Payment.objects.filter(pk__in=checked).update(last_reconciled_at=timezone.now())
+        settled, failed = _apply(settle, fail)
+        result.settled += settled
+        result.failed += failed
+        result.mismatches += settled + failed
+        # Rows a webhook or confirm resolved while we were asking
+        result.unchanged += (len(settle) - settled) + (len(fail) - failed)
+
+        if result.aborted:
+            logger.warning("Payment reconciliation stopped early: UroPay calls are being rejected (circuit open or bulkhead full)")
+            break
+
+    result.elapsed_seconds = round(time.monotonic() - started, 3)
+    logger.info(
+        "Payment reconciliation: checked=%s settled=%s failed=%s unchanged=%s errors=%s "
+        "amount_mismatches=%s rate=%.1f/s",
+        result.checked, result.settled, result.failed, result.unchanged, result.errors,
+        result.amount_mismatches, result.per_second,
+    )
+    return result
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+from django.db import connection, transaction
+
+from payments.models import WebhookEvent
+from payments.services.payment_service import PaymentService, WebhookApplyResult
+
+logger = logging.getLogger(__name__)
+
+
+def _id_batches(queryset, batch_size: int) -> Iterator[List[int]]:
+    """Stream matching event ids in primary-key order, `batch_size` at a time."""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _replay_batch(ids: List[int], dry_run: bool) -> WebhookApplyResult:
+    with transaction.atomic():
+        events = list(WebhookEvent.objects.filter(pk__in=ids).order_by("pk"))
+        return PaymentService.apply_webhook_events(events, dry_run=dry_run)
+
+
+def _replay_batch_in_worker(ids: List[int], dry_run: bool) -> WebhookApplyResult:
+    try:
+        return _replay_batch(ids, dry_run)
+    finally:
+        # Each pool thread has its own connection; don't leave it open after the run
+        connection.close()
+
+
+def replay_webhook_events(
+    queryset,
+    *,
+    batch_size: int = 1000,
+    workers: int = 1,
+    dry_run: bool = False,
+    progress: Optional[Callable[[WebhookApplyResult, float], None]] = None,
+) -> WebhookApplyResult:
+    """
+    Re-run stored webhook events through `PaymentService.apply_webhook_events`.
+
+    Ids are streamed with keyset pagination, so memory stays flat however many
+    events match. Each batch loads its events, applies them in one transaction,
+    and runs on a pool of `workers` threads (one DB connection each). Already
+    settled payments are skipped, so replaying is safe to repeat.
+    """
+    total = WebhookApplyResult()
+    started = time.monotonic()
+    lock = threading.Lock()
+
+    def collect(result: WebhookApplyResult) -> None:
+        with lock:
+            total.add(result)
+            if progress:
+                progress(total, time.monotonic() - started)
+
+    if workers <= 1:
+        for ids in _id_batches(queryset, batch_size):
+            collect(_replay_batch(ids, dry_run))
+        return total
+
+    # Bound in-flight batches so a huge range is not materialised as futures up front
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    def run(ids):
+        try:
+            collect(_replay_batch_in_worker(ids, dry_run))
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook-replay") as pool:
+        pending = set()
+        for ids in _id_batches(queryset, batch_size):
+            slots.acquire()
+            pending.add(pool.submit(run, ids))
+            done = {f for f in pending if f.done()}
+            for future in done:
+                future.result()  # surface a failed batch before queueing more
+            pending -= done
+        for future in pending:
+            future.result()
+    return total
@@ -0,0 +1,272 @@
+"""
+Local stand-in for the UroPay API, for load and soak tests of the payment path.
+
+Implements `/order/generate`, `/order/update`, `/order/status/<id>` and
+`/charge` with UroPay's auth headers, keeps orders in memory, can post signed
+webhooks back to the app, and injects latency, errors and hangs. Run it with
+`manage.py run_uropay_simulator` and point `UROPAY_BASE_URL` at it.
+"""
+import asyncio
+import base64
+import json
+import logging
+import random
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+from payments.clients.provider import _uropay_auth_headers, uropay_webhook_signature
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LatencyModel:
+    """Response delay in milliseconds.
+
+    Spec strings: `fixed:50`, `uniform:20,200`, `lognormal:80,0.6` (median ms,
+    sigma) and `exp:50` (mean ms).
+    """
+
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, raw = spec.partition(":")
+        try:
+            params = tuple(float(p) for p in raw.split(",")) if raw else (0.0,)
+        except ValueError:
+            raise ValueError(f"Bad latency spec {spec!r}")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exp": 1}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Bad latency spec {spec!r}; expected one of fixed:MS, uniform:LO,HI, lognormal:MEDIAN,SIGMA, exp:MEAN")
+        return cls(kind, params)
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0.0, sigma)
+        if self.kind == "exp":
+            return rng.expovariate(1.0 / self.params[0]) if self.params[0] > 0 else 0.0
+        return self.params[0]
+
+
+@dataclass
+class FaultProfile:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_rate: float = 0.0        # answer 503
+    timeout_rate: float = 0.0      # hang for `hang_seconds` (beyond the client timeout)
+    hang_seconds: float = 30.0
+    decline_rate: float = 0.0      # /charge returns success=false
+    seed: Optional[int] = None
+
+
+@dataclass
+class WebhookConfig:
+    url: Optional[str] = None
+    environment: str = "TEST"
+    # Also pay generated orders after this many seconds, as if the customer paid without confirming
+    auto_pay_after: Optional[float] = None
+    duplicate_rate: float = 0.0    # resend the same webhook id, to exercise idempotency
+
+
+class UroPaySimulator:
+    def __init__(self, *, api_key: str, secret: str, faults: FaultProfile | None = None, webhooks: WebhookConfig | None = None):
+        self.api_key = api_key
+        self.secret = secret
+        self.faults = faults or FaultProfile()
+        self.webhooks = webhooks or WebhookConfig()
+        self.rng = random.Random(self.faults.seed)
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, int] = {}
+        self._background: set = set()
+        self._http: Optional[aiohttp.ClientSession] = None
+
+    # ------------------------------------------------------------------
+    # aiohttp app
+    # ------------------------------------------------------------------
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/order/generate", self.generate)
+        app.router.add_patch("/order/update", self.update)
+        app.router.add_get("/order/status/{uro_pay_order_id}", self.status)
+        app.router.add_post("/charge", self.charge)
+        app.router.add_get("/_sim/stats", self.stats_view)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    def _count(self, key: str) -> None:
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path.startswith("/_sim/"):
+            return await handler(request)
+        resource = request.match_info.route.resource
+        self._count(f"requests:{resource.canonical if resource else request.path}")
+
+        expected = _uropay_auth_headers(self.api_key, self.secret)
+        if request.headers.get("X-API-KEY") != expected["X-API-KEY"] or request.headers.get("Authorization") != expected["Authorization"]:
+            self._count("unauthorized")
+            return web.json_response({"message": "Unauthorized"}, status=401)
+
+        delay = self.faults.latency.sample_ms(self.rng) / 1000.0
+        roll = self.rng.random()
+        if roll < self.faults.timeout_rate:
+            self._count("injected_timeouts")
+            await asyncio.sleep(self.faults.hang_seconds)
+        elif delay:
+            await asyncio.sleep(delay)
+        if self.faults.timeout_rate <= roll < self.faults.timeout_rate + self.faults.error_rate:
+            self._count("injected_errors")
+            return web.json_response({"message": "Service Unavailable (simulated)"}, status=503)
+        return await handler(request)
+
+    async def _json(self, request: web.Request) -> Dict[str, Any]:
+        try:
+            return await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text='{"message": "Invalid JSON"}', content_type="application/json")
+
+    async def generate(self, request: web.Request) -> web.Response:
+        body = await self._json(request)
+        missing = [k for k in ("vpa", "vpaName", "amount", "merchantOrderId", "customerName", "customerEmail") if not body.get(k)]
+        if missing:
+            return web.json_response({"message": f"Missing fields: {', '.join(missing)}"}, status=400)
+
+        uro_pay_order_id = f"SIM-{uuid.uuid4().hex[:16]}"
+        upi_string = f"upi://pay?pa={body['vpa']}&pn={body['vpaName']}&am={int(body['amount']) / 100:.2f}&tr={uro_pay_order_id}"
+        self.orders[uro_pay_order_id] = {
+            "uroPayOrderId": uro_pay_order_id,
+            "merchantOrderId": body["merchantOrderId"],
+            "amount": int(body["amount"]),
+            "orderStatus": "CREATED",
+            "referenceNumber": None,
+        }
+        if self.webhooks.auto_pay_after is not None:
+            self._spawn(self._auto_pay(uro_pay_order_id))
+        return web.json_response({"data": {
+            "uroPayOrderId": uro_pay_order_id,
+            "upiString": upi_string,
+            "qrCode": base64.b64encode(upi_string.encode()).decode(),
+        }})
+
+    async def update(self, request: web.Request) -> web.Response:
+        body = await self._json(request)
+        order = self.orders.get(body.get("uroPayOrderId"))
+        if order is None:
+            return web.json_response({"message": "Order not found"}, status=404)
+        order["referenceNumber"] = body.get("referenceNumber") or order["referenceNumber"]
+        order["orderStatus"] = body.get("orderStatus") or "COMPLETED"
+        self._send_webhook(order)
+        return web.json_response({"data": dict(order)})
+
+    async def status(self, request: web.Request) -> web.Response:
+        order = self.orders.get(request.match_info["uro_pay_order_id"])
+        if order is None:
+            return web.json_response({"message": "Order not found"}, status=404)
+        return web.json_response({"data": dict(order)})
+
+    async def charge(self, request: web.Request) -> web.Response:
+        await self._json(request)
+        success = self.rng.random() >= self.faults.decline_rate
+        return web.json_response({"success": success, "reference": f"SIM-CHG-{uuid.uuid4().hex[:12]}"})
+
+    async def stats_view(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "orders": len(self.orders)})
+
+    # ------------------------------------------------------------------
+    # Webhooks back to the app
+    # ------------------------------------------------------------------
+
+    def signed_webhook(self, order: Dict[str, Any], webhook_id: str | None = None):
+        """Return (body bytes, headers) for a webhook about `order`."""
+        payload = {k: order[k] for k in ("uroPayOrderId", "merchantOrderId", "amount", "orderStatus", "referenceNumber")}
+        headers = {
+            "Content-Type": "application/json",
+            "X-Uropay-Webhook-Id": webhook_id or f"SIM-WH-{uuid.uuid4().hex}",
+            "X-Uropay-Environment": self.webhooks.environment,
+            "X-Uropay-Signature": uropay_webhook_signature(payload, self.webhooks.environment, self.secret),
+        }
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), headers
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _send_webhook(self, order: Dict[str, Any]) -> None:
+        if not self.webhooks.url:
+            return
+        body, headers = self.signed_webhook(order)
+        self._spawn(self._post_webhook(body, headers))
+        if self.rng.random() < self.webhooks.duplicate_rate:
+            self._spawn(self._post_webhook(body, headers))
+
+    async def _post_webhook(self, body: bytes, headers: Dict[str, str]) -> None:
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        try:
+            async with self._http.post(self.webhooks.url, data=body, headers=headers) as resp:
+                self._count(f"webhooks:{resp.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._count("webhooks:unreachable")
+            logger.warning("Simulator webhook to %s failed", self.webhooks.url, exc_info=True)
+
+    async def _auto_pay(self, uro_pay_order_id: str) -> None:
+        await asyncio.sleep(self.webhooks.auto_pay_after)
+        order = self.orders.get(uro_pay_order_id)
+        if order and order["orderStatus"] == "CREATED":
+            order["orderStatus"] = "COMPLETED"
+            order["referenceNumber"] = f"SIMUTR{self.rng.randrange(10**11, 10**12)}"
+            self._send_webhook(order)
+
+    async def _cleanup(self, app) -> None:
+        for task in list(self._background):
+            task.cancel()
+        if self._http is not None:
+            await self._http.close()
+
+
+class BackgroundSimulator:
+    """Runs a simulator on its own event loop thread; for tests and benchmarks.
+
+        with BackgroundSimulator(sim) as base_url:
+            settings.UROPAY_BASE_URL = base_url
+    """
+
+    def __init__(self, simulator: UroPaySimulator, host: str = "127.0.0.1", port: int = 0):
+        self.simulator = simulator
+        self.host = host
+        self.port = port
+        self.url: Optional[str] = None
+        self._loop = asyncio.new_event_loop()
+        self._runner: Optional[web.AppRunner] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="uropay-simulator", daemon=True)
+
+    async def _start(self) -> str:
+        self._runner = web.AppRunner(self.simulator.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{self.host}:{port}"
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        self.url = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(10)
+        return self.url
+
+    def __exit__(self, *exc) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop.close()
@@ -0,0 +1,27 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+
+from payments.services.payment_service import PaymentService
+from payments.services.reconciliation import reconcile_stale_payments
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_webhook_events_task():
+    """Drain queued UroPay webhook events in batches (also beat-scheduled as a sweep)."""
+    batch_size = getattr(settings, "WEBHOOK_BATCH_SIZE", 200)
+    total = 0
+    for _ in range(getattr(settings, "WEBHOOK_MAX_BATCHES_PER_RUN", 50)):
+        consumed = PaymentService.process_webhook_events(batch_size)
+        total += consumed
+        if consumed < batch_size:
+            break
+    return total
+
+
+@shared_task
+def reconcile_payments_task():
+    """Beat-scheduled: settle or fail stale INITIATED payments from UroPay's status API."""
+    return reconcile_stale_payments().as_dict()
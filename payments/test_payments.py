@@ -1,15 +1,34 @@
 """
-Tests for the payments app - 20 tests.
+Tests for the payments app - 58 tests.
 Covers models, serializers, views, services, and provider client.
 """
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
 import pytest
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch, MagicMock
 
+import requests
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient
+from django.utils import timezone
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from orders.models import Order
 from payments.models import Payment, WebhookEvent
@@ -19,7 +38,15 @@ from payments.api.serializers import (
     PaymentResponseSerializer,
 )
 from payments.services.payment_service import PaymentService, PaymentRequest
+from payments.clients import provider
 from payments.clients.provider import PaymentProviderClient, PaymentProviderError
+from payments.clients.async_provider import AsyncPaymentProviderClient, close_async_session
+from payments.clients.exceptions import BulkheadFullError, CircuitOpenError
+from payments.clients.resilience import get_metrics
+from payments.services import reconciliation
+from payments.services.qr_codes import qr_storage, blob_name, store_qr_code
+from payments.services.reconciliation import reconcile_stale_payments
+from payments.simulator import BackgroundSimulator, FaultProfile, LatencyModel, UroPaySimulator
 
 
 User = get_user_model()
@@ -70,7 +97,7 @@ class TestWebhookEventModel:
 
 
 # ============================================================================
-# SERIALIZER TESTS (4 tests)
+# SERIALIZER TESTS (5 tests)
 # ============================================================================
 
 class TestPaymentSerializers:
@@ -100,6 +127,14 @@ class TestPaymentSerializers:
         assert data["id"] == payment_with_uropay.pk
         assert data["uro_pay_order_id"] == payment_with_uropay.uro_pay_order_id
 
+    def test_payment_response_hides_claim_states(self, payment_with_uropay):
+        """Test in-flight GENERATING/CONFIRMING claims are reported to clients as INITIATED."""
+        for claim in Payment.CLAIM_STATUSES:
+            payment_with_uropay.status = claim
+            assert PaymentResponseSerializer(payment_with_uropay).data["status"] == "INITIATED"
+        payment_with_uropay.status = Payment.Status.SUCCESS
+        assert PaymentResponseSerializer(payment_with_uropay).data["status"] == "SUCCESS"
+
 
 # ============================================================================
 # SERVICE TESTS (6 tests)
@@ -154,7 +189,105 @@ class TestPaymentService:
 
 
 # ============================================================================
-# PROVIDER CLIENT TESTS (3 tests)
+# TWO-PHASE PROVIDER FLOW TESTS (5 tests)
+# ============================================================================
+
+class SlowStubProvider:
+    """Provider stub that sleeps like a slow UroPay and records how it was called."""
+
+    def __init__(self, delay=0.05, during_call=None, fail=False):
+        self.delay = delay
+        self.during_call = during_call
+        self.fail = fail
+        self.atomic_depths = []
+
+    def _in_flight(self):
+        # How many atomic blocks were open while the "network call" ran
+        self.atomic_depths.append(len(connection.atomic_blocks))
+        time.sleep(self.delay)
+        if self.during_call:
+            self.during_call()
+        if self.fail:
+            raise PaymentProviderError("provider timed out")
+
+    def uropay_generate(self, **kwargs):
+        self._in_flight()
+        return {"uroPayOrderId": "URO-SLOW-1", "upiString": "upi://pay?slow", "qrCode": "qr=="}
+
+    def uropay_update(self, **kwargs):
+        self._in_flight()
+        return {}
+
+
+class TestTwoPhasePaymentFlow:
+    """Provider calls must run outside the order-row transaction."""
+
+    def test_generate_calls_provider_without_transaction(self, order, user):
+        """Test the service's claim transaction is closed before the provider call."""
+        baseline = len(connection.atomic_blocks)
+        stub = SlowStubProvider()
+        with patch("payments.services.payment_service.PaymentProviderClient", return_value=stub):
+            payment = PaymentService.generate_payment(
+                user_id=user.id, order_id=order.id, vpa="test@upi", vpaName="Test",
+                customerName="Test", customerEmail="test@example.com",
+            )
+        assert stub.atomic_depths == [baseline]
+        assert payment.status == Payment.Status.INITIATED
+        assert payment.uro_pay_order_id == "URO-SLOW-1"
+
+    def test_webhook_during_confirm_wins(self, order, user, payment_with_uropay):
+        """Test a webhook settling the payment mid-call is not overwritten."""
+        def webhook_arrives():
+            Payment.objects.filter(pk=payment_with_uropay.pk).update(
+                status=Payment.Status.SUCCESS, reference_number="WEBHOOK-REF",
+            )
+
+        stub = SlowStubProvider(during_call=webhook_arrives)
+        with patch("payments.services.payment_service.PaymentProviderClient", return_value=stub):
+            payment = PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number="UTR-1")
+        assert payment.status == Payment.Status.SUCCESS
+        assert payment.reference_number == "WEBHOOK-REF"
+
+    def test_concurrent_confirm_rejected_while_in_flight(self, order, user, payment_with_uropay):
+        """Test a second confirm is rejected while the first holds the claim."""
+        errors = []
+
+        def second_confirm():
+            try:
+                PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number="UTR-2")
+            except ValidationError as exc:
+                errors.append(exc)
+
+        stub = SlowStubProvider(during_call=second_confirm)
+        with patch("payments.services.payment_service.PaymentProviderClient", return_value=stub):
+            payment = PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number="UTR-1")
+        assert len(errors) == 1
+        assert payment.status == Payment.Status.SUCCESS
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+
+    def test_provider_failure_releases_claim(self, order, user, payment_with_uropay):
+        """Test a failed provider call hands the payment back for retry."""
+        with patch("payments.services.payment_service.PaymentProviderClient", return_value=SlowStubProvider(fail=True)):
+            with pytest.raises(ValidationError):
+                PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number="UTR-1")
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.status == Payment.Status.INITIATED
+        assert payment_with_uropay.claimed_at is None
+
+    def test_stale_claim_is_taken_over(self, order, user, payment_with_uropay, settings):
+        """Test a claim older than the lease (crashed worker) does not block forever."""
+        settings.PAYMENT_CLAIM_TIMEOUT_SECONDS = 30
+        Payment.objects.filter(pk=payment_with_uropay.pk).update(
+            status=Payment.Status.CONFIRMING, claimed_at=timezone.now() - timedelta(minutes=5),
+        )
+        with patch("payments.services.payment_service.PaymentProviderClient", return_value=SlowStubProvider(delay=0)):
+            payment = PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number="UTR-1")
+        assert payment.status == Payment.Status.SUCCESS
+
+
+# ============================================================================
+# PROVIDER CLIENT TESTS (6 tests)
 # ============================================================================
 
 class TestPaymentProviderClient:
@@ -175,7 +308,7 @@ class TestPaymentProviderClient:
         headers = client._uropay_headers()
         assert headers["X-API-KEY"] == "uro-api-key"
 
-    @patch("payments.clients.provider.requests.request")
+    @patch("payments.clients.provider.requests.Session.request")
     def test_uropay_generate_success(self, mock_request, settings):
         """Test successful UroPay generate."""
         settings.UROPAY_API_KEY = "uro-key"
@@ -190,6 +323,557 @@ class TestPaymentProviderClient:
         )
         assert result["uroPayOrderId"] == "URO-123"
 
+    def test_session_shared_across_clients(self):
+        """Test every client in a process uses the same pooled session."""
+        provider.close_session()
+        session = provider.get_session()
+        assert provider.get_session() is session
+        adapter = session.get_adapter("https://api.uropay.me")
+        assert "POST" not in adapter.max_retries.allowed_methods
+        assert "GET" in adapter.max_retries.allowed_methods
+
+    def test_session_rebuilt_after_fork(self):
+        """Test a forked child gets its own session instead of the parent's sockets."""
+        parent = provider.get_session()
+        provider._reset_session_after_fork()
+        assert provider.get_session() is not parent
+
+    def test_uropay_headers_hashed_once(self, settings):
+        """Test the sha512 bearer token is computed once per credential pair."""
+        settings.UROPAY_API_KEY = "uro-api-key"
+        settings.UROPAY_SECRET = "uro-secret-cached"
+        provider._uropay_auth_headers.cache_clear()
+        PaymentProviderClient()._uropay_headers()
+        PaymentProviderClient()._uropay_headers()
+        info = provider._uropay_auth_headers.cache_info()
+        assert info.misses == 1 and info.hits == 1
+
+
+# ============================================================================
+# CIRCUIT BREAKER AND BULKHEAD TESTS (5 tests)
+# ============================================================================
+
+@pytest.fixture
+def uropay_settings(settings):
+    settings.UROPAY_API_KEY = "uro-key"
+    settings.UROPAY_SECRET = "uro-secret"
+    settings.UROPAY_CIRCUIT_FAILURE_THRESHOLD = 3
+    settings.UROPAY_CIRCUIT_RECOVERY_SECONDS = 30
+    return settings
+
+
+def _ok_response(data=None):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"data": data or {"orderStatus": "COMPLETED"}}
+    return response
+
+
+class TestProviderResilience:
+    """Tests for the shared circuit breaker and per-process bulkhead."""
+
+    @patch("payments.clients.provider.requests.Session.request", side_effect=requests.ConnectionError("down"))
+    def test_circuit_opens_and_fails_fast(self, mock_request, uropay_settings):
+        """Test repeated failures open the circuit so later calls never reach the network."""
+        client = PaymentProviderClient()
+        for _ in range(3):
+            with pytest.raises(PaymentProviderError):
+                client.uropay_status("URO-1")
+        assert provider.uropay_breaker().state() == "open"
+
+        with pytest.raises(CircuitOpenError):
+            client.uropay_status("URO-1")
+        assert mock_request.call_count == 3
+        metrics = get_metrics("uropay")
+        assert metrics["opened"] == 1 and metrics["failure"] == 3 and metrics["rejected_open"] == 1
+
+    def test_half_open_probe_closes_or_reopens(self, uropay_settings):
+        """Test only one probe is let through after the recovery timeout."""
+        breaker = provider.uropay_breaker()
+        client = PaymentProviderClient()
+        cache.set("circuit:uropay:opened_at", time.time() - 60, timeout=None)
+        with patch("payments.clients.provider.requests.Session.request", side_effect=requests.Timeout("slow")):
+            with pytest.raises(PaymentProviderError):
+                client.uropay_status("URO-1")
+        assert breaker.state() == "open"  # failed probe re-opens for a full recovery period
+
+        cache.set("circuit:uropay:opened_at", time.time() - 60, timeout=None)
+        assert breaker.before_call() is True
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # second caller while the probe is in flight
+        breaker.record_success(probe=True)
+        assert breaker.state() == "closed"
+
+        with patch("payments.clients.provider.requests.Session.request", return_value=_ok_response()):
+            assert client.uropay_status("URO-1")["orderStatus"] == "COMPLETED"
+        assert get_metrics("uropay")["closed"] == 1
+
+    def test_async_guard_keeps_cache_off_event_loop(self, uropay_settings):
+        """Test the async guard trips the shared circuit without blocking cache calls on the loop."""
+        breaker = provider.uropay_breaker()
+        threads = []
+        real_get = cache.get
+
+        def tracking_get(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return real_get(*args, **kwargs)
+
+        async def run():
+            for _ in range(3):
+                with pytest.raises(PaymentProviderError):
+                    async with breaker.guard_async(failure_exceptions=(PaymentProviderError,)):
+                        raise PaymentProviderError("down")
+            with pytest.raises(CircuitOpenError):
+                async with breaker.guard_async():
+                    pass
+            return threading.get_ident()
+
+        with patch.object(cache, "get", side_effect=tracking_get):
+            loop_thread = async_to_sync(run)()
+        assert breaker.state() == "open"
+        assert threads and loop_thread not in threads
+
+    def test_bulkhead_rejects_excess_concurrent_calls(self, uropay_settings):
+        """Test calls beyond the per-process limit fail fast instead of queueing."""
+        uropay_settings.UROPAY_MAX_CONCURRENT_CALLS = 1
+        uropay_settings.UROPAY_BULKHEAD_WAIT_SECONDS = 0
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_request(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return _ok_response()
+
+        with patch("payments.clients.provider.requests.Session.request", side_effect=slow_request):
+            worker = threading.Thread(target=PaymentProviderClient().uropay_status, args=("URO-1",))
+            worker.start()
+            assert started.wait(5)
+            with pytest.raises(BulkheadFullError):
+                PaymentProviderClient().uropay_status("URO-2")
+            release.set()
+            worker.join(5)
+            assert PaymentProviderClient().uropay_status("URO-3")["orderStatus"] == "COMPLETED"
+
+        metrics = get_metrics("uropay")
+        assert metrics["rejected_bulkhead"] == 1 and metrics["failure"] == 0
+
+    def test_open_circuit_returns_503_and_releases_claim(self, auth_client, order, uropay_settings):
+        """Test the API answers 503 while the circuit is open and the payment can be retried."""
+        cache.set("circuit:uropay:opened_at", time.time(), timeout=None)
+
+        with patch("payments.clients.provider.requests.Session.request") as mock_request:
+            response = auth_client.post(
+                reverse("payment-create"),
+                {"order_id": order.id, "vpa": "test@upi", "vpaName": "Test", "customerName": "Test", "customerEmail": "test@example.com"},
+                format="json",
+            )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert mock_request.call_count == 0
+        assert Payment.objects.get(order=order).status == Payment.Status.INITIATED
+
+
+# ============================================================================
+# WEBHOOK INGESTION AND PROCESSING TESTS (4 tests)
+# ============================================================================
+
+def _signed_webhook(payload, secret="uro-secret", environment="TEST"):
+    hashed = hashlib.sha512(secret.encode("utf-8")).hexdigest()
+    message = json.dumps({**dict(sorted(payload.items())), "environment": environment}, separators=(",", ":"), ensure_ascii=False)
+    signature = hmac.new(hashed.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
+    return {"HTTP_X_UROPAY_SIGNATURE": signature, "HTTP_X_UROPAY_ENVIRONMENT": environment}
+
+
+class TestWebhookProcessing:
+    """Tests for fast-ack webhook ingestion and the batch processor."""
+
+    @patch("payments.tasks.process_webhook_events_task.apply_async")
+    def test_webhook_acks_and_queues_once(self, mock_enqueue, api_client, payment_with_uropay, settings, django_capture_on_commit_callbacks):
+        """Test the endpoint only records the event, and duplicates are ignored."""
+        settings.UROPAY_SECRET = "uro-secret"
+        payload = {"uroPayOrderId": "UROPAY-123456", "referenceNumber": "UTR-1", "amount": 19998}
+        for _ in range(2):
+            with django_capture_on_commit_callbacks(execute=True):
+                response = api_client.post(
+                    reverse("payment-webhook"), json.dumps(payload), content_type="application/json",
+                    HTTP_X_UROPAY_WEBHOOK_ID="WH-1", **_signed_webhook(payload),
+                )
+            assert response.status_code == status.HTTP_200_OK
+
+        event = WebhookEvent.objects.get()
+        assert event.webhook_id == "WH-1" and event.processed_at is None
+        assert mock_enqueue.call_count == 2
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.status == Payment.Status.INITIATED  # deferred
+
+    @patch("payments.tasks.process_webhook_events_task.apply_async")
+    def test_webhook_bad_signature_not_stored(self, mock_enqueue, db, api_client, settings):
+        """Test unsigned or tampered webhooks are rejected before anything is written."""
+        settings.UROPAY_SECRET = "uro-secret"
+        payload = {"uroPayOrderId": "UROPAY-1", "referenceNumber": "UTR-1"}
+        headers = _signed_webhook({**payload, "amount": 1})
+        response = api_client.post(
+            reverse("payment-webhook"), json.dumps(payload), content_type="application/json",
+            HTTP_X_UROPAY_WEBHOOK_ID="WH-2", **headers,
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not WebhookEvent.objects.exists()
+        mock_enqueue.assert_not_called()
+
+    def test_batch_matches_by_reference_and_order_id(self, order, paid_order, payment_with_uropay):
+        """Test a batch settles payments matched by either key and leaves later order states alone."""
+        payment_with_uropay.status = Payment.Status.CONFIRMING
+        payment_with_uropay.claimed_at = timezone.now()
+        payment_with_uropay.save()
+        other = Payment.objects.create(order=paid_order, amount=paid_order.total_amount, reference_number="UTR-OLD")
+        Order.objects.filter(pk=paid_order.pk).update(status=Order.Status.SHIPPED)
+
+        WebhookEvent.objects.create(webhook_id="WH-A", payload={"uroPayOrderId": "UROPAY-123456", "referenceNumber": "UTR-A"})
+        WebhookEvent.objects.create(webhook_id="WH-B", payload={"referenceNumber": "UTR-OLD"})
+        WebhookEvent.objects.create(webhook_id="WH-C", payload={"uroPayOrderId": "UNKNOWN"})
+
+        assert PaymentService.process_webhook_events(batch_size=10) == 3
+        assert PaymentService.process_webhook_events(batch_size=10) == 0
+
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.status == Payment.Status.SUCCESS
+        assert payment_with_uropay.reference_number == "UTR-A" and payment_with_uropay.claimed_at is None
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        other.refresh_from_db()
+        assert other.status == Payment.Status.SUCCESS
+        assert Order.objects.get(pk=paid_order.pk).status == Order.Status.SHIPPED
+
+        events = {e.webhook_id: e for e in WebhookEvent.objects.all()}
+        assert all(e.processed_at for e in events.values())
+        assert events["WH-A"].payment_id == payment_with_uropay.pk and events["WH-C"].payment_id is None
+
+    def test_batch_query_count_is_constant(self, user, django_assert_max_num_queries):
+        """Test processing N events costs a fixed number of queries, not N lookups."""
+        for i in range(25):
+            order = Order.objects.create(user=user, total_amount=Decimal("10.00"), address="addr")
+            Payment.objects.create(order=order, amount=order.total_amount, uro_pay_order_id=f"URO-{i}")
+            WebhookEvent.objects.create(webhook_id=f"WH-{i}", payload={"uroPayOrderId": f"URO-{i}", "referenceNumber": f"UTR-{i}"})
+
+        with django_assert_max_num_queries(10):
+            assert PaymentService.process_webhook_events(batch_size=100) == 25
+        assert Payment.objects.filter(status=Payment.Status.SUCCESS).count() == 25
+        assert Order.objects.filter(status=Order.Status.PAID).count() == 25
+
+
+# ============================================================================
+# RECONCILIATION TESTS (4 tests)
+# ============================================================================
+
+@pytest.fixture
+def stale_payments(user):
+    """Five INITIATED payments last touched an hour ago, keyed by UroPay id."""
+    payments = {}
+    for uro_id in ("URO-PAID", "URO-FAILED", "URO-PENDING", "URO-ERROR", "URO-SHORT"):
+        order = Order.objects.create(user=user, total_amount=Decimal("100.00"), address="addr")
+        payments[uro_id] = Payment.objects.create(order=order, amount=order.total_amount, uro_pay_order_id=uro_id)
+    Payment.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+    return payments
+
+
+def _provider_status(self, uro_id):
+    if uro_id == "URO-ERROR":
+        raise PaymentProviderError("UroPay status failed: 429")
+    return {
+        "URO-PAID": {"orderStatus": "COMPLETED", "amount": 10000, "referenceNumber": "UTR-REC"},
+        "URO-FAILED": {"orderStatus": "EXPIRED"},
+        "URO-PENDING": {"orderStatus": "PENDING"},
+        "URO-SHORT": {"orderStatus": "COMPLETED", "amount": 100},
+    }[uro_id]
+
+
+class TestPaymentReconciliation:
+    """Tests for the stale-payment reconciliation job."""
+
+    @patch("payments.clients.provider.PaymentProviderClient.uropay_status", autospec=True, side_effect=_provider_status)
+    def test_outcomes_applied_in_bulk(self, mock_status, stale_payments, user, settings, django_capture_on_commit_callbacks):
+        """Test provider outcomes settle, fail or leave each stale payment and are reported."""
+        settings.PAYMENT_RECONCILE_CHUNK_SIZE = 2
+        fresh_order = Order.objects.create(user=user, total_amount=Decimal("5.00"), address="addr")
+        fresh = Payment.objects.create(order=fresh_order, amount=fresh_order.total_amount, uro_pay_order_id="URO-FRESH")
+
+        with django_capture_on_commit_callbacks():
+            result = reconcile_stale_payments()
+
+        assert (result.checked, result.settled, result.failed, result.unchanged, result.errors) == (5, 1, 1, 1, 1)
+        assert result.amount_mismatches == 1 and result.mismatches == 2
+        assert mock_status.call_count == 5  # never the fresh one
+
+        paid = Payment.objects.get(pk=stale_payments["URO-PAID"].pk)
+        assert paid.status == Payment.Status.SUCCESS and paid.reference_number == "UTR-REC"
+        assert paid.order.status == Order.Status.PAID
+        assert Payment.objects.get(pk=stale_payments["URO-FAILED"].pk).status == Payment.Status.FAILED
+        for uro_id in ("URO-PENDING", "URO-ERROR", "URO-SHORT"):
+            assert Payment.objects.get(pk=stale_payments[uro_id].pk).status == Payment.Status.INITIATED
+        fresh.refresh_from_db()
+        assert fresh.status == Payment.Status.INITIATED
+
+    @patch("payments.clients.provider.PaymentProviderClient.uropay_status", autospec=True, return_value={"orderStatus": "PENDING"})
+    def test_unresolved_rows_do_not_starve_later_ones(self, mock_status, stale_payments, settings):
+        """Test a run capped below the unresolved backlog reaches the rows earlier runs skipped."""
+        settings.PAYMENT_RECONCILE_CHUNK_SIZE = 2
+
+        def checked_ids(**kwargs):
+            mock_status.reset_mock()
+            result = reconcile_stale_payments(**kwargs)
+            assert result.unchanged == result.checked
+            return {call.args[1] for call in mock_status.call_args_list}
+
+        first = checked_ids(limit=3)
+        second = checked_ids(limit=3)
+        assert len(first) == 3 and len(second) == 3
+        assert first | second == set(stale_payments)
+        # The two rows left over from the first run come before anything checked again
+        assert set(stale_payments) - first <= second
+        assert not Payment.objects.filter(last_reconciled_at__isnull=True).exists()
+
+    def test_concurrently_settled_payment_not_overwritten(self, stale_payments):
+        """Test outcomes only apply to payments that are still INITIATED."""
+        payment = stale_payments["URO-FAILED"]
+        Payment.objects.filter(pk=payment.pk).update(status=Payment.Status.SUCCESS, reference_number="WEBHOOK")
+        assert reconciliation._apply({}, [payment.pk]) == (0, 0)
+        payment.refresh_from_db()
+        assert payment.status == Payment.Status.SUCCESS
+
+    @patch("payments.clients.provider.requests.Session.request")
+    def test_open_circuit_stops_run(self, mock_request, stale_payments, settings):
+        """Test the job backs off instead of hammering a provider that is down."""
+        settings.UROPAY_API_KEY = "uro-key"
+        settings.UROPAY_SECRET = "uro-secret"
+        cache.set("circuit:uropay:opened_at", time.time(), timeout=None)
+
+        result = reconcile_stale_payments()
+        assert result.aborted and result.checked == 0
+        assert mock_request.call_count == 0
+        assert not Payment.objects.exclude(status=Payment.Status.INITIATED).exists()
+
+
+# ============================================================================
+# UROPAY SIMULATOR TESTS (3 tests)
+# ============================================================================
+
+class TestUroPaySimulator:
+    """Tests for the local UroPay stand-in used by load tests."""
+
+    def test_payment_flow_end_to_end(self, order, user, uropay_settings):
+        """Test generate + confirm through the real client and service against the simulator."""
+        simulator = UroPaySimulator(api_key="uro-key", secret="uro-secret")
+        with BackgroundSimulator(simulator) as base_url:
+            uropay_settings.UROPAY_BASE_URL = base_url
+            payment = PaymentService.generate_payment(
+                user_id=user.id, order_id=order.id, vpa="test@upi", vpaName="Test",
+                customerName="Test", customerEmail="test@example.com",
+            )
+            assert payment.uro_pay_order_id.startswith("SIM-")
+            assert simulator.orders[payment.uro_pay_order_id]["amount"] == 19998
+
+            payment = PaymentService.confirm_payment(user_id=user.id, order_id=order.id, reference_number="UTR-SIM")
+            assert payment.status == Payment.Status.SUCCESS
+            status_data = PaymentProviderClient().uropay_status(payment.uro_pay_order_id)
+            assert status_data["orderStatus"] == "COMPLETED" and status_data["referenceNumber"] == "UTR-SIM"
+
+            uropay_settings.UROPAY_SECRET = "wrong-secret"
+            with pytest.raises(PaymentProviderError, match="401"):
+                PaymentProviderClient().uropay_status(payment.uro_pay_order_id)
+
+    def test_fault_injection(self, uropay_settings):
+        """Test injected 503s surface as provider errors and latency specs are validated."""
+        simulator = UroPaySimulator(api_key="uro-key", secret="uro-secret", faults=FaultProfile(error_rate=1.0, seed=1))
+        with BackgroundSimulator(simulator) as base_url:
+            uropay_settings.UROPAY_BASE_URL = base_url
+            with pytest.raises(PaymentProviderError, match="503"):
+                PaymentProviderClient().uropay_status("SIM-1")
+        assert simulator.stats["injected_errors"] == 3  # idempotent GET retried twice by the session
+
+        assert LatencyModel.parse("lognormal:80,0.5").kind == "lognormal"
+        assert 20 <= LatencyModel.parse("uniform:20,30").sample_ms(simulator.rng) <= 30
+        with pytest.raises(ValueError):
+            LatencyModel.parse("uniform:20")
+
+    @patch("payments.tasks.process_webhook_events_task.apply_async")
+    def test_signed_webhook_accepted(self, mock_enqueue, api_client, payment_with_uropay, uropay_settings):
+        """Test simulator webhooks pass the app's signature check."""
+        simulator = UroPaySimulator(api_key="uro-key", secret="uro-secret")
+        order = {"uroPayOrderId": "UROPAY-123456", "merchantOrderId": "ORDER-1", "amount": 19998,
+                 "orderStatus": "COMPLETED", "referenceNumber": "UTR-WH"}
+        body, headers = simulator.signed_webhook(order, webhook_id="SIM-WH-1")
+        response = api_client.post(
+            reverse("payment-webhook"), body, content_type="application/json",
+            **{f"HTTP_{k.upper().replace('-', '_')}": v for k, v in headers.items() if k != "Content-Type"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert WebhookEvent.objects.get().payload["referenceNumber"] == "UTR-WH"
+
+
+# ============================================================================
+# WEBHOOK REPLAY TESTS (4 tests)
+# ============================================================================
+
+@pytest.fixture
+def replayable_events(order, payment_with_uropay):
+    """A payment left INITIATED by a buggy processor, plus one unrelated event."""
+    now = timezone.now()
+    target = WebhookEvent.objects.create(
+        webhook_id="WH-REPLAY", payload={"uroPayOrderId": "UROPAY-123456", "referenceNumber": "UTR-REPLAY"},
+        processed_at=now,
+    )
+    other = WebhookEvent.objects.create(webhook_id="WH-OTHER", payload={"uroPayOrderId": "NOPE"}, processed_at=now)
+    WebhookEvent.objects.filter(pk=other.pk).update(received_at=now - timedelta(days=3))
+    return target, other
+
+
+class TestWebhookReplay:
+    """Tests for the replay_webhook_events management command."""
+
+    def test_replay_settles_and_is_idempotent(self, replayable_events, payment_with_uropay, order):
+        """Test replaying applies the event once and a second run changes nothing."""
+        target, _ = replayable_events
+        out = StringIO()
+        call_command("replay_webhook_events", ids=str(target.pk), workers=1, stdout=out)
+        assert "settled=1" in out.getvalue()
+
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.status == Payment.Status.SUCCESS
+        assert payment_with_uropay.reference_number == "UTR-REPLAY"
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        updated_at = payment_with_uropay.updated_at
+
+        out = StringIO()
+        call_command("replay_webhook_events", ids=str(target.pk), workers=1, stdout=out)
+        assert "settled=0 already_settled=1" in out.getvalue()
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.updated_at == updated_at
+
+    def test_replay_repairs_order_behind_settled_payment(self, replayable_events, payment_with_uropay, order):
+        """Test a replay moves a still-PENDING order to PAID when its payment is already SUCCESS."""
+        target, _ = replayable_events
+        Payment.objects.filter(pk=payment_with_uropay.pk).update(status=Payment.Status.SUCCESS)
+        assert Order.objects.get(pk=order.pk).status == Order.Status.PENDING
+
+        out = StringIO()
+        with patch("payments.services.payment_service.publish_order_changes") as mock_publish:
+            call_command("replay_webhook_events", ids=str(target.pk), workers=1, stdout=out)
+        assert "settled=0 already_settled=1 unmatched=0 orders_repaired=1" in out.getvalue()
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+        mock_publish.assert_called_once_with([order.pk], "payment.webhook")
+
+    def test_dry_run_writes_nothing(self, replayable_events, payment_with_uropay):
+        """Test --dry-run reports the outcome without touching payments or events."""
+        target, _ = replayable_events
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        out = StringIO()
+        call_command("replay_webhook_events", since=since, dry_run=True, workers=1, stdout=out)
+        assert "[dry run] events=1 settled=1" in out.getvalue()  # the 3-day-old event is out of range
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.status == Payment.Status.INITIATED
+        assert WebhookEvent.objects.get(pk=target.pk).payment_id is None
+
+    def test_replay_requires_a_selection(self, db):
+        """Test the command refuses to replay every stored event implicitly."""
+        with pytest.raises(CommandError):
+            call_command("replay_webhook_events", stdout=StringIO())
+
+
+# ============================================================================
+# PAYMENT QR CODE TESTS (5 tests)
+# ============================================================================
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+class TestPaymentQRCodes:
+    """QR payloads live in the blob store, not on the Payment row."""
+
+    def _generate(self, order, user, qr_code):
+        stub = SlowStubProvider(delay=0)
+        stub.uropay_generate = lambda **kwargs: {"uroPayOrderId": "URO-QR-1", "upiString": "upi://pay?qr", "qrCode": qr_code}
+        with patch("payments.services.payment_service.PaymentProviderClient", return_value=stub):
+            return PaymentService.generate_payment(
+                user_id=user.id, order_id=order.id, vpa="test@upi", vpaName="Test",
+                customerName="Test", customerEmail="test@example.com",
+            )
+
+    def test_generate_stores_qr_blob(self, order, user):
+        """Test generate writes the decoded image to the blob store and keeps only its digest."""
+        payment = self._generate(order, user, "data:image/png;base64," + base64.b64encode(PNG_BYTES).decode())
+        digest = hashlib.sha256(PNG_BYTES).hexdigest()
+        assert payment.qr_code is None
+        assert payment.qr_code_digest == digest
+        with qr_storage().open(blob_name(digest), "rb") as blob:
+            assert blob.read() == PNG_BYTES
+        data = PaymentResponseSerializer(payment).data
+        assert data["qr_code"] is None
+        assert data["qr_code_url"] == reverse("payment-qr", args=[digest])
+
+    def test_store_race_leaves_no_duplicate_blob(self):
+        """Test a save that loses the exists() race does not leave a suffixed copy behind."""
+        storage = qr_storage()
+        raw = base64.b64encode(PNG_BYTES + b"race").decode()
+        digest = store_qr_code(raw)
+        folder = blob_name(digest).rsplit("/", 1)[0]
+
+        # Only the up-front check misses the blob, as if another worker saved it just after
+        real_exists = type(storage).exists
+        checks = iter([False])
+        with patch.object(type(storage), "exists", lambda self, name: next(checks, real_exists(self, name))):
+            assert store_qr_code(raw) == digest
+        assert storage.listdir(folder)[1] == [digest]
+
+    def test_qr_endpoint_is_cacheable(self, client, order, user):
+        """Test the QR endpoint serves the blob publicly with long-lived caching and ETags."""
+        payment = self._generate(order, user, base64.b64encode(PNG_BYTES).decode())
+        url = reverse("payment-qr", args=[payment.qr_code_digest])
+
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert b"".join(response.streaming_content) == PNG_BYTES
+        assert response["Content-Type"] == "image/png"
+        assert "max-age=31536000" in response["Cache-Control"]
+        assert response["ETag"] == f'"{payment.qr_code_digest}"'
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == status.HTTP_304_NOT_MODIFIED
+        assert client.get(reverse("payment-qr", args=["0" * 64])).status_code == status.HTTP_404_NOT_FOUND
+        assert client.get(reverse("payment-qr", args=["not-a-digest"])).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_qr_endpoint_sandboxes_svg(self, client, order, user):
+        """Test provider SVG is served sandboxed so embedded scripts cannot run on our origin."""
+        svg = '<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        payment = self._generate(order, user, svg)
+
+        response = client.get(reverse("payment-qr", args=[payment.qr_code_digest]))
+        assert response["Content-Type"] == "image/svg+xml"
+        assert response["Content-Security-Policy"].startswith("sandbox")
+        assert "default-src 'none'" in response["Content-Security-Policy"]
+        assert response["X-Content-Type-Options"] == "nosniff"
+        assert response["Content-Disposition"] == f'inline; filename="{payment.qr_code_digest}"'
+
+    def test_backfill_moves_inline_qr_codes(self, order, payment_with_uropay):
+        """Test the backfill command moves legacy inline payloads and is safe to re-run."""
+        Payment.objects.filter(pk=payment_with_uropay.pk).update(qr_code=base64.b64encode(PNG_BYTES).decode())
+
+        out = StringIO()
+        call_command("backfill_payment_qr_codes", "--dry-run", stdout=out)
+        assert "would move 1" in out.getvalue()
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.qr_code_digest is None
+
+        call_command("backfill_payment_qr_codes", stdout=StringIO())
+        payment_with_uropay.refresh_from_db()
+        assert payment_with_uropay.qr_code is None
+        assert payment_with_uropay.qr_code_digest == hashlib.sha256(PNG_BYTES).hexdigest()
+        assert qr_storage().exists(blob_name(payment_with_uropay.qr_code_digest))
+
+        out = StringIO()
+        call_command("backfill_payment_qr_codes", stdout=out)
+        assert "moved 0" in out.getvalue()
+
 
 # ============================================================================
 # VIEW TESTS (2 tests)
@@ -221,3 +905,108 @@ class TestPaymentAPIViews:
                 format="json",
             )
             assert response.status_code == status.HTTP_200_OK
+
+
+# ============================================================================
+# ASYNC CLIENT AND VIEW TESTS (4 tests)
+# ============================================================================
+
+class AsyncStubProvider:
+    """Async provider stub for the ASGI payment views."""
+
+    async def uropay_generate(self, **kwargs):
+        await asyncio.sleep(0.01)
+        return {"uroPayOrderId": "URO-ASYNC-1", "upiString": "upi://pay?async", "qrCode": "qr=="}
+
+    async def uropay_update(self, **kwargs):
+        await asyncio.sleep(0.01)
+        return {}
+
+
+class TestAsyncPaymentProvider:
+    """Tests for AsyncPaymentProviderClient against a local HTTP server."""
+
+    def test_concurrent_status_calls_share_pool(self, settings):
+        """Test many in-flight calls overlap instead of running one after another."""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        settings.UROPAY_API_KEY = "uro-key"
+        settings.UROPAY_SECRET = "uro-secret"
+
+        async def status_handler(request):
+            await asyncio.sleep(0.2)
+            return web.json_response({"data": {"uroPayOrderId": request.match_info["id"], "orderStatus": "COMPLETED"}})
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/order/status/{id}", status_handler)
+            async with TestServer(app) as server:
+                settings.UROPAY_BASE_URL = str(server.make_url(""))
+                client = AsyncPaymentProviderClient()
+                started = time.perf_counter()
+                results = await asyncio.gather(*(client.uropay_status(f"URO-{i}") for i in range(20)))
+                elapsed = time.perf_counter() - started
+                await close_async_session()
+                return results, elapsed
+
+        results, elapsed = async_to_sync(run)()
+        assert [r["uroPayOrderId"] for r in results] == [f"URO-{i}" for i in range(20)]
+        assert elapsed < 2.0  # 20 x 0.2s sequentially would be 4s
+
+    def test_unreachable_provider_raises(self, settings):
+        """Test connection errors surface as PaymentProviderError."""
+        settings.UROPAY_API_KEY = "uro-key"
+        settings.UROPAY_SECRET = "uro-secret"
+        settings.UROPAY_BASE_URL = "http://127.0.0.1:9"
+
+        async def run():
+            try:
+                await AsyncPaymentProviderClient(timeout=2).uropay_status("URO-1")
+            finally:
+                await close_async_session()
+
+        with pytest.raises(PaymentProviderError):
+            async_to_sync(run)()
+
+
+class TestAsyncPaymentViews:
+    """Tests for the async payment endpoints."""
+
+    def _post(self, name, data, user=None):
+        headers = {}
+        if user is not None:
+            headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        return async_to_sync(AsyncClient().post)(
+            reverse(name), data, content_type="application/json", headers=headers,
+        )
+
+    def test_async_create_and_confirm(self, user, order):
+        """Test the async generate + confirm flow end to end."""
+        with patch("payments.services.payment_service.AsyncPaymentProviderClient", return_value=AsyncStubProvider()):
+            response = self._post(
+                "payment-create-async",
+                {"order_id": order.id, "vpa": "test@upi", "vpaName": "Test", "customerName": "Test", "customerEmail": "test@example.com"},
+                user,
+            )
+            assert response.status_code == status.HTTP_201_CREATED
+            assert response.json()["uro_pay_order_id"] == "URO-ASYNC-1"
+
+            response = self._post("payment-confirm-async", {"order_id": order.id, "referenceNumber": "UTR123456"}, user)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == Payment.Status.SUCCESS
+        order.refresh_from_db()
+        assert order.status == Order.Status.PAID
+
+    def test_async_view_errors(self, user, order, another_user):
+        """Test auth and validation errors keep DRF's status codes and body shape."""
+        response = self._post("payment-confirm-async", {"order_id": order.id, "referenceNumber": "UTR"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = self._post("payment-confirm-async", {"order_id": order.id, "referenceNumber": "UTR"}, another_user)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "detail" in response.json()
+
+        response = self._post("payment-confirm-async", {"order_id": order.id}, user)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "referenceNumber" in response.json()